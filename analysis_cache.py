@@ -0,0 +1,73 @@
+"""
+Analysis Cache - Memoizes ORBAlgo results per symbol
+A result stays valid until a new signal candle closes or a session's
+range gets set, so scans in between can skip both the kline download and
+the analysis.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import clock
+import config
+from orb_algo import active_sessions, timeframe_to_ms
+
+
+# (symbol, last closed signal candle open, ORB candle opens of the sessions with a range, params hash)
+CacheKey = Tuple[str, int, Tuple[int, ...], int]
+
+
+def last_closed_open_time(timeframe: str, now_ms: int) -> int:
+    """Open time of the most recent fully closed candle for a timeframe"""
+    tf_ms = timeframe_to_ms(timeframe)
+    return (now_ms // tf_ms) * tf_ms - tf_ms
+
+
+class AnalysisCache:
+    def __init__(self):
+        # Only the newest entry per symbol can ever be hit again
+        self._entries: Dict[str, Tuple[CacheKey, List[Dict]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def expected_key(self, symbol: str, params_hash: int, now_ms: Optional[int] = None) -> CacheKey:
+        """Key the next analysis would have, judged from the clock alone"""
+        if now_ms is None:
+            now_ms = clock.now_ms()
+        return (
+            symbol,
+            last_closed_open_time(config.SIGNAL_TIMEFRAME, now_ms),
+            tuple(w.start for w in active_sessions(now_ms) if now_ms >= w.orb_end),
+            params_hash,
+        )
+
+    @staticmethod
+    def key_for(symbol: str, candles_signal: List[Dict], orb_starts: Tuple[int, ...], params_hash: int) -> CacheKey:
+        """Key of an analysis that ran on these (closed) candles and these session ranges"""
+        return (symbol, candles_signal[-1]['timestamp'], orb_starts, params_hash)
+
+    def get(self, key: CacheKey) -> Optional[List[Dict]]:
+        """Return the cached entries of analyze_sessions() or None, counting hits"""
+        entry = self._entries.get(key[0])
+        if entry and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, result: List[Dict]):
+        self._entries[key[0]] = (key, result)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return f"Analysis cache: {s['hits']} hits / {s['misses']} misses ({s['hit_rate']:.1f}% hit rate)"
@@ -2,9 +2,15 @@
 Binance Client - Fetches candlestick data from Binance API
 """
 import requests
-from datetime import datetime
 from typing import List, Dict, Optional
 
+import clock
+import config
+import event_log
+
+
+log = event_log.get_logger('binance_client')
+
 
 class BinanceClient:
     # Use data API for global access (no geo-restrictions)
@@ -16,9 +22,11 @@ class BinanceClient:
     
     def __init__(self):
         self.session = requests.Session()
-        self.current_base_url = self.BASE_URLS[0]
+        # BINANCE_API_URL points the client at a stand-in such as fake_exchange.py
+        self.current_base_url = config.BINANCE_API_URL or self.BASE_URLS[0]
     
-    def get_klines(self, symbol: str, interval: str, limit: int = 100) -> List[Dict]:
+    def get_klines(self, symbol: str, interval: str, limit: int = 100,
+                   end_time: Optional[int] = None, timeout: float = 10) -> List[Dict]:
         """
         Fetch candlestick data from Binance
         
@@ -26,6 +34,8 @@ class BinanceClient:
             symbol: Trading pair (e.g., 'BTCUSDT')
             interval: Timeframe (e.g., '15m', '30m', '1h')
             limit: Number of candles to fetch
+            end_time: Last candle open time (ms) to include; None = up to now
+            timeout: Seconds to wait for the connection and for each read
             
         Returns:
             List of candle dictionaries with open, high, low, close, volume
@@ -36,9 +46,11 @@ class BinanceClient:
             'interval': interval,
             'limit': limit
         }
+        if end_time is not None:
+            params['endTime'] = end_time
         
         try:
-            response = self.session.get(endpoint, params=params, timeout=10)
+            response = self.session.get(endpoint, params=params, timeout=timeout)
             response.raise_for_status()
             raw_data = response.json()
             
@@ -52,13 +64,13 @@ class BinanceClient:
                     'close': float(candle[4]),
                     'volume': float(candle[5]),
                     'close_time': candle[6],
-                    'is_closed': True if candle[6] < datetime.now().timestamp() * 1000 else False
+                    'is_closed': True if candle[6] < clock.now_ms() else False
                 })
             
             return candles
             
         except requests.RequestException as e:
-            print(f"Error fetching data for {symbol}: {e}")
+            log.warning("Error fetching data for %s: %s", symbol, e, extra={'symbol': symbol, 'interval': interval})
             return []
     
     def get_current_price(self, symbol: str) -> Optional[float]:
@@ -72,7 +84,7 @@ class BinanceClient:
             data = response.json()
             return float(data['price'])
         except requests.RequestException as e:
-            print(f"Error fetching price for {symbol}: {e}")
+            log.warning("Error fetching price for %s: %s", symbol, e, extra={'symbol': symbol})
             return None
     
     def get_server_time(self) -> int:
@@ -83,7 +95,7 @@ class BinanceClient:
             response.raise_for_status()
             return response.json()['serverTime']
         except requests.RequestException:
-            return int(datetime.now().timestamp() * 1000)
+            return clock.now_ms()
 
 
 # Test
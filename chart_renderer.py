@@ -0,0 +1,193 @@
+"""
+Chart Renderer - Signal charts rendered off the event loop
+Draws the candles, EMA, ORB box and entry/SL/close levels for a signal in a
+worker process and caches the PNG by (symbol, candle_time, kind).
+matplotlib is optional: without it rendering is disabled and alerts stay text-only.
+"""
+import asyncio
+import importlib.util
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import config
+import event_log
+
+
+log = event_log.get_logger('chart_renderer')
+
+
+# (symbol, candle_time, kind) - kind is 'entry', 'tp1' or 'sl'
+ChartKey = Tuple[str, int, str]
+
+HAS_MATPLOTLIB = importlib.util.find_spec('matplotlib') is not None
+
+# Rendered chart handed to the bot: (media key, PNG bytes)
+Chart = Tuple[str, bytes]
+
+KIND_TITLES = {'entry': 'Giriş', 'tp1': 'TP1', 'sl': 'Stop Loss'}
+
+
+def render_chart(spec: Dict) -> bytes:
+    """Render one chart to PNG bytes (runs in a worker process)"""
+    import bisect
+    import io
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from orb_algo import calculate_ema
+
+    candles = spec['candles']
+    # EMA over the full history so the visible part matches the algo
+    ema = calculate_ema([(c['high'] + c['low']) / 2 for c in candles], spec['ema_length'])
+    shown = candles[-spec['visible']:]
+    ema = ema[-len(shown):]
+    xs = range(len(shown))
+
+    fig, ax = plt.subplots(figsize=(8, 4.5), dpi=100)
+    try:
+        for i, c in enumerate(shown):
+            color = '#26a69a' if c['close'] >= c['open'] else '#ef5350'
+            ax.vlines(i, c['low'], c['high'], color=color, linewidth=0.8)
+            body = abs(c['close'] - c['open']) or c['close'] * 1e-5
+            ax.bar(i, body, bottom=min(c['open'], c['close']), width=0.6, color=color)
+
+        ax.plot(xs, ema, color='#ff9800', linewidth=1.2, label=f"EMA {spec['ema_length']}")
+
+        if spec.get('orb_high') is not None and spec.get('orb_low') is not None:
+            ax.axhspan(spec['orb_low'], spec['orb_high'], color='#2196f3', alpha=0.12, label='ORB')
+            ax.axhline(spec['orb_high'], color='#2196f3', linewidth=0.8)
+            ax.axhline(spec['orb_low'], color='#2196f3', linewidth=0.8)
+
+        ax.axhline(spec['entry_price'], color='#4caf50', linestyle='--', linewidth=1, label='Giriş')
+        if spec.get('sl_price') is not None:
+            ax.axhline(spec['sl_price'], color='#f44336', linestyle=':', linewidth=1, label='SL')
+        if spec.get('tp_price') is not None:
+            ax.axhline(spec['tp_price'], color='#4caf50', linestyle=':', linewidth=1, label='TP1')
+        if spec.get('close_price') is not None:
+            ax.axhline(spec['close_price'], color='#9c27b0', linestyle='-.', linewidth=1, label='Kapanış')
+
+        # Mark the candles holding the entry and (for exits) the close
+        times = [c['timestamp'] for c in shown]
+        entry_marker = '^' if spec['direction'] == 'buy' else 'v'
+        for ts, price, marker, color in ((spec.get('entry_time'), spec['entry_price'], entry_marker, '#4caf50'),
+                                         (spec.get('close_time'), spec.get('close_price'), 'x', '#9c27b0')):
+            if ts is not None and times and ts >= times[0]:
+                i = bisect.bisect_right(times, ts) - 1
+                y = price if price is not None else shown[i]['close']
+                ax.scatter([i], [y], marker=marker, color=color, s=80, zorder=5)
+
+        step = max(1, len(shown) // 8)
+        ax.set_xticks(list(xs)[::step])
+        ax.set_xticklabels([
+            datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime('%H:%M') for ts in times[::step]
+        ], fontsize=8)
+        ax.set_title(f"{spec['symbol']} {spec['timeframe']} - {KIND_TITLES.get(spec['kind'], spec['kind'])}")
+        ax.grid(alpha=0.2)
+        ax.legend(loc='upper left', fontsize=8)
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', bbox_inches='tight')
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class ChartRenderer:
+    def __init__(self, workers: int = 2, cache_size: int = 64, visible_candles: int = 64):
+        self.enabled = config.CHARTS_ENABLED and HAS_MATPLOTLIB
+        self.workers = workers
+        self.cache_size = cache_size
+        self.visible_candles = visible_candles
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[ChartKey, bytes]" = OrderedDict()
+        # Renders in progress, so concurrent requests for one key share it
+        self._inflight: Dict[ChartKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+        if config.CHARTS_ENABLED and not HAS_MATPLOTLIB:
+            log.warning("matplotlib not installed - signal charts disabled")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork a process that is running an event loop and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+
+    async def render(self, symbol: str, candle_time: int, kind: str, candles: List[Dict],
+                     direction: str, entry_price: float, sl_price: Optional[float] = None,
+                     orb_high: Optional[float] = None, orb_low: Optional[float] = None,
+                     entry_time: Optional[int] = None, close_price: Optional[float] = None,
+                     tp_price: Optional[float] = None) -> Optional[Chart]:
+        """Chart for a signal, or None if charts are disabled or rendering failed"""
+        if not self.enabled:
+            return None
+
+        key = (symbol, candle_time, kind)
+        media_key = f"{symbol}:{candle_time}:{kind}"
+        png = self._cache.get(key)
+        if png is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return media_key, png
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            try:
+                return media_key, await asyncio.shield(pending)
+            except Exception:
+                return None
+
+        self.misses += 1
+        spec = {
+            'symbol': symbol,
+            'kind': kind,
+            'timeframe': config.SIGNAL_TIMEFRAME,
+            'ema_length': config.EMA_LENGTH,
+            'visible': self.visible_candles,
+            'candles': [{k: c[k] for k in ('timestamp', 'open', 'high', 'low', 'close')} for c in candles],
+            'direction': direction,
+            'entry_price': entry_price,
+            'sl_price': sl_price,
+            'tp_price': tp_price,
+            'orb_high': orb_high,
+            'orb_low': orb_low,
+            'entry_time': entry_time if entry_time is not None else (candle_time if kind == 'entry' else None),
+            'close_time': candle_time if kind != 'entry' else None,
+            'close_price': close_price,
+        }
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor(), render_chart, spec)
+            self._inflight[key] = future
+            png = await asyncio.shield(future)
+        except Exception as e:
+            log.error("Chart render failed for %s (%s): %s", symbol, kind, e, extra={'symbol': symbol})
+            if isinstance(e, BrokenProcessPool):
+                # A worker died; start a fresh pool on the next render
+                self.close()
+            return None
+        finally:
+            self._inflight.pop(key, None)
+
+        self._cache[key] = png
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return media_key, png
+
+    def format_stats(self) -> str:
+        return f"Chart cache: {self.hits} hits / {self.misses} renders"
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,66 @@
+"""
+Clock - The bot's notion of "now"
+Candle-close checks, scan scheduling and stored timestamps read the time
+through this module, so a replay can swap in a VirtualClock (see
+replay.py) and run whole trading days faster than real time. Rate limits
+and timeouts that protect real services keep using the real clock.
+"""
+import asyncio
+import time
+
+
+class RealClock:
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Clock starting at start_ms and running speed times faster than real
+    time. speed=0 means "jump": time stands still while work runs and
+    sleep() advances it instantly, so idle gaps cost nothing. Jump mode
+    assumes a single sleeper (the scan loop).
+    """
+
+    def __init__(self, start_ms: int, speed: float = 0):
+        self.speed = speed
+        self._virtual_start = start_ms / 1000
+        self._real_start = time.monotonic()
+        self._jumped = 0.0
+
+    def time(self) -> float:
+        elapsed = (time.monotonic() - self._real_start) * self.speed if self.speed else 0.0
+        return self._virtual_start + elapsed + self._jumped
+
+    async def sleep(self, seconds: float):
+        if self.speed:
+            await asyncio.sleep(seconds / self.speed)
+        else:
+            self._jumped += max(0.0, seconds)
+            await asyncio.sleep(0)
+
+
+_clock = RealClock()
+
+
+def install(clock):
+    """Replace the process-wide clock (RealClock() restores real time)"""
+    global _clock
+    _clock = clock
+
+
+def now() -> float:
+    """Current time as epoch seconds"""
+    return _clock.time()
+
+
+def now_ms() -> int:
+    return int(_clock.time() * 1000)
+
+
+async def sleep(seconds: float):
+    """Sleep on the current clock (scaled or skipped under a VirtualClock)"""
+    await _clock.sleep(seconds)
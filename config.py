@@ -26,10 +26,12 @@ ORB_TIMEFRAME = '1h'        # ORB Timeframe (1 hour)
 SIGNAL_TIMEFRAME = '15m'    # Trading timeframe (15 minutes)
 SENSITIVITY = 'Medium'      # High, Medium, Low, Lowest
 BREAKOUT_CONDITION = 'EMA'  # Close or EMA
-TP_METHOD = 'Dynamic'       # Dynamic or ATR
+TP_METHOD = 'Dynamic'       # Dynamic (EMA crossback) or ATR (fixed target)
 EMA_LENGTH = 13
 SL_METHOD = 'Balanced'      # Safer, Balanced, Risky
-ADAPTIVE_SL = True
+ADAPTIVE_SL = True          # Move SL to the entry once the EMA is MINIMUM_PROFIT_PERCENT in profit
+ATR_LENGTH = 12             # ATR period (only computed for TP_METHOD = 'ATR')
+TP_ATR_MULTIPLIER = 1.5     # ATR target: TP1 = entry +/- ATR x this
 
 # Derived settings
 RETESTS_NEEDED = {
@@ -41,3 +43,101 @@ RETESTS_NEEDED = {
 
 # Minimum profit settings
 MINIMUM_PROFIT_PERCENT = 0.20
+
+# Scan pipeline (workers per stage: fetch -> analyze -> persist -> notify)
+PIPELINE_FETCH_WORKERS = 8
+PIPELINE_ANALYZE_WORKERS = 1
+PIPELINE_PERSIST_WORKERS = 1
+PIPELINE_NOTIFY_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 16    # Max items waiting in front of each stage
+
+# State backend of main.py (scan_once.py keeps its own, see SCAN_ONCE_STATE_BACKEND)
+# 'sqlite:<path>', 'jsonl:<path>' or 'memory' (see state_store.py)
+STATE_BACKEND = 'sqlite:positions.db'
+JSONL_COMPACT_RECORDS = 5000    # jsonl: rewrite the log as a snapshot once it holds this many records
+
+# Outbound Telegram queue (see outbox.py)
+OUTBOX_DB = 'outbox.db'
+TELEGRAM_GLOBAL_RATE = 25       # Messages/second across all chats
+TELEGRAM_CHAT_INTERVAL = 1.0    # Seconds between messages to one private chat
+TELEGRAM_GROUP_INTERVAL = 3.0   # Seconds between messages to one group (20/min)
+DIGEST_MIN_SIGNALS = 3          # Pending entry signals per chat merged into one digest
+DIGEST_WINDOW = 2.0             # Seconds an entry signal waits for siblings
+OUTBOX_MAX_ATTEMPTS = 5         # Send attempts before a message is dropped
+
+# Signal charts (needs matplotlib; alerts stay text-only without it)
+CHARTS_ENABLED = True
+CHART_WORKERS = 2               # Render processes
+CHART_CACHE_SIZE = 64           # Rendered PNGs kept in memory
+CHART_CANDLES = 64              # Signal-timeframe candles shown per chart
+
+# Telegram updates: polling unless WEBHOOK_URL is set (see webhook_server.py)
+WEBHOOK_URL = ''                # Public HTTPS URL Telegram posts to, e.g. 'https://bot.example.com/telegram'
+WEBHOOK_LISTEN = '0.0.0.0'
+WEBHOOK_PORT = 8443
+WEBHOOK_PATH = '/telegram'
+WEBHOOK_SECRET = ''             # Empty = random secret per start
+TELEGRAM_CONCURRENT_UPDATES = 16  # Updates handled in parallel
+RESPONSE_CACHE_SIZE = 256       # Rendered command replies kept (/pozisyonlar has one per chat)
+TELEGRAM_API_URL = ''           # Bot API base URL override, e.g. a local fake_bot_api.py
+
+# scan_once.py (one-shot cron / GitHub Actions runs)
+SCAN_ONCE_FETCH_WORKERS = 16    # Concurrent kline requests
+SCAN_ONCE_DEADLINE = 20         # Seconds; pairs not fetched by then are skipped this run
+# scan_once.py tracks every signal as a chat-less position; a store of its own keeps
+# those out of the bot's /pozisyonlar and exit checks when both run side by side
+SCAN_ONCE_STATE_BACKEND = 'sqlite:scan_once.db'
+
+# Decision trace (see ORBAlgo.enable_trace / orb_trace.py)
+ORB_TRACE = False               # Trace the live scanner's algos (adds overhead)
+TRACE_BUFFER_SIZE = 500         # Events kept per algo instance
+
+# Pinned status board in CHAT_ID, edited in place only when a pair's state changes
+STATUS_BOARD_ENABLED = True
+
+# Monte Carlo risk simulation (see risk_sim.py, /risk)
+RISK_SIM_RUNS = 20000           # Simulated paths per method
+RISK_SIM_BATCH = 2000           # Paths per NumPy batch (memory ~ batch * trades * 8 bytes)
+RISK_MAX_TRADES = 1000          # Most recent closed trades used as the ledger
+RISK_MIN_TRADES = 10            # Fewer trades than this: not enough to resample
+RISK_RUIN_DRAWDOWN = 30.0       # Drawdown (percent points) counted as ruin
+
+# Signal latency log: candle close -> fetch -> decision -> persist -> Telegram ack (see latency.py, /gecikme)
+LATENCY_DB = 'latency.db'
+LATENCY_WINDOW_DAYS = 7         # Window of /gecikme percentiles
+
+# Event-loop monitor and scan watchdog (see loop_monitor.py)
+LOOP_MONITOR_INTERVAL = 0.25    # Seconds between lag probes
+LOOP_STALL_THRESHOLD = 1.0      # Loop blocked longer than this is recorded with its stack
+LOOP_STALL_ALERT = 10.0         # Stalls longer than this raise an ops alert
+SCAN_CYCLE_TIMEOUT = 240        # A scan cycle running longer is cancelled (cycles are 5 min apart)
+OPS_CHAT_ID = CHAT_ID           # Where ops alerts go
+OPS_ALERT_COOLDOWN = 600        # Seconds between ops alerts of the same kind
+
+# On-demand profiler (/profil N from an admin chat, or kill -USR1; see profiler.py)
+ADMIN_CHAT_IDS = [CHAT_ID]      # Chats allowed to use admin commands
+PROFILE_INTERVAL = 0.01         # Seconds between stack samples
+PROFILE_DEFAULT_CYCLES = 3
+PROFILE_MAX_CYCLES = 20
+PROFILE_DIR = 'profiles'        # Collapsed stacks (.collapsed) and allocation reports (.alloc.txt)
+
+# Market data endpoint override, e.g. 'http://127.0.0.1:9000/fapi/v1' for fake_exchange.py ('' = Binance)
+BINANCE_API_URL = ''
+
+# Session ranges, downloaded once per symbol after the ORB candle closes (see orb_registry.py)
+ORB_DB = 'orb_levels.db'
+
+# ORB sessions: (name, UTC open 'HH:MM', length in hours). Each gets its own range (the
+# ORB_TIMEFRAME candle at its open, so opens must fall on that timeframe's boundaries),
+# state machine and signals; all are evaluated in one pass over the same candles.
+ORB_SESSIONS = [
+    ('UTC', '00:00', 24),
+    # ('London', '08:00', 8),
+    # ('NewYork', '13:00', 8),
+]
+
+# Logging: calls only enqueue, a background thread writes stdout (see event_log.py, /loglar)
+LOG_LEVEL = 'INFO'
+LOG_JSON = False                # One JSON object per line instead of "[i] message"
+LOG_RING_SIZE = 2000            # Recent events kept in memory
+LOG_COMMAND_LINES = 30          # Events /loglar shows by default
@@ -0,0 +1,147 @@
+"""
+Event Log - Non-blocking structured logging
+Log calls only put the record on a queue; a background thread writes it
+to stdout (as "[i] message" lines or JSON) and into an in-memory ring
+buffer of recent events, so a slow stdout never stalls the event loop.
+Fields passed with extra={...} (symbol, event, ...) stay separate from the
+message and can be filtered on in the ring buffer (/loglar).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+ROOT = 'orb'
+
+PREFIXES = {logging.DEBUG: '[.]', logging.INFO: '[i]', logging.WARNING: '[!]',
+            logging.ERROR: '[!]', logging.CRITICAL: '[!!]'}
+
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_ring: Optional['RingBufferHandler'] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger below the bot's root logger, e.g. get_logger('main') -> 'orb.main'"""
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def fields(record: logging.LogRecord) -> Dict:
+    """The structured fields a record was logged with"""
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD}
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The bot's classic console style: "[i] message  key=value ..." """
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = f"{PREFIXES.get(record.levelno, '[?]')} {record.getMessage()}"
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            **fields(record),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last capacity records as dicts"""
+
+    def __init__(self, capacity: int = 2000):
+        super().__init__()
+        self.records: Deque[Dict] = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord):
+        # handle() holds self.lock here, snapshot() takes the same lock
+        self.records.append({
+            'time': record.created,
+            'level': record.levelname,
+            'levelno': record.levelno,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            **fields(record),
+        })
+
+    def snapshot(self) -> List[Dict]:
+        with self.lock:
+            return list(self.records)
+
+
+def setup(level: str = 'INFO', ring_size: int = 2000, json_output: bool = False, console: bool = True):
+    """
+    Route the bot's loggers through a queue to a background writer. Safe to
+    call again (e.g. from replay.py); the previous writer is stopped first.
+    """
+    global _ring, _listener
+    shutdown()
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    # Don't hand records to the process root logger as well
+    root.propagate = False
+
+    _ring = RingBufferHandler(ring_size)
+    handlers: List[logging.Handler] = [_ring]
+    if console:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter() if json_output else ConsoleFormatter())
+        handlers.append(stream)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+
+
+def shutdown():
+    """Flush and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+def recent(limit: int = 50, min_level: int = logging.DEBUG, match: Optional[str] = None) -> List[Dict]:
+    """
+    Newest ring buffer events, oldest first. match keeps events whose symbol
+    field equals it or whose message contains it (case-insensitive).
+    """
+    if _ring is None:
+        return []
+    events = [e for e in _ring.snapshot() if e['levelno'] >= min_level]
+    if match:
+        needle = match.upper()
+        events = [e for e in events if e.get('symbol') == needle or needle in e['msg'].upper()]
+    return events[-limit:]
+
+
+def format_event(event: Dict) -> str:
+    """One line: time, level letter, message and structured fields"""
+    when = datetime.fromtimestamp(event['time'], tz=timezone.utc).strftime('%H:%M:%S')
+    extra = " ".join(f"{k}={v}" for k, v in event.items()
+                     if k not in ('time', 'level', 'levelno', 'logger', 'msg'))
+    return f"{when} {event['level'][0]} {event['msg']}" + (f"  {extra}" if extra else "")
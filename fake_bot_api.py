@@ -0,0 +1,355 @@
+"""
+Fake Bot API - Local stand-in for api.telegram.org
+Implements the Bot API methods TelegramAlertBot uses, records every outgoing
+call and delivers injected updates through getUpdates or a registered
+webhook, so command round trips can be tested and timed without network.
+
+Usage:
+    python fake_bot_api.py [ROUNDS]   # polling vs webhook round-trip latency
+"""
+import asyncio
+import itertools
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from collections import deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from webhook_server import SECRET_HEADER, read_request, write_response
+
+
+BOT_USER = {'id': 1000, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot',
+            'can_join_groups': True, 'can_read_all_group_messages': False,
+            'supports_inline_queries': False}
+TEST_USER = {'id': 42, 'is_bot': False, 'first_name': 'Test'}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _parse_params(headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+    """Bot API parameters from a form, multipart or JSON body"""
+    content_type = headers.get('content-type', '')
+    if content_type.startswith('multipart/form-data'):
+        message = BytesParser(policy=HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body
+        )
+        params = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            params[name] = part.get_payload(decode=True) if part.get_filename() else part.get_content()
+        return params
+    if content_type.startswith('application/json'):
+        return json.loads(body or b'{}')
+    return {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()}
+
+
+def _json_param(value: Any) -> Any:
+    """Complex parameters arrive JSON-encoded inside form fields"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class FakeBotAPI:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.base_events.Server] = None
+
+        self.webhook_url: Optional[str] = None
+        self.webhook_secret = ''
+        self._webhook_conn: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = None
+        self._webhook_lock = asyncio.Lock()
+
+        self._updates: deque = deque()
+        self._updates_ready = asyncio.Event()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+        # Every outgoing call: {'method', 'params', 'result', 'time'}
+        self.calls: List[Dict] = []
+        self.messages: Dict[int, Dict] = {}
+        # chat id -> pinned message id
+        self.pinned: Dict[int, int] = {}
+        self._waiters: List[Tuple[Callable[[Dict], bool], asyncio.Future]] = []
+        # Called with every outgoing call record (see load_test.py)
+        self.listeners: List[Callable[[Dict], None]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._webhook_conn:
+            self._webhook_conn[1].close()
+            self._webhook_conn = None
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # --- Bot API side ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                _, path, headers, body = request
+                # /bot<token>/<method>
+                method = path.split('?', 1)[0].rsplit('/', 1)[-1]
+                params = _parse_params(headers, body)
+                result = await self._call(method, params)
+                write_response(writer, 200, json.dumps({'ok': True, 'result': result}).encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _call(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == 'getUpdates':
+            return await self._get_updates(params)
+
+        handler = getattr(self, f"_api_{method}", None)
+        result = handler(params) if handler else True
+
+        record = {'method': method, 'params': params, 'result': result, 'time': time.perf_counter()}
+        self.calls.append(record)
+        for listener in self.listeners:
+            listener(record)
+        for predicate, future in list(self._waiters):
+            if not future.done() and predicate(record):
+                future.set_result(record)
+        return result
+
+    def _api_getMe(self, params):
+        return BOT_USER
+
+    def _api_setWebhook(self, params):
+        self.webhook_url = params['url']
+        self.webhook_secret = params.get('secret_token', '')
+        if _json_param(params.get('drop_pending_updates')):
+            self._updates.clear()
+        return True
+
+    def _api_deleteWebhook(self, params):
+        self.webhook_url = None
+        if _json_param(params.get('drop_pending_updates')):
+            self._updates.clear()
+        return True
+
+    def _api_getWebhookInfo(self, params):
+        return {'url': self.webhook_url or '', 'has_custom_certificate': False,
+                'pending_update_count': len(self._updates)}
+
+    @staticmethod
+    def _chat(chat_id: int) -> Dict:
+        return {'id': chat_id, 'type': 'private'} if chat_id > 0 else \
+            {'id': chat_id, 'type': 'group', 'title': 'Test Group'}
+
+    def _new_message(self, params: Dict[str, Any], **content) -> Dict:
+        chat = self._chat(int(params['chat_id']))
+        message = {'message_id': next(self._message_ids), 'date': int(time.time()),
+                   'chat': chat, 'from': BOT_USER, **content}
+        if params.get('reply_markup'):
+            message['reply_markup'] = _json_param(params['reply_markup'])
+        self.messages[message['message_id']] = message
+        return message
+
+    def _api_sendMessage(self, params):
+        return self._new_message(params, text=params['text'])
+
+    def _api_sendPhoto(self, params):
+        photo_id = params['photo'] if isinstance(params['photo'], str) else f"photo-{len(self.messages) + 1}"
+        return self._new_message(params, caption=params.get('caption', ''), photo=[
+            {'file_id': photo_id, 'file_unique_id': photo_id, 'width': 800, 'height': 450}
+        ])
+
+    def _edit(self, params, field: str):
+        message = self.messages[int(params['message_id'])]
+        message[field] = params[field]
+        if params.get('reply_markup'):
+            message['reply_markup'] = _json_param(params['reply_markup'])
+        else:
+            message.pop('reply_markup', None)
+        return message
+
+    def _api_editMessageText(self, params):
+        return self._edit(params, 'text')
+
+    def _api_editMessageCaption(self, params):
+        return self._edit(params, 'caption')
+
+    def _api_getChat(self, params):
+        chat_id = int(params['chat_id'])
+        chat = {**self._chat(chat_id), 'accent_color_id': 0, 'max_reaction_count': 11}
+        if chat_id in self.pinned:
+            chat['pinned_message'] = self.messages[self.pinned[chat_id]]
+        return chat
+
+    def _api_pinChatMessage(self, params):
+        self.pinned[int(params['chat_id'])] = int(params['message_id'])
+        return True
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict]:
+        offset = int(params.get('offset', 0) or 0)
+        while self._updates and self._updates[0]['update_id'] < offset:
+            self._updates.popleft()
+        if not self._updates:
+            self._updates_ready.clear()
+            try:
+                await asyncio.wait_for(self._updates_ready.wait(), float(params.get('timeout', 0) or 0))
+            except asyncio.TimeoutError:
+                pass
+        return list(self._updates)
+
+    # --- Test driver side ---
+
+    async def push_update(self, update: Dict):
+        """Deliver an update the way Telegram would (webhook POST or getUpdates)"""
+        update['update_id'] = next(self._update_ids)
+        if self.webhook_url:
+            status = await self._post_webhook(update)
+            if status != 200:
+                raise RuntimeError(f"Webhook answered {status}")
+        else:
+            self._updates.append(update)
+            self._updates_ready.set()
+
+    async def _post_webhook(self, update: Dict, secret: Optional[str] = None) -> int:
+        """POST one update over a kept-alive connection; returns the HTTP status"""
+        parts = urlsplit(self.webhook_url)
+        body = json.dumps(update).encode()
+        async with self._webhook_lock:
+            if self._webhook_conn is None:
+                self._webhook_conn = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            reader, writer = self._webhook_conn
+            writer.write(
+                f"POST {parts.path or '/'} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"{SECRET_HEADER}: {self.webhook_secret if secret is None else secret}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            if length:
+                await reader.readexactly(length)
+            if not status_line:
+                self._webhook_conn = None
+                raise ConnectionError("Webhook closed the connection")
+            return int(status_line.split()[1])
+
+    def command_update(self, chat_id: int, text: str) -> Dict:
+        command = text.split()[0]
+        chat = {'id': chat_id, 'type': 'private'} if chat_id > 0 else \
+            {'id': chat_id, 'type': 'group', 'title': 'Test Group'}
+        return {'message': {
+            'message_id': next(self._message_ids), 'date': int(time.time()), 'chat': chat,
+            'from': TEST_USER, 'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+        }}
+
+    def callback_update(self, message_id: int, data: str) -> Dict:
+        return {'callback_query': {
+            'id': str(next(self._update_ids)), 'from': TEST_USER, 'chat_instance': '1',
+            'message': self.messages[message_id], 'data': data,
+        }}
+
+    def wait_for(self, predicate: Callable[[Dict], bool]) -> asyncio.Future:
+        """Future resolved by the next outgoing call matching predicate"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((predicate, future))
+        future.add_done_callback(lambda f: self._waiters.remove((predicate, future)))
+        return future
+
+    async def roundtrip(self, chat_id: int, text: str, timeout: float = 10.0) -> float:
+        """Seconds from delivering a command to the bot's reply in that chat"""
+        reply = self.wait_for(lambda call: call['method'] == 'sendMessage'
+                              and int(call['params']['chat_id']) == chat_id)
+        started = time.perf_counter()
+        await self.push_update(self.command_update(chat_id, text))
+        record = await asyncio.wait_for(reply, timeout)
+        return record['time'] - started
+
+
+def _summary(label: str, samples: List[float]) -> str:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return (f"{label:8s} n={len(ms)}  min {ms[0]:.1f}ms  p50 {statistics.median(ms):.1f}ms  "
+            f"p95 {p95:.1f}ms  max {ms[-1]:.1f}ms")
+
+
+async def bench(rounds: int = 50, burst: int = 20):
+    """Compare command round trips in polling and webhook mode"""
+    import config
+    from position_tracker import AsyncPositionTracker
+    from state_store import MemoryPositionStore
+    from telegram_bot import TelegramAlertBot
+
+    api = FakeBotAPI()
+    await api.start()
+    config.TELEGRAM_API_URL = api.url
+    config.OUTBOX_DB = os.path.join(tempfile.mkdtemp(), 'outbox.db')
+    chat_id = 4242
+
+    for mode in ('polling', 'webhook'):
+        if mode == 'webhook':
+            config.WEBHOOK_LISTEN = '127.0.0.1'
+            config.WEBHOOK_PORT = free_port()
+            config.WEBHOOK_URL = f"http://127.0.0.1:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}"
+        else:
+            config.WEBHOOK_URL = ''
+
+        tracker = AsyncPositionTracker(MemoryPositionStore())
+        bot = TelegramAlertBot(position_tracker=tracker)
+        await bot.start()
+        try:
+            samples = [await api.roundtrip(chat_id, '/pozisyonlar') for _ in range(rounds)]
+            print(_summary(mode, samples))
+
+            # Burst: many chats at once, handled concurrently
+            started = time.perf_counter()
+            await asyncio.gather(*(api.roundtrip(chat_id + i + 1, '/yardim') for i in range(burst)))
+            print(f"{'':8s} burst of {burst} commands answered in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+            if mode == 'webhook':
+                status = await api._post_webhook(api.command_update(chat_id, '/yardim'), secret='wrong')
+                print(f"{'':8s} wrong secret token -> HTTP {status}")
+        finally:
+            await bot.stop()
+            await tracker.close()
+
+    await api.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,231 @@
+"""
+Fake Exchange - Local stand-in for the Binance futures REST API
+Serves the /fapi/v1 endpoints BinanceClient uses (klines, ticker/price,
+time) from an in-memory candle archive. Only candles that have opened by
+the current clock.now() are visible, so under a VirtualClock the archive
+plays back like a live market. Archives are either downloaded from
+Binance once (one <SYMBOL>_<interval>.json file per series, raw kline
+arrays) or generated synthetically.
+
+Usage:
+    python fake_exchange.py download DIR YYYY-MM-DD [DAYS]   # archive real candles
+"""
+import asyncio
+import bisect
+import json
+import os
+import random
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import clock
+from orb_algo import timeframe_to_ms
+from webhook_server import read_request, write_response
+
+
+BINANCE_URL = "https://fapi.binance.com/fapi/v1"
+MAX_LIMIT = 1500
+
+# (symbol, interval) -> raw kline arrays sorted by open time
+Archive = Dict[Tuple[str, str], List[list]]
+
+
+def _kline(open_time: int, interval_ms: int, o: float, h: float, l: float, c: float, v: float) -> list:
+    """Raw Binance kline array"""
+    return [open_time, f"{o:.8g}", f"{h:.8g}", f"{l:.8g}", f"{c:.8g}", f"{v:.8g}",
+            open_time + interval_ms - 1, f"{v * c:.8g}", 100, f"{v / 2:.8g}", f"{v * c / 2:.8g}", "0"]
+
+
+def aggregate(base: List[list], interval_ms: int) -> List[list]:
+    """Merge base-interval klines into a longer interval"""
+    merged = []
+    for row in base:
+        open_time = row[0] - row[0] % interval_ms
+        if merged and merged[-1][0] == open_time:
+            last = merged[-1]
+            last[2] = max(last[2], float(row[2]))
+            last[3] = min(last[3], float(row[3]))
+            last[4] = float(row[4])
+            last[5] += float(row[5])
+        else:
+            merged.append([open_time, float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])])
+    return [_kline(t, interval_ms, o, h, l, c, v) for t, o, h, l, c, v in merged]
+
+
+def synthetic_archive(symbols: Sequence[str], start_ms: int, end_ms: int,
+                      intervals: Sequence[str] = ('15m', '1h'), seed: int = 1) -> Archive:
+    """
+    Deterministic random-walk candles. The smallest interval is generated
+    and the others aggregated from it, so the ORB and the signal candles
+    always agree.
+    """
+    intervals = sorted(intervals, key=timeframe_to_ms)
+    base_ms = timeframe_to_ms(intervals[0])
+    archive: Archive = {}
+    for symbol in symbols:
+        rng = random.Random(f"{seed}:{symbol}")
+        price = rng.uniform(1, 1000)
+        base = []
+        for open_time in range(start_ms - start_ms % base_ms, end_ms, base_ms):
+            o = price
+            c = o * (1 + rng.gauss(0, 0.006))
+            h = max(o, c) * (1 + abs(rng.gauss(0, 0.002)))
+            l = min(o, c) * (1 - abs(rng.gauss(0, 0.002)))
+            base.append(_kline(open_time, base_ms, o, h, l, c, rng.uniform(1000, 5000)))
+            price = c
+        archive[(symbol, intervals[0])] = base
+        for interval in intervals[1:]:
+            archive[(symbol, interval)] = aggregate(base, timeframe_to_ms(interval))
+    return archive
+
+
+def load_archive(directory: str) -> Archive:
+    """Read every <SYMBOL>_<interval>.json file of a directory"""
+    archive: Archive = {}
+    for name in os.listdir(directory):
+        if not name.endswith('.json') or '_' not in name:
+            continue
+        symbol, interval = name[:-5].rsplit('_', 1)
+        with open(os.path.join(directory, name)) as f:
+            archive[(symbol, interval)] = sorted(json.load(f), key=lambda row: row[0])
+    return archive
+
+
+def download_archive(directory: str, symbols: Sequence[str], intervals: Sequence[str],
+                     start_ms: int, end_ms: int):
+    """Page through Binance klines for [start_ms, end_ms) and save them as an archive"""
+    import requests
+
+    os.makedirs(directory, exist_ok=True)
+    session = requests.Session()
+    for symbol in symbols:
+        for interval in intervals:
+            rows = []
+            cursor = start_ms
+            while cursor < end_ms:
+                response = session.get(f"{BINANCE_URL}/klines", params={
+                    'symbol': symbol, 'interval': interval, 'startTime': cursor,
+                    'endTime': end_ms - 1, 'limit': MAX_LIMIT,
+                }, timeout=10)
+                response.raise_for_status()
+                page = response.json()
+                if not page:
+                    break
+                rows.extend(page)
+                cursor = page[-1][0] + timeframe_to_ms(interval)
+            with open(os.path.join(directory, f"{symbol}_{interval}.json"), 'w') as f:
+                json.dump(rows, f)
+            print(f"[+] {symbol} {interval}: {len(rows)} candles")
+
+
+class FakeExchange:
+    def __init__(self, archive: Archive, host: str = '127.0.0.1', port: int = 0):
+        self.archive = archive
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._open_times = {key: [row[0] for row in rows] for key, rows in archive.items()}
+        # Endpoint -> requests served
+        self.requests: Counter = Counter()
+
+    @property
+    def url(self) -> str:
+        """Base URL for config.BINANCE_API_URL"""
+        return f"http://{self.host}:{self.port}/fapi/v1"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                parts = urlsplit(request[1])
+                endpoint = parts.path.rsplit('/', 1)[-1]
+                params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                self.requests[endpoint] += 1
+                status, result = self._dispatch(endpoint, params)
+                write_response(writer, status, json.dumps(result).encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, endpoint: str, params: Dict[str, str]) -> Tuple[int, object]:
+        try:
+            if endpoint == 'klines':
+                return 200, self.klines(params['symbol'], params['interval'], int(params.get('limit', 500)),
+                                        _int(params.get('startTime')), _int(params.get('endTime')))
+            if endpoint == 'price':     # /ticker/price
+                return 200, {'symbol': params['symbol'], 'price': self.price(params['symbol']),
+                             'time': clock.now_ms()}
+            if endpoint == 'time':
+                return 200, {'serverTime': clock.now_ms()}
+            if endpoint == 'ping':
+                return 200, {}
+        except KeyError as e:
+            return 400, {'code': -1121, 'msg': f"Invalid symbol or missing parameter {e}."}
+        except ValueError as e:
+            return 400, {'code': -1100, 'msg': str(e)}
+        return 404, {'code': -5000, 'msg': 'Path not found'}
+
+    def klines(self, symbol: str, interval: str, limit: int = 500,
+               start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[list]:
+        """Newest limit candles opened by now (and within start/end), like the live API"""
+        rows = self.archive[(symbol, interval)]
+        open_times = self._open_times[(symbol, interval)]
+        limit = max(1, min(limit, MAX_LIMIT))
+        now = clock.now_ms()
+        end = bisect.bisect_right(open_times, min(end_time, now) if end_time is not None else now)
+        if start_time is not None:
+            start = bisect.bisect_left(open_times, start_time)
+            return rows[start:min(end, start + limit)]
+        return rows[max(0, end - limit):end]
+
+    def price(self, symbol: str) -> str:
+        """Close of the newest visible candle of the symbol's smallest interval"""
+        series = [key for key in self.archive if key[0] == symbol]
+        if not series:
+            raise KeyError(symbol)
+        key = min(series, key=lambda k: timeframe_to_ms(k[1]))
+        visible = self.klines(*key, limit=1)
+        if not visible:
+            raise KeyError(symbol)
+        return visible[-1][4]
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] != 'download':
+        print(__doc__)
+        sys.exit(1)
+    import config
+
+    directory = sys.argv[2]
+    start = datetime.strptime(sys.argv[3], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    days = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    # Two extra days in front for the scanner's candle history
+    start_ms = int((start - timedelta(days=2)).timestamp() * 1000)
+    end_ms = int((start + timedelta(days=days)).timestamp() * 1000)
+    download_archive(directory, config.TRADING_PAIRS, [config.SIGNAL_TIMEFRAME, config.ORB_TIMEFRAME],
+                     start_ms, end_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Latency Log - End-to-end timing of every signal and exit
+Each alert gets one SQLite row with wall-clock timestamps (ms) for the
+candle close, fetch complete, decision, persisted and the Telegram
+acknowledgement (filled in by the outbox once the message is accepted).
+Percentiles per symbol and phase are computed from those rows.
+"""
+import asyncio
+import functools
+import math
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import clock
+
+
+# Phase name -> (start column, end column)
+PHASES = {
+    'scan': ('candle_close', 'fetched'),       # scheduling wait + download
+    'analyze': ('fetched', 'decided'),
+    'persist': ('decided', 'persisted'),
+    'send': ('persisted', 'acked'),            # chart, outbox queue, Bot API
+    'total': ('candle_close', 'acked'),
+}
+
+PERCENTILES = (50, 95, 99)
+
+# Upper bounds (seconds) of the total-latency histogram buckets
+HISTOGRAM_BUCKETS = (5, 15, 30, 60, 120, 300)
+
+
+def now_ms() -> int:
+    return clock.now_ms()
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+class LatencyLog:
+    def __init__(self, db_path: str = "latency.db", retention_days: int = 30):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='latency-db')
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def _db(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS signal_latency (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    candle_close INTEGER NOT NULL,
+                    fetched INTEGER,
+                    decided INTEGER,
+                    persisted INTEGER,
+                    acked INTEGER
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_latency_close ON signal_latency (candle_close)')
+            self._conn.execute('DELETE FROM signal_latency WHERE candle_close < ?',
+                               (now_ms() - self.retention_days * 86400000,))
+            self._conn.commit()
+        return self._conn
+
+    def _insert(self, row: tuple) -> int:
+        conn = self._connect()
+        cursor = conn.execute('''
+            INSERT INTO signal_latency (kind, symbol, candle_close, fetched, decided, persisted)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', row)
+        conn.commit()
+        return cursor.lastrowid
+
+    def _ack(self, ids: List[int], acked: int):
+        conn = self._connect()
+        # First delivery counts; later chats of a fan-out don't move it
+        conn.executemany('UPDATE signal_latency SET acked = ? WHERE id = ? AND acked IS NULL',
+                         [(acked, i) for i in ids])
+        conn.commit()
+
+    def _rows(self, since: int, symbol: Optional[str]) -> List[Dict]:
+        conn = self._connect()
+        sql = '''
+            SELECT symbol, candle_close, fetched, decided, persisted, acked
+            FROM signal_latency WHERE candle_close >= ?
+        '''
+        params = [since]
+        if symbol:
+            sql += ' AND symbol = ?'
+            params.append(symbol)
+        keys = ('symbol', 'candle_close', 'fetched', 'decided', 'persisted', 'acked')
+        return [dict(zip(keys, row)) for row in conn.execute(sql, params).fetchall()]
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def record(self, kind: str, symbol: str, candle_close: int, fetched: Optional[int],
+                     decided: Optional[int], persisted: Optional[int]) -> int:
+        """Store the pipeline timestamps of one alert; returns the id the outbox acks"""
+        return await self._db(self._insert, (kind, symbol, candle_close, fetched, decided, persisted))
+
+    async def mark_acked(self, ids: List[int], acked: int):
+        """Outbox delivery callback"""
+        await self._db(self._ack, ids, acked)
+
+    async def summary(self, days: float = 7, symbol: Optional[str] = None) -> Dict:
+        """
+        Phase percentiles (seconds) over the last days, overall and per
+        symbol, plus a histogram of total latency:
+        {'count', 'phases': {phase: {p: s}}, 'symbols': {sym: {p: s}}, 'histogram': [(label, n)]}
+        """
+        rows = await self._db(self._rows, now_ms() - int(days * 86400000), symbol)
+
+        phases = {}
+        for phase, (start, end) in PHASES.items():
+            values = sorted((r[end] - r[start]) / 1000 for r in rows
+                            if r[start] is not None and r[end] is not None)
+            if values:
+                phases[phase] = {p: percentile(values, p) for p in PERCENTILES}
+
+        totals: Dict[str, List[float]] = {}
+        for r in rows:
+            if r['acked'] is not None:
+                totals.setdefault(r['symbol'], []).append((r['acked'] - r['candle_close']) / 1000)
+        symbols = {}
+        for sym, values in totals.items():
+            values.sort()
+            symbols[sym] = {p: percentile(values, p) for p in PERCENTILES}
+            symbols[sym]['count'] = len(values)
+
+        all_totals = [v for values in totals.values() for v in values]
+        histogram = []
+        lower = 0
+        for upper in HISTOGRAM_BUCKETS:
+            histogram.append((f"{lower}-{upper}s", sum(1 for v in all_totals if lower <= v < upper)))
+            lower = upper
+        histogram.append((f">{lower}s", sum(1 for v in all_totals if v >= lower)))
+
+        return {'count': len(rows), 'acked': len(all_totals), 'phases': phases,
+                'symbols': symbols, 'histogram': histogram}
+
+    async def close(self):
+        await self._db(self._close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,325 @@
+"""
+Load Test - Drive TelegramAlertBot with scripted update streams
+The bot runs unmodified against fake_bot_api.py and a real state backend.
+Each scenario first fans a market-wide burst of entry signals out to every
+chat through the outbox, then pushes an update stream at a fixed rate:
+/girdim floods, storms of "Girdim" button presses (every button pressed
+several times) or both racing each other. The report shows handler latency
+(update delivered -> the bot's answer), throughput, and a check of the
+tracker: every chat must hold exactly one position for each signal it
+confirmed, and must have been told so exactly once.
+
+Usage:
+    python load_test.py [SCENARIO ...] [--chats N] [--signals N] [--repeat N] [--rate N]
+                        [--webhook] [--backend sqlite|jsonl|memory] [--no-limits] [--script FILE]
+        SCENARIO: burst, girdim, buttons, mixed (default: all of them)
+        --script FILE: JSON lines {"chat": 0, "text": "/girdim BTCUSDT"} or {"chat": 0, "press": "BTCUSDT"}
+                       (chat is an index below --chats); replaces the scenario's own stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from typing import Deque, Dict, List, Tuple
+
+import config
+import event_log
+from fake_bot_api import FakeBotAPI, free_port
+from position_tracker import AsyncPositionTracker
+from state_store import open_store
+from telegram_bot import TelegramAlertBot
+
+
+SCENARIOS = ('burst', 'girdim', 'buttons', 'mixed')
+
+# Chat i of the test is FIRST_CHAT_ID + i (private chats)
+FIRST_CHAT_ID = 10001
+
+# Seconds (real time) to wait for the outbox to drain / for the last answers
+DRAIN_TIMEOUT = 60
+ANSWER_TIMEOUT = 30
+
+# One update of a stream: {'chat': index, 'text': command} or {'chat': index, 'press': symbol}
+Step = Dict
+
+
+def _configure(workdir: str, backend: str, limits: bool, webhook: bool):
+    """Point the bot at throwaway state; keep Telegram's rate limits unless told otherwise"""
+    config.STATE_BACKEND = {
+        'sqlite': f"sqlite:{os.path.join(workdir, 'positions.db')}",
+        'jsonl': f"jsonl:{os.path.join(workdir, 'positions.jsonl')}",
+        'memory': 'memory',
+    }[backend]
+    config.OUTBOX_DB = os.path.join(workdir, 'outbox.db')
+    config.TELEGRAM_BOT_TOKEN = '1:load'
+    config.CHAT_ID = FIRST_CHAT_ID
+    config.ADMIN_CHAT_IDS = []
+    if not limits:
+        config.TELEGRAM_GLOBAL_RATE = 1_000_000
+        config.TELEGRAM_CHAT_INTERVAL = 0
+        config.TELEGRAM_GROUP_INTERVAL = 0
+    if webhook:
+        config.WEBHOOK_LISTEN = '127.0.0.1'
+        config.WEBHOOK_PORT = free_port()
+        config.WEBHOOK_URL = f"http://127.0.0.1:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}"
+    else:
+        config.WEBHOOK_URL = ''
+
+
+def scenario_steps(scenario: str, chats: int, symbols: List[str], repeat: int, seed: int = 1) -> List[Step]:
+    """Update stream of a built-in scenario: every chat confirms every signal repeat times, shuffled"""
+    steps = []
+    if scenario == 'burst':
+        return steps
+    for chat in range(chats):
+        for symbol in symbols:
+            for _ in range(repeat):
+                if scenario in ('girdim', 'mixed'):
+                    steps.append({'chat': chat, 'text': f"/girdim {symbol}"})
+                if scenario in ('buttons', 'mixed'):
+                    steps.append({'chat': chat, 'press': symbol})
+    random.Random(seed).shuffle(steps)
+    return steps
+
+
+def load_script(path: str) -> List[Step]:
+    """Read a JSON lines update stream"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentile(ms: List[float], q: float) -> float:
+    return ms[min(len(ms) - 1, int(len(ms) * q))] if ms else 0.0
+
+
+def _peak_rate(times: List[float], window: float = 1.0) -> int:
+    """Most calls within any window seconds"""
+    times = sorted(times)
+    peak = start = 0
+    for end in range(len(times)):
+        while times[end] - times[start] > window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+async def run(scenario: str, steps: List[Step], chats: int = 50, signals: int = 12, rate: float = 500,
+              webhook: bool = False, backend: str = 'sqlite', limits: bool = True) -> Dict:
+    """Run one scenario against a fresh bot and tracker; returns the measurements"""
+    workdir = tempfile.mkdtemp(prefix='orb-load-')
+    _configure(workdir, backend, limits, webhook)
+    api = FakeBotAPI()
+    await api.start()
+    config.TELEGRAM_API_URL = api.url
+
+    chat_ids = [FIRST_CHAT_ID + i for i in range(chats)]
+    tracker = AsyncPositionTracker(open_store(config.STATE_BACKEND, persistent=True))
+    for chat_id in chat_ids:
+        await tracker.add_subscriber(chat_id)
+    bot = TelegramAlertBot(position_tracker=tracker)
+    await bot.start()
+
+    # Market-wide breakout: one entry per pair, fanned out to every chat at once
+    symbols = config.TRADING_PAIRS[:signals]
+    signal_ids: Dict[str, int] = {}
+    started = time.perf_counter()
+    for i, symbol in enumerate(symbols):
+        signal_ids[symbol] = await tracker.add_signal(symbol, 'buy', 100.0 + i, 99.0 + i)
+        await bot.send_entry_signal(symbol, 'buy', 100.0 + i, 99.0 + i, signal_id=signal_ids[symbol])
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    while await bot.outbox.pending() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    burst_wall = time.perf_counter() - started
+    undelivered = await bot.outbox.pending()
+
+    sends = [call for call in api.calls if call['method'] in ('sendMessage', 'sendPhoto')]
+    # (chat, symbol) -> message carrying that signal's "Girdim" button
+    buttons: Dict[Tuple[int, str], int] = {}
+    sends_per_chat: Dict[int, List[float]] = defaultdict(list)
+    for call in sends:
+        chat_id = int(call['params']['chat_id'])
+        sends_per_chat[chat_id].append(call['time'])
+        for row in (call['result'].get('reply_markup') or {}).get('inline_keyboard', []):
+            data = row[0].get('callback_data', '')
+            if data.startswith('confirm_'):
+                buttons[(chat_id, data.split('_')[2])] = call['result']['message_id']
+    gaps = [b - a for times in sends_per_chat.values() for a, b in zip(times, times[1:])]
+
+    # Answers are matched to updates in order per chat (commands) or per message (buttons)
+    waiting: Dict[tuple, Deque[float]] = defaultdict(deque)
+    latencies: List[float] = []
+    acks: Counter = Counter()
+    answered_at = [started]
+
+    def on_call(record: Dict):
+        params = record['params']
+        if record['method'] == 'sendMessage':
+            key = ('text', int(params['chat_id']))
+            note = params['text']
+        elif record['method'] in ('editMessageText', 'editMessageCaption'):
+            key = ('press', int(params['chat_id']), int(params['message_id']))
+            note = (params.get('text') or params.get('caption') or '').rsplit('\n\n', 1)[-1]
+        else:
+            return
+        if waiting[key]:
+            latencies.append(record['time'] - waiting[key].popleft())
+            answered_at[0] = record['time']
+        if note.startswith('✅') and 'onaylandı' in note:
+            acks[key[1]] += 1
+
+    api.listeners.append(on_call)
+
+    expected = set()
+    exact = True
+    pushed = skipped = 0
+    started = time.perf_counter()
+    for n, step in enumerate(steps):
+        delay = started + n / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        chat_id = chat_ids[step['chat']]
+        if 'press' in step:
+            symbol = step['press'].upper()
+            message_id = buttons.get((chat_id, symbol))
+            if message_id is None:
+                skipped += 1
+                continue
+            update = api.callback_update(message_id, f"confirm_{signal_ids[symbol]}_{symbol}")
+            key = ('press', chat_id, message_id)
+            expected.add((chat_id, signal_ids[symbol]))
+        else:
+            args = step['text'].split()
+            if args[0] == '/girdim':
+                symbol = args[1].upper() if len(args) > 1 else None
+                if symbol in signal_ids:
+                    expected.add((chat_id, signal_ids[symbol]))
+                elif symbol is None:
+                    # Confirms whichever signal is newest, so the expected set is unknown
+                    exact = False
+            update = api.command_update(chat_id, step['text'])
+            key = ('text', chat_id)
+        waiting[key].append(time.perf_counter())
+        await api.push_update(update)
+        pushed += 1
+
+    deadline = time.monotonic() + ANSWER_TIMEOUT
+    while any(waiting.values()) and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    stream_wall = max(answered_at[0] - started, 1e-9)
+    unanswered = sum(len(q) for q in waiting.values())
+
+    # Every handler has finished, so reading the store directly is safe here
+    rows = [row for row in tracker.tracker.get_active_rows() if row['confirmed'] and row['chat_id'] is not None]
+    held = Counter((row['chat_id'], row['signal_id']) for row in rows)
+    per_chat = Counter(row['chat_id'] for row in rows)
+    cached = {pos['id'] for pos in tracker.get_confirmed_positions() if pos['chat_id'] is not None}
+
+    await bot.stop()
+    await tracker.close()
+    await api.stop()
+
+    ms = sorted(s * 1000 for s in latencies)
+    return {
+        'scenario': scenario,
+        'chats': chats,
+        'signals': len(symbols),
+        'mode': 'webhook' if webhook else 'polling',
+        'backend': backend,
+        'rate': rate,
+        'burst_wall': burst_wall,
+        'burst_messages': len(sends),
+        'burst_delivered': len(buttons),
+        'burst_expected': chats * len(symbols),
+        'burst_undelivered': undelivered,
+        'burst_min_gap': min(gaps) if gaps else None,
+        'burst_peak': _peak_rate([call['time'] for call in sends]),
+        'pushed': pushed,
+        'skipped': skipped,
+        'answered': len(latencies),
+        'unanswered': unanswered,
+        'stream_wall': stream_wall,
+        'latency': {'p50': _percentile(ms, 0.50), 'p95': _percentile(ms, 0.95),
+                    'p99': _percentile(ms, 0.99), 'max': ms[-1] if ms else 0.0},
+        'held': sum(held.values()),
+        'expected': len(expected),
+        'dropped': len(expected - set(held)),
+        'duplicated': sum(n - 1 for n in held.values() if n > 1),
+        'unexpected': len(set(held) - expected) if exact else None,
+        'double_acks': sum(max(0, acks[chat_id] - per_chat[chat_id]) for chat_id in chat_ids),
+        'silent': sum(max(0, per_chat[chat_id] - acks[chat_id]) for chat_id in chat_ids),
+        'cache_drift': len(cached ^ {row['id'] for row in rows}),
+        'workdir': workdir,
+    }
+
+
+def report(r: Dict):
+    print("=" * 50)
+    print(f"[*] {r['scenario']}: {r['chats']} chats, {r['signals']} signals, {r['pushed']} updates "
+          f"at {r['rate']:g}/s ({r['mode']}, {r['backend']})")
+    gap = f", closest sends to one chat {r['burst_min_gap']:.2f}s apart" if r['burst_min_gap'] is not None else ""
+    print(f"[i] Burst: {r['burst_delivered']}/{r['burst_expected']} signals in {r['burst_messages']} messages, "
+          f"{r['burst_wall']:.2f}s ({r['burst_messages'] / r['burst_wall']:.1f} msg/s, peak {r['burst_peak']}/s){gap}")
+    if r['burst_undelivered']:
+        print(f"[!] {r['burst_undelivered']} messages still in the outbox")
+    if r['pushed']:
+        lat = r['latency']
+        print(f"[i] Handlers: {r['answered']} answered in {r['stream_wall']:.2f}s "
+              f"({r['answered'] / r['stream_wall']:.0f}/s), p50 {lat['p50']:.1f}ms p95 {lat['p95']:.1f}ms "
+              f"p99 {lat['p99']:.1f}ms max {lat['max']:.1f}ms")
+        unexpected = f", {r['unexpected']} unexpected" if r['unexpected'] is not None else ""
+        print(f"[i] Positions: {r['held']} held for {r['expected']} confirmed signals, {r['dropped']} dropped, "
+              f"{r['duplicated']} duplicated{unexpected}")
+        print(f"[i] Acknowledgements: {r['double_acks']} repeated, {r['silent']} missing; "
+              f"{r['cache_drift']} tracker cache mismatches")
+    if r['unanswered']:
+        print(f"[!] {r['unanswered']} updates got no answer within {ANSWER_TIMEOUT}s")
+    if r['skipped']:
+        print(f"[!] {r['skipped']} button presses skipped (button never delivered)")
+    problems = (r['dropped'] + r['duplicated'] + (r['unexpected'] or 0) + r['double_acks'] + r['silent']
+                + r['cache_drift'] + r['unanswered'] + (r['burst_expected'] - r['burst_delivered']))
+    print(f"[{'!' if problems else '+'}] {'FAILED' if problems else 'OK'}")
+
+
+async def _main(args) -> bool:
+    ok = True
+    symbols = config.TRADING_PAIRS[:args.signals]
+    for scenario in args.scenarios or SCENARIOS:
+        if scenario not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario: {scenario} (choose from {', '.join(SCENARIOS)})")
+        steps = load_script(args.script) if args.script else \
+            scenario_steps(scenario, args.chats, symbols, args.repeat)
+        r = await run(scenario, steps, args.chats, args.signals, args.rate, args.webhook, args.backend,
+                      not args.no_limits)
+        report(r)
+        ok = ok and not (r['dropped'] or r['duplicated'] or r['unexpected'] or r['double_acks']
+                         or r['silent'] or r['cache_drift'] or r['unanswered']
+                         or r['burst_delivered'] != r['burst_expected'])
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Telegram bot against a local fake Bot API")
+    parser.add_argument('scenarios', nargs='*', help=f"{', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--chats', type=int, default=50)
+    parser.add_argument('--signals', type=int, default=12, help="Pairs breaking out at once")
+    parser.add_argument('--repeat', type=int, default=3, help="Times every chat confirms every signal")
+    parser.add_argument('--rate', type=float, default=500, help="Updates per second")
+    parser.add_argument('--webhook', action='store_true', help="Deliver updates by webhook instead of getUpdates")
+    parser.add_argument('--backend', choices=('sqlite', 'jsonl', 'memory'), default='sqlite')
+    parser.add_argument('--no-limits', action='store_true', help="Lift the Telegram rate limits in the outbox")
+    parser.add_argument('--script', help="JSON lines update stream to push instead of the scenario's")
+    parser.add_argument('--verbose', action='store_true', help="Show the bot's own output")
+    args = parser.parse_args()
+
+    event_log.setup(config.LOG_LEVEL, config.LOG_RING_SIZE, console=args.verbose)
+    ok = asyncio.run(_main(args))
+    event_log.shutdown()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Loop Monitor - Event-loop lag measurement and stall capture
+A ticker coroutine measures how late the loop wakes it up. A watchdog
+thread notices when the ticker stops running at all and samples the loop
+thread's Python stack at that moment, so every long stall is recorded
+together with the code that was blocking the loop and the phase the
+scanner was in.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional
+
+import event_log
+
+
+log = event_log.get_logger('loop_monitor')
+
+
+class Stall(NamedTuple):
+    started: float          # Wall-clock time the stall was first noticed
+    duration: float         # Seconds the loop was blocked
+    phase: str              # Scanner phase at the time (LoopMonitor.phase)
+    stack: List[str]        # Innermost frames of the loop thread, outermost first
+
+
+def format_stack(frame, limit: int = 8) -> List[str]:
+    return [f"{os.path.basename(fs.filename)}:{fs.lineno} {fs.name}"
+            for fs in traceback.extract_stack(frame)[-limit:]]
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.25, stall_threshold: float = 1.0, history: int = 50,
+                 on_stall: Optional[Callable[[Stall], Awaitable[None]]] = None):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.on_stall = on_stall
+        # What the system is doing right now; set by the scanner
+        self.phase = 'idle'
+
+        self.stalls: Deque[Stall] = deque(maxlen=history)
+        self._lags: Deque[float] = deque(maxlen=1000)
+        self.max_lag = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = time.monotonic()
+        # Stack sampled by the watchdog during the current stall
+        self._lock = threading.Lock()
+        self._pending: Optional[Stall] = None
+
+    async def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            lag = max(0.0, now - expected)
+            self._lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if lag < self.stall_threshold:
+                continue
+
+            stall = Stall(
+                started=pending.started if pending else time.time() - lag,
+                duration=lag,
+                phase=pending.phase if pending else self.phase,
+                stack=pending.stack if pending else [],
+            )
+            self.stalls.append(stall)
+            where = stall.stack[-1] if stall.stack else 'unknown'
+            log.warning("Event loop blocked %.1fs during %s at %s", lag, stall.phase, where,
+                        extra={'event': 'stall', 'phase': stall.phase})
+            if self.on_stall:
+                asyncio.create_task(self.on_stall(stall))
+
+    def _watch(self):
+        """Watchdog thread: sample the loop thread's stack once per stall"""
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._last_tick
+            if blocked < self.stall_threshold:
+                continue
+            with self._lock:
+                if self._pending is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = format_stack(frame) if frame is not None else []
+                self._pending = Stall(time.time() - blocked, blocked, self.phase, stack)
+
+    def stats(self) -> Dict:
+        lags = sorted(self._lags)
+        return {
+            'p50': lags[len(lags) // 2] if lags else 0.0,
+            'p99': lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0,
+            'max': self.max_lag,
+            'stalls': len(self.stalls),
+        }
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (f"Loop lag: p50 {s['p50'] * 1000:.0f}ms, p99 {s['p99'] * 1000:.0f}ms, "
+                f"max {s['max']:.2f}s, {s['stalls']} stalls")
@@ -5,21 +5,38 @@ Combines all modules and runs the trading signal scanner
 import asyncio
 import signal
 import sys
+import time
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
+import clock
 import config
+import event_log
+from analysis_cache import AnalysisCache
 from binance_client import BinanceClient
-from orb_algo import ORBAlgo
-from position_tracker import PositionTracker
+from chart_renderer import ChartRenderer
+from latency import LatencyLog, now_ms
+from loop_monitor import LoopMonitor, Stall
+from orb_algo import ORBAlgo, SessionWindow, active_sessions, adaptive_stop, calculate_ema, timeframe_to_ms
+from orb_registry import ORBLevel, ORBRegistry
+from orb_trace import explain_symbol
+from position_tracker import AsyncPositionTracker
+from profiler import SamplingProfiler
+from scan_pipeline import ScanPipeline, Stage
+from state_store import open_store
 from telegram_bot import TelegramAlertBot
 
 
+log = event_log.get_logger('main')
+
+
 class ORBAlertSystem:
     def __init__(self):
         self.binance = BinanceClient()
-        self.tracker = PositionTracker()
-        self.bot = TelegramAlertBot(position_tracker=self.tracker)
+        self.tracker = AsyncPositionTracker(open_store(config.STATE_BACKEND, persistent=True))
+        self.latency = LatencyLog(config.LATENCY_DB)
+        self.bot = TelegramAlertBot(position_tracker=self.tracker, explain=self.explain, latency=self.latency,
+                                    profile=self.request_profile)
         
         # One ORB algo instance per symbol
         self.algos: Dict[str, ORBAlgo] = {}
@@ -28,19 +45,55 @@ class ORBAlertSystem:
         
         self._running = False
         self._scan_interval = 60  # Check every 60 seconds
-        self._sent_signals = set()  # Track sent signals to avoid duplicates (symbol_direction_date)
+        self.cycles = 0  # Scan cycles started (replay.py reports throughput from it)
+        self._sent_signals = set()  # Track sent signals to avoid duplicates (symbol_session_direction_candle)
+        self.analysis_cache = AnalysisCache()  # Skips refetch/analysis until a new candle closes
+        self.orb_registry = ORBRegistry(config.ORB_DB, config.ORB_TIMEFRAME)  # Each session's range, fetched once
+        self.charts = ChartRenderer(config.CHART_WORKERS, config.CHART_CACHE_SIZE, config.CHART_CANDLES)
+        self.monitor = LoopMonitor(config.LOOP_MONITOR_INTERVAL, config.LOOP_STALL_THRESHOLD,
+                                   on_stall=self._on_stall)
+        # Ops alert kind -> monotonic time it was last sent
+        self._ops_alerted: Dict[str, float] = {}
+        
+        # Off until requested (/profil or SIGUSR1); then covers the next N cycles
+        self.profiler = SamplingProfiler(config.PROFILE_INTERVAL, config.PROFILE_DIR)
+        self._profile_cycles = 0
+        self._profile_chat: Optional[int] = None
+        
+        # fetch -> analyze -> persist -> notify, each stage with its own workers
+        self.pipeline = ScanPipeline([
+            Stage('fetch', self._fetch_stage, config.PIPELINE_FETCH_WORKERS, config.PIPELINE_QUEUE_SIZE),
+            Stage('analyze', self._analyze_stage, config.PIPELINE_ANALYZE_WORKERS, config.PIPELINE_QUEUE_SIZE),
+            Stage('persist', self._persist_stage, config.PIPELINE_PERSIST_WORKERS, config.PIPELINE_QUEUE_SIZE),
+            Stage('notify', self._notify_stage, config.PIPELINE_NOTIFY_WORKERS, config.PIPELINE_QUEUE_SIZE),
+        ])
+    
+    async def explain(self, symbol: str, session_date: Optional[str] = None) -> str:
+        """Decision trace for /neden (fetches candles off the event loop)"""
+        return await asyncio.to_thread(explain_symbol, self.binance, symbol, session_date)
+    
+    def request_profile(self, cycles: int, chat_id: Optional[int] = None):
+        """Profile the next cycles scan cycles; the summary goes to chat_id (default: ops chat)"""
+        self._profile_cycles = max(1, min(cycles, config.PROFILE_MAX_CYCLES))
+        self._profile_chat = chat_id or config.OPS_CHAT_ID
+        log.info("Profiling the next %d scan cycles", self._profile_cycles, extra={'event': 'profile_start'})
+    
+    async def _finish_profile(self):
+        summary = await asyncio.to_thread(self.profiler.stop)
+        log.info("Profile written to %s", ", ".join(summary['files']), extra={'event': 'profile_done'})
+        try:
+            await self.bot.send_profile_summary(self._profile_chat, summary)
+        except Exception as e:
+            log.warning("Profile summary failed: %s", e)
     
     async def start(self):
         """Start the alert system"""
-        print("=" * 50)
-        print("[*] ORB Algo Alert System Starting...")
-        print(f"[i] Tracking {len(config.TRADING_PAIRS)} pairs")
-        print(f"[i] Scan interval: {self._scan_interval}s")
-        print("=" * 50)
+        log.info("ORB Algo Alert System starting: %d pairs, scan interval %ds",
+                 len(config.TRADING_PAIRS), self._scan_interval, extra={'event': 'start'})
         
         # Start Telegram bot (no startup message to avoid spam)
         await self.bot.start()
-        print("[+] Telegram bot started!")
+        await self.monitor.start()
         
         self._running = True
         
@@ -49,26 +102,55 @@ class ORBAlertSystem:
     
     async def stop(self):
         """Stop the system"""
-        print("\n[!] Stopping ORB Alert System...")
+        log.info("Stopping ORB Alert System...", extra={'event': 'stop'})
         self._running = False
+        await self.monitor.stop()
         await self.bot.stop()
-        print("[+] System stopped.")
+        await self.tracker.close()
+        await self.latency.close()
+        await self.orb_registry.close()
+        self.charts.close()
+        log.info("System stopped.")
     
     async def _scan_loop(self):
         """Main scanning loop - scans at 01, 16, 31, 46 minute marks (1 min after candle close)"""
         while self._running:
+            if self._profile_cycles > 0:
+                self.profiler.start()
+                self.profiler.begin_cycle()
+            
+            # The cycle runs as its own task so a hung one can be cancelled
+            cycle = asyncio.create_task(self._scan_cycle())
             try:
-                await self._scan_all_pairs()
-                await self._check_active_positions()
-                
-                # Cleanup old signals
-                self.tracker.cleanup_old_signals(hours=12)
-                
+                done, _ = await asyncio.wait({cycle}, timeout=config.SCAN_CYCLE_TIMEOUT)
+                if done:
+                    cycle.result()
+                else:
+                    phase = self.monitor.phase
+                    cycle.cancel()
+                    try:
+                        await cycle
+                    except asyncio.CancelledError:
+                        pass
+                    log.error("Scan cycle overran %ss during %s, cancelled", config.SCAN_CYCLE_TIMEOUT, phase,
+                              extra={'event': 'scan_timeout', 'phase': phase})
+                    await self._ops_alert('scan_timeout', f"Tarama döngüsü {config.SCAN_CYCLE_TIMEOUT}s "
+                                                          f"sınırını aştı ve iptal edildi (aşama: {phase})")
+            except asyncio.CancelledError:
+                cycle.cancel()
+                raise
             except Exception as e:
-                print(f"[!] Scan error: {e}")
+                log.exception("Scan error: %s", e, extra={'event': 'scan_error'})
+            finally:
+                self.monitor.phase = 'idle'
+                if self.profiler.active:
+                    self.profiler.end_cycle()
+                    self._profile_cycles -= 1
+                    if self._profile_cycles <= 0:
+                        await self._finish_profile()
             
             # Calculate seconds until next scan time (every 5 minutes: 01, 06, 11, 16, 21, 26, 31, 36, 41, 46, 51, 56)
-            now = datetime.now()
+            now = datetime.fromtimestamp(clock.now())
             current_minute = now.minute
             
             # Find next scan minute (every 5 minutes + 1 for candle close buffer)
@@ -90,90 +172,257 @@ class ORBAlertSystem:
                 seconds_until_next = 5 * 60  # Wait full 5 minutes
             
             next_scan = now + timedelta(seconds=seconds_until_next)
-            print(f"[i] Next scan at {next_scan.strftime('%H:%M:%S')} (in {seconds_until_next//60}m {seconds_until_next%60}s)")
+            log.info("Next scan at %s (in %dm %ds)", next_scan.strftime('%H:%M:%S'),
+                     seconds_until_next // 60, seconds_until_next % 60)
             
-            await asyncio.sleep(seconds_until_next)
+            await clock.sleep(seconds_until_next)
+    
+    async def _scan_cycle(self):
+        """One scan: new signals, exits of open positions, cleanup"""
+        self.cycles += 1
+        await self._scan_all_pairs()
+        self.monitor.phase = 'positions'
+        exits = await self._check_active_positions()
+        
+        # The cycle's closes and the cleanup share one transaction, opened
+        # only after every exit was decided (no network I/O while it is open)
+        self.monitor.phase = 'cleanup'
+        async with self.tracker.batch():
+            for decision in exits:
+                decision['results'] = await self.tracker.close_positions(
+                    decision['symbol'], decision['close_price'], decision['kind'])
+            await self.tracker.cleanup_old_signals(hours=12)
+        
+        self.monitor.phase = 'exits'
+        for decision in exits:
+            if decision['results']:
+                await self._notify_exit(decision)
+        log.info(self.monitor.format_stats(), extra={'event': 'loop_stats', **self.monitor.stats()})
+    
+    async def _on_stall(self, stall: Stall):
+        """Loop monitor callback: alert ops about long event-loop stalls"""
+        if stall.duration < config.LOOP_STALL_ALERT:
+            return
+        where = " <- ".join(reversed(stall.stack[-3:])) or "bilinmiyor"
+        await self._ops_alert('loop_stall', f"Event loop {stall.duration:.1f}s bloke oldu "
+                                            f"(aşama: {stall.phase})\n{where}")
+    
+    async def _ops_alert(self, kind: str, text: str):
+        """Send an ops alert, at most one per kind every OPS_ALERT_COOLDOWN seconds"""
+        now = time.monotonic()
+        if now - self._ops_alerted.get(kind, -config.OPS_ALERT_COOLDOWN) < config.OPS_ALERT_COOLDOWN:
+            return
+        self._ops_alerted[kind] = now
+        try:
+            await self.bot.send_ops_alert(text)
+        except Exception as e:
+            log.warning("Ops alert failed: %s", e)
     
     async def _scan_all_pairs(self):
-        """Scan all pairs for new signals"""
-        print(f"\n[*] Scanning {len(config.TRADING_PAIRS)} pairs... [{datetime.now().strftime('%H:%M:%S')}]")
+        """Scan all pairs for new signals through the staged pipeline"""
+        log.info("Scanning %d pairs... [%s]", len(config.TRADING_PAIRS),
+                 datetime.fromtimestamp(clock.now()).strftime('%H:%M:%S'), extra={'event': 'scan_start'})
+        self.monitor.phase = 'pipeline'
         
-        for symbol in config.TRADING_PAIRS:
-            try:
-                await self._scan_pair(symbol)
-            except Exception as e:
-                print(f"   [!] Error scanning {symbol}: {e}")
+        await self.pipeline.run(config.TRADING_PAIRS)
+        if config.STATUS_BOARD_ENABLED:
+            self.monitor.phase = 'status_board'
+            self.bot.update_status_board({symbol: self.algos[symbol].status for symbol in config.TRADING_PAIRS})
+        log.info(self.pipeline.format_stats(), extra={'event': 'pipeline_stats'})
+        log.info(self.analysis_cache.format_stats(), extra={'event': 'cache_stats', **self.analysis_cache.stats()})
+        if self.charts.enabled:
+            log.info(self.charts.format_stats(), extra={'event': 'chart_stats'})
     
-    async def _scan_pair(self, symbol: str):
-        """Scan a single pair for signals"""
-        # Get candle data
-        candles_15m = self.binance.get_klines(symbol, config.SIGNAL_TIMEFRAME, limit=100)
-        candidates_orb = self.binance.get_klines(symbol, config.ORB_TIMEFRAME, limit=50)
+    async def _fetch_stage(self, symbol: str) -> Optional[Dict]:
+        """Pipeline stage 1: download closed candles for a symbol"""
+        # Nothing new has closed since the last analysis - reuse its result
+        cache_key = self.analysis_cache.expected_key(symbol, self.algos[symbol].params_key())
+        cached = self.analysis_cache.get(cache_key)
+        if cached is not None:
+            return {'symbol': symbol, 'cached': cached, 'fetched_at': now_ms()}
         
-        if not candles_15m or not candidates_orb:
-            return
+        # Blocking HTTP runs in a worker thread so other stages keep moving
+        candles_15m, orbs = await asyncio.gather(
+            asyncio.to_thread(self.binance.get_klines, symbol, config.SIGNAL_TIMEFRAME, 100),
+            self._session_orbs(symbol),
+        )
+        fetched_at = now_ms()
+        
+        if not candles_15m:
+            return None
 
         # CANDLE CLOSE LOGIC: Filter to only keep closed candles
         # This prevents "repainting" signals during forming candles
         candles_15m = [c for c in candles_15m if c['is_closed']]
-        candles_orb = [c for c in candidates_orb if c['is_closed']]
 
-        if not candles_15m or not candles_orb:
-            return
+        if not candles_15m:
+            return None
         
-        algo = self.algos[symbol]
-        signal_type, signal_data = algo.analyze(candles_15m, candles_orb)
+        return {'symbol': symbol, 'candles_15m': candles_15m, 'orbs': orbs, 'fetched_at': fetched_at}
+    
+    async def _session_orbs(self, symbol: str) -> List[Tuple[SessionWindow, ORBLevel]]:
+        """
+        Ranges of the open sessions whose ORB candle has closed, from the
+        registry; each ORB candle is downloaded only the first time it's
+        needed. A session whose download failed is left out this cycle (the
+        analysis cache key then differs, so it is retried next cycle).
+        """
+        now = clock.now_ms()
+        orbs = []
+        for window in active_sessions(now):
+            if now < window.orb_end:
+                continue
+            level = await self.orb_registry.get(symbol, window.id)
+            if level is None:
+                # endTime = open time: the newest candle returned is the ORB candle itself
+                candles = await asyncio.to_thread(self.binance.get_klines, symbol, config.ORB_TIMEFRAME, 1,
+                                                  window.start)
+                if not candles or candles[-1]['timestamp'] != window.start or not candles[-1]['is_closed']:
+                    continue
+                level = await self.orb_registry.put(symbol, window.id, window.start,
+                                                    candles[-1]['high'], candles[-1]['low'])
+            orbs.append((window, level))
+        return orbs
+    
+    async def _analyze_stage(self, item: Dict) -> Optional[Dict]:
+        """Pipeline stage 2: run every session's ORB state machine, keep only new entries"""
+        symbol = item['symbol']
+        if 'cached' in item:
+            entries = item['cached']
+        else:
+            algo = self.algos[symbol]
+            if self.profiler.active:
+                self.profiler.snapshot_candles(symbol)
+            orbs = item['orbs']
+            entries = algo.analyze_sessions(item['candles_15m'],
+                                            [(window, level.high, level.low) for window, level in orbs])
+            cache_key = AnalysisCache.key_for(symbol, item['candles_15m'],
+                                              tuple(level.start for _, level in orbs), algo.params_key())
+            self.analysis_cache.put(cache_key, entries)
         
-        if signal_type == 'entry':
-            # Create unique signal key to avoid duplicates
-            from datetime import datetime
-            
-            # Use candle time as unique identifier for this signal
-            candle_time = signal_data.get('candle_time', 0)
-            signal_key = f"{symbol}_{signal_data['direction']}_{candle_time}"
+        signals = []
+        signal_keys = []
+        for signal_data in entries:
+            # Session and candle time identify the signal
+            signal_key = f"{symbol}_{signal_data['session']}_{signal_data['direction']}_{signal_data['candle_time']}"
             
             # Skip if this exact signal was already sent
             if signal_key in self._sent_signals:
-                return
+                continue
             
-            print(f"   [SIGNAL] {symbol}: {signal_data['direction'].upper()} signal (Closed Candle)!")
-            
-            # Mark signal as sent
-            self._sent_signals.add(signal_key)
+            log.info("SIGNAL %s: %s signal, %s session (Closed Candle)!", symbol,
+                     signal_data['direction'].upper(), signal_data['session'],
+                     extra={'event': 'signal', 'symbol': symbol, 'session': signal_data['session'],
+                            'direction': signal_data['direction']})
             
-            # Add to tracker
-            signal_id = self.tracker.add_signal(
-                symbol=symbol,
-                direction=signal_data['direction'],
-                entry_price=signal_data['entry_price'],
-                sl_price=signal_data['sl_price'],
-                orb_high=signal_data.get('orb_high'),
-                orb_low=signal_data.get('orb_low')
+            signals.append(signal_data)
+            signal_keys.append(signal_key)
+        
+        if not signals:
+            return None
+        # Candles ride along for the chart (absent when the result came from cache).
+        # Keys are marked sent by the notify stage, so a cycle cancelled before
+        # delivery leaves its signals for the next one
+        return {'symbol': symbol, 'signals': signals, 'signal_keys': signal_keys,
+                'candles': item.get('candles_15m'), 'fetched_at': item['fetched_at'], 'decided_at': now_ms()}
+    
+    async def _persist_stage(self, item: Dict) -> Optional[Dict]:
+        """Pipeline stage 3: store the signals in the tracker"""
+        item['signal_ids'] = []
+        # A pair's signals are stored together or not at all
+        async with self.tracker.batch():
+            for signal_data in item['signals']:
+                item['signal_ids'].append(await self.tracker.add_signal(
+                    symbol=item['symbol'],
+                    direction=signal_data['direction'],
+                    entry_price=signal_data['entry_price'],
+                    sl_price=signal_data['sl_price'],
+                    orb_high=signal_data.get('orb_high'),
+                    orb_low=signal_data.get('orb_low'),
+                    tp_price=signal_data.get('tp_price')
+                ))
+        item['persisted_at'] = now_ms()
+        return item
+    
+    async def _notify_stage(self, item: Dict) -> None:
+        """Pipeline stage 4: render the charts and send the Telegram notifications"""
+        for signal_data, signal_key, signal_id in zip(item['signals'], item['signal_keys'], item['signal_ids']):
+            latency_id = await self.latency.record(
+                'entry', item['symbol'],
+                signal_data['candle_time'] + timeframe_to_ms(config.SIGNAL_TIMEFRAME),
+                item['fetched_at'], item['decided_at'], item['persisted_at']
             )
-            
-            # Send Telegram notification
+            chart = None
+            if item.get('candles'):
+                chart = await self.charts.render(
+                    item['symbol'], signal_data['candle_time'], 'entry', item['candles'],
+                    direction=signal_data['direction'],
+                    entry_price=signal_data['entry_price'],
+                    sl_price=signal_data['sl_price'],
+                    orb_high=signal_data.get('orb_high'),
+                    orb_low=signal_data.get('orb_low'),
+                    tp_price=signal_data.get('tp_price')
+                )
             await self.bot.send_entry_signal(
-                symbol=symbol,
+                symbol=item['symbol'],
                 direction=signal_data['direction'],
                 entry_price=signal_data['entry_price'],
                 sl_price=signal_data['sl_price'],
                 signal_id=signal_id,
-                candle_time=signal_data.get('candle_time')
+                candle_time=signal_data.get('candle_time'),
+                chart=chart,
+                latency_id=latency_id,
+                tp_price=signal_data.get('tp_price')
             )
+            # Persisted and queued for delivery
+            self._sent_signals.add(signal_key)
+    
+    async def _exit_chart(self, pos: Dict, candle: Dict, candles: List[Dict], kind: str, close_price: float):
+        """Chart for a TP1/SL close of a position"""
+        return await self.charts.render(
+            pos['symbol'], candle['timestamp'], kind, candles,
+            direction=pos['direction'],
+            entry_price=pos['entry_price'],
+            sl_price=pos['sl_price'],
+            orb_high=pos.get('orb_high'),
+            orb_low=pos.get('orb_low'),
+            entry_time=pos['entry_time'],
+            close_price=close_price,
+            tp_price=pos.get('tp_price')
+        )
     
-    async def _check_active_positions(self):
-        """Check active positions for TP1 or SL using Candle Close logic"""
+    async def _check_active_positions(self) -> List[Dict]:
+        """
+        Check active positions for TP1 or SL using Candle Close logic.
+        Only decides: returns the exits for _scan_cycle to close and announce.
+        """
         positions = self.tracker.get_confirmed_positions()
         
+        # One check per symbol no matter how many chats hold it; closes
+        # apply to every chat's copy of the newest position
+        newest: Dict[str, Dict] = {}
         for pos in positions:
+            if pos['symbol'] not in newest or pos['entry_time'] > newest[pos['symbol']]['entry_time']:
+                newest[pos['symbol']] = pos
+        
+        exits = []
+        for pos in newest.values():
             symbol = pos['symbol']
             entry_price = pos['entry_price']
-            sl_price = pos['sl_price']
             is_long = pos['direction'] == 'buy'
             
             try:
                 # Get current candle data - need enough candles for proper EMA calculation
-                candles_15m = self.binance.get_klines(symbol, config.SIGNAL_TIMEFRAME, limit=50)
+                limit = 50
+                if config.ADAPTIVE_SL:
+                    # Every candle since the entry, so the adaptive stop can look back
+                    since_entry = (now_ms() - pos['entry_time']) // timeframe_to_ms(config.SIGNAL_TIMEFRAME)
+                    limit = min(1500, max(limit, since_entry + 50))
+                self.monitor.phase = f"positions:{symbol}"
+                # Blocking HTTP stays off the event loop
+                candles_15m = await asyncio.to_thread(self.binance.get_klines, symbol,
+                                                      config.SIGNAL_TIMEFRAME, limit=limit)
+                fetched_at = now_ms()
                 
                 # Filter for closed candles
                 closed_candles = [c for c in candles_15m if c['is_closed']]
@@ -189,19 +438,18 @@ class ORBAlertSystem:
                 
                 # Calculate EMA for TP check (using closed candles only)
                 hl2 = [(c['high'] + c['low']) / 2 for c in closed_candles]
-                ema_len = min(config.EMA_LENGTH, len(hl2))
+                ema_values = calculate_ema(hl2, config.EMA_LENGTH)
+                ema = ema_values[-1]
                 
-                # Simple SMA/EMA calculation for check
-                # Note: This is an approximation. Ideally orb_algo should handle exits.
-                # But calculating EMA on closed candles is safe.
-                if len(hl2) >= ema_len:
-                    # Calculate EMA
-                    multiplier = 2 / (ema_len + 1)
-                    ema = sum(hl2[:ema_len]) / ema_len
-                    for price in hl2[ema_len:]:
-                         ema = (price - ema) * multiplier + ema
-                else:
-                    ema = sum(hl2) / len(hl2)
+                # Adaptive SL: break-even once a candle after the entry had the EMA in profit
+                # (the candle being checked only moves the stop for the next one)
+                emas_since_entry = [ema_values[i] for i, c in enumerate(closed_candles[:-1])
+                                    if c['close_time'] > pos['entry_time']]
+                sl_price = adaptive_stop(entry_price, pos['sl_price'], is_long, emas_since_entry,
+                                         config.MINIMUM_PROFIT_PERCENT)
+                
+                decision = {'symbol': symbol, 'pos': pos, 'candle': current_candle, 'candles': closed_candles,
+                            'fetched_at': fetched_at}
                 
                 # Check Stop Loss (Wick Logic - matches TradingView)
                 sl_hit = False
@@ -211,49 +459,76 @@ class ORBAlertSystem:
                     sl_hit = True
                 
                 if sl_hit:
-                    print(f"   [SL] {symbol}: Stop Loss triggered (Closed Candle)!")
-                    
-                    # Close position
-                    result = self.tracker.close_position(symbol, current_close, 'sl')
-                    
-                    if result:
-                        await self.bot.send_stoploss_signal(
-                            symbol=symbol,
-                            entry_price=result['entry_price'],
-                            sl_price=result['close_price'],
-                            loss_percent=abs(result['profit_percent'])
-                        )
+                    log.info("SL %s: Stop Loss triggered (Closed Candle)!", symbol,
+                             extra={'event': 'sl', 'symbol': symbol})
+                    exits.append({**decision, 'kind': 'sl', 'close_price': current_close, 'decided_at': now_ms()})
                     continue
                 
-                # Check TP (EMA crossback with profit) - matches Pine Script exactly
-                # Pine: isProfitable = lastORB.entryBullish and ema > lastORB.entryPrice or not lastORB.entryBullish and ema < lastORB.entryPrice
-                is_profitable = (is_long and ema > entry_price) or (not is_long and ema < entry_price)
-                ema_profit_pct = abs(ema - entry_price) / entry_price * 100
-                
-                if is_profitable and ema_profit_pct >= config.MINIMUM_PROFIT_PERCENT:
-                    # Check for EMA crossback
+                tp_price = pos.get('tp_price')
+                if tp_price is not None:
+                    # ATR target (TP_METHOD = 'ATR'): a wick through it fills at the target
+                    tp_hit = (is_long and current_high >= tp_price) or (not is_long and current_low <= tp_price)
+                    close_price = tp_price
+                else:
+                    # Check TP (EMA crossback with profit) - matches Pine Script exactly
+                    # Pine: isProfitable = lastORB.entryBullish and ema > lastORB.entryPrice or not lastORB.entryBullish and ema < lastORB.entryPrice
+                    is_profitable = (is_long and ema > entry_price) or (not is_long and ema < entry_price)
+                    ema_profit_pct = abs(ema - entry_price) / entry_price * 100
                     ema_crossback = (is_long and current_close < ema) or (not is_long and current_close > ema)
-                    
-                    if ema_crossback:
-                        print(f"   [TP1] {symbol}: TP1 triggered (Closed Candle)!")
-                        
-                        result = self.tracker.close_position(symbol, current_close, 'tp1')
-                        
-                        if result:
-                            await self.bot.send_close_signal(
-                                symbol=symbol,
-                                direction=result['direction'],
-                                entry_price=result['entry_price'],
-                                close_price=result['close_price'],
-                                profit_percent=result['profit_percent']
-                            )
-                    
+                    tp_hit = is_profitable and ema_profit_pct >= config.MINIMUM_PROFIT_PERCENT and ema_crossback
+                    close_price = current_close
+                
+                if tp_hit:
+                    log.info("TP1 %s: TP1 triggered (Closed Candle)!", symbol,
+                             extra={'event': 'tp1', 'symbol': symbol})
+                    exits.append({**decision, 'kind': 'tp1', 'close_price': close_price, 'decided_at': now_ms()})
+                
             except Exception as e:
-                print(f"   [!] Error checking {symbol}: {e}")
-
+                log.error("Error checking %s: %s", symbol, e, extra={'event': 'position_error', 'symbol': symbol})
+        
+        return exits
+    
+    async def _notify_exit(self, decision: Dict):
+        """Announce a closed TP1/SL exit to every chat that held the position"""
+        symbol = decision['symbol']
+        candle = decision['candle']
+        results = decision['results']
+        result = results[0]
+        try:
+            latency_id = await self.latency.record(
+                decision['kind'], symbol, candle['close_time'] + 1, decision['fetched_at'],
+                decision['decided_at'], now_ms()
+            )
+            chart = await self._exit_chart(decision['pos'], candle, decision['candles'], decision['kind'],
+                                           decision['close_price'])
+            if decision['kind'] == 'sl':
+                await self.bot.send_stoploss_signal(
+                    symbol=symbol,
+                    entry_price=result['entry_price'],
+                    sl_price=result['close_price'],
+                    loss_percent=abs(result['profit_percent']),
+                    chat_ids=self.bot.chats_for_positions(results),
+                    chart=chart,
+                    latency_id=latency_id
+                )
+            else:
+                await self.bot.send_close_signal(
+                    symbol=symbol,
+                    direction=result['direction'],
+                    entry_price=result['entry_price'],
+                    close_price=result['close_price'],
+                    profit_percent=result['profit_percent'],
+                    chat_ids=self.bot.chats_for_positions(results),
+                    chart=chart,
+                    latency_id=latency_id
+                )
+        except Exception as e:
+            log.error("Error announcing %s exit: %s", symbol, e,
+                      extra={'event': 'position_error', 'symbol': symbol})
 
 async def main():
     """Main entry point"""
+    event_log.setup(config.LOG_LEVEL, config.LOG_RING_SIZE, config.LOG_JSON)
     system = ORBAlertSystem()
     
     # Handle shutdown signals
@@ -263,6 +538,9 @@ async def main():
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    if hasattr(signal, 'SIGUSR1'):
+        # kill -USR1 <pid>: profile the next cycles without a redeploy
+        signal.signal(signal.SIGUSR1, lambda sig, frame: system.request_profile(config.PROFILE_DEFAULT_CYCLES))
     
     try:
         await system.start()
@@ -2,11 +2,41 @@
 ORB Algo Strategy Implementation
 Stateless version - analyzes complete history each scan
 """
-from typing import List, Dict, Optional, Tuple
+from collections import deque
+from functools import cached_property
+from typing import Deque, List, Dict, NamedTuple, Optional, Tuple
 from datetime import datetime, timezone
 import config
 
 
+class TraceEvent(NamedTuple):
+    """One step of the decision trace"""
+    session: Optional[str]   # UTC date of the analyzed session
+    time: Optional[int]      # Candle open time (ms), None for session-level events
+    state: str               # State machine state when the event happened
+    event: str               # scan, skip, orb, inside, breakout, no_breakout, failed_breakout,
+                             # retest, hold, entry, tp1_check, tp1, sl, adaptive_sl, result
+    detail: str
+
+
+def format_trace(events: List[TraceEvent], latest_only: bool = True) -> str:
+    """
+    Human-readable explanation of a trace.
+    latest_only keeps just the last analyze() run (each run starts with a 'scan' event).
+    """
+    events = list(events)
+    if latest_only:
+        starts = [i for i, e in enumerate(events) if e.event == 'scan']
+        if starts:
+            events = events[starts[-1]:]
+    
+    lines = []
+    for e in events:
+        when = datetime.fromtimestamp(e.time / 1000, tz=timezone.utc).strftime('%H:%M') if e.time else '     '
+        lines.append(f"{when} {e.state:<12} {e.event:<15} {e.detail}")
+    return "\n".join(lines)
+
+
 def calculate_ema(prices: List[float], period: int) -> List[float]:
     """Calculate Exponential Moving Average"""
     if len(prices) < period:
@@ -27,11 +57,15 @@ def calculate_ema(prices: List[float], period: int) -> List[float]:
 
 
 def calculate_atr(candles: List[Dict], period: int = 12) -> List[float]:
-    """Calculate Average True Range"""
-    if len(candles) < 2:
-        return [0.0]
+    """
+    Average True Range, one value per candle (Pine's ta.atr: Wilder's
+    smoothing of the true range, seeded with its simple average). The first
+    period - 1 values are the running average of the ranges so far.
+    """
+    if not candles:
+        return []
     
-    true_ranges = []
+    true_ranges = [candles[0]['high'] - candles[0]['low']]
     for i in range(1, len(candles)):
         high = candles[i]['high']
         low = candles[i]['low']
@@ -45,25 +79,106 @@ def calculate_atr(candles: List[Dict], period: int = 12) -> List[float]:
         true_ranges.append(tr)
     
     atr = []
-    if len(true_ranges) >= period:
-        first_atr = sum(true_ranges[:period]) / period
-        atr.append(first_atr)
-        
-        multiplier = 2 / (period + 1)
-        for i in range(period, len(true_ranges)):
-            new_atr = (true_ranges[i] - atr[-1]) * multiplier + atr[-1]
-            atr.append(new_atr)
-    else:
-        atr = [sum(true_ranges) / len(true_ranges)] * len(true_ranges) if true_ranges else [0]
+    total = 0.0
+    for i, tr in enumerate(true_ranges):
+        if i < period:
+            total += tr
+            atr.append(total / (i + 1))
+        else:
+            atr.append((atr[-1] * (period - 1) + tr) / period)
     
     return atr
 
 
+class Indicators:
+    """Indicator series over one candle buffer, each computed on first use"""
+    def __init__(self, candles: List[Dict], ema_length: int, atr_length: int):
+        self.candles = candles
+        self.ema_length = ema_length
+        self.atr_length = atr_length
+    
+    @cached_property
+    def ema(self) -> List[float]:
+        """EMA of hl2 (the breakout and TP1 reference)"""
+        return calculate_ema([(c['high'] + c['low']) / 2 for c in self.candles], self.ema_length)
+    
+    @cached_property
+    def atr(self) -> List[float]:
+        """Only needed for TP_METHOD = 'ATR'"""
+        return calculate_atr(self.candles, self.atr_length)
+
+
+def ema_in_profit(ema: float, entry_price: float, is_long: bool, minimum_profit_percent: float) -> bool:
+    """Pine's isProfitable plus the minimum distance: the EMA is far enough past the entry"""
+    is_profitable = (is_long and ema > entry_price) or (not is_long and ema < entry_price)
+    return is_profitable and abs(ema - entry_price) / entry_price * 100 >= minimum_profit_percent
+
+
+def atr_take_profit(entry_price: float, is_long: bool, atr: float) -> float:
+    """TP1 target for TP_METHOD = 'ATR': TP_ATR_MULTIPLIER x ATR away from the entry"""
+    distance = atr * config.TP_ATR_MULTIPLIER
+    return entry_price + distance if is_long else entry_price - distance
+
+
+def adaptive_stop(entry_price: float, sl_price: float, is_long: bool, emas_since_entry: List[float],
+                  minimum_profit_percent: float) -> float:
+    """
+    Stop of an open trade under ADAPTIVE_SL. emas_since_entry are the EMA
+    values of the closed candles after the entry candle, oldest first;
+    once one of them was in profit the stop sits at the entry (break-even).
+    """
+    if config.ADAPTIVE_SL and any(ema_in_profit(ema, entry_price, is_long, minimum_profit_percent)
+                                  for ema in emas_since_entry):
+        return entry_price
+    return sl_price
+
+
 def get_utc_date(timestamp_ms: int) -> str:
     """Get UTC date string from timestamp"""
     return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).date().isoformat()
 
 
+def timeframe_to_ms(timeframe: str) -> int:
+    """Convert timeframe string (e.g., '15m', '1h') to milliseconds"""
+    if timeframe.endswith('m'):
+        return int(timeframe[:-1]) * 60 * 1000
+    elif timeframe.endswith('h'):
+        return int(timeframe[:-1]) * 60 * 60 * 1000
+    elif timeframe.endswith('d'):
+        return int(timeframe[:-1]) * 24 * 60 * 60 * 1000
+    return 0
+
+
+class SessionWindow(NamedTuple):
+    """One configured ORB session on one day (see config.ORB_SESSIONS)"""
+    id: str          # "<UTC date of the open> <name>", the session's dedupe/registry key
+    name: str
+    start: int       # Session open = ORB candle open time (ms)
+    orb_end: int     # ORB candle close; breakouts count from here
+    end: int         # Session close (ms, exclusive)
+
+
+def session_windows(day_start_ms: int) -> List[SessionWindow]:
+    """The configured sessions opening on the UTC day starting at day_start_ms"""
+    date = get_utc_date(day_start_ms)
+    orb_ms = timeframe_to_ms(config.ORB_TIMEFRAME)
+    windows = []
+    for name, open_at, hours in config.ORB_SESSIONS:
+        hour, minute = map(int, open_at.split(':'))
+        start = day_start_ms + (hour * 60 + minute) * 60 * 1000
+        windows.append(SessionWindow(f"{date} {name}", name, start, start + orb_ms,
+                                     start + int(hours * 3600 * 1000)))
+    return windows
+
+
+def active_sessions(now_ms: int) -> List[SessionWindow]:
+    """Sessions open at now_ms, oldest first (yesterday's may run past midnight)"""
+    day_ms = timeframe_to_ms('1d')
+    today = now_ms - now_ms % day_ms
+    return [w for day in (today - day_ms, today) for w in session_windows(day)
+            if w.start <= now_ms < w.end]
+
+
 def find_todays_orb(candles_orb: List[Dict]) -> Tuple[Optional[float], Optional[float], Optional[int]]:
     """
     Find today's ORB (Opening Range).
@@ -93,57 +208,159 @@ class ORBAlgo:
         self.retests_needed = config.RETESTS_NEEDED
         self.breakout_condition = config.BREAKOUT_CONDITION
         self.sl_method = config.SL_METHOD
+        self.tp_method = config.TP_METHOD
+        self.adaptive_sl = config.ADAPTIVE_SL
         self.minimum_profit_percent = config.MINIMUM_PROFIT_PERCENT
+        
+        # Decision trace ring buffer; None (the default) costs one check per step
+        self.trace: Optional[Deque[TraceEvent]] = None
+        # Where the state machine ended on the last analyze() (see status board)
+        self.status: Optional[Dict] = None
+        # Session id -> that session's status from the last analyze()
+        self.statuses: Dict[str, Dict] = {}
+        if config.ORB_TRACE:
+            self.enable_trace()
+    
+    def enable_trace(self, size: int = None):
+        """Record every decision of analyze() into a ring buffer of the last size events"""
+        self.trace = deque(maxlen=size or config.TRACE_BUFFER_SIZE)
+    
+    def disable_trace(self):
+        self.trace = None
     
     def _parse_timeframe_to_ms(self, timeframe: str) -> int:
         """Convert timeframe string (e.g., '15m', '1h') to milliseconds"""
-        if timeframe.endswith('m'):
-            return int(timeframe[:-1]) * 60 * 1000
-        elif timeframe.endswith('h'):
-            return int(timeframe[:-1]) * 60 * 60 * 1000
-        elif timeframe.endswith('d'):
-            return int(timeframe[:-1]) * 24 * 60 * 60 * 1000
-        return 0
-
-    def analyze(self, candles_signal: List[Dict], candles_orb: List[Dict]) -> Tuple[Optional[str], Optional[Dict]]:
+        return timeframe_to_ms(timeframe)
+    
+    def params_key(self) -> int:
+        """Hash of every setting that can change the analysis result"""
+        return hash((
+            self.ema_length,
+            self.retests_needed,
+            self.breakout_condition,
+            self.sl_method,
+            self.tp_method,
+            self.adaptive_sl,
+            self.minimum_profit_percent,
+            config.ATR_LENGTH,
+            config.TP_ATR_MULTIPLIER,
+            config.ORB_TIMEFRAME,
+            config.SIGNAL_TIMEFRAME,
+            tuple(tuple(session) for session in config.ORB_SESSIONS),
+        ))
+
+    def analyze(self, candles_signal: List[Dict], candles_orb: Optional[List[Dict]] = None,
+                orb: Optional[Tuple[float, float, int]] = None) -> Tuple[Optional[str], Optional[Dict]]:
         """
         Analyze all candles and find if there's a new entry signal.
         This is stateless - analyzes complete history each time.
+        
+        Single-session form of analyze_sessions(): the UTC day whose range
+        comes either from orb (high, low, ORB candle open time) or is looked
+        up in candles_orb. Neither given means the range isn't set yet.
+        """
+        if orb is None and candles_orb is not None:
+            if len(candles_orb) < 10:
+                if self.trace is not None:
+                    self.trace.append(TraceEvent(None, None, 'waiting', 'skip',
+                                                 f"not enough ORB candles ({len(candles_orb)}, need 10)"))
+                self.status = {'state': 'no_data'}
+                self.statuses = {}
+                return None, None
+            orb_high, orb_low, orb_start = find_todays_orb(candles_orb)
+            orb = (orb_high, orb_low, orb_start) if orb_high is not None else None
+        
+        sessions = []
+        if orb is not None:
+            day_start = orb[2] - orb[2] % timeframe_to_ms('1d')
+            window = SessionWindow(f"{get_utc_date(day_start)} UTC", 'UTC', orb[2],
+                                   orb[2] + timeframe_to_ms(config.ORB_TIMEFRAME), day_start + timeframe_to_ms('1d'))
+            sessions.append((window, orb[0], orb[1]))
+        
+        entries = self.analyze_sessions(candles_signal, sessions)
+        if entries:
+            return 'entry', entries[-1]
+        return None, None
+    
+    def analyze_sessions(self, candles_signal: List[Dict],
+                         sessions: List[Tuple[SessionWindow, float, float]]) -> List[Dict]:
+        """
+        Run every session's state machine over one candle buffer and return
+        the sessions' open entries (each tagged with its 'session' id).
+        sessions holds (window, orb_high, orb_low) for each session whose
+        range is set; the indicators are computed at most once, on first
+        use, and shared by all of them.
         """
-        if len(candles_signal) < 50 or len(candles_orb) < 10:
-            return None, None
+        trace = self.trace
+        if trace is not None:
+            last_time = candles_signal[-1]['timestamp'] if candles_signal else None
+            trace.append(TraceEvent(get_utc_date(last_time) if last_time else None, last_time, 'waiting', 'scan',
+                                    f"{len(candles_signal)} signal candles, {len(sessions)} sessions with a range"))
         
-        # Get today's ORB
-        orb_high, orb_low, orb_start_time = find_todays_orb(candles_orb)
-        if orb_high is None:
-            return None, None
+        self.statuses = {}
+        if len(candles_signal) < 50:
+            if trace is not None:
+                trace.append(TraceEvent(None, None, 'waiting', 'skip',
+                                        "not enough candles (need 50)"))
+            self.status = {'state': 'no_data'}
+            return []
         
-        # Get today's date
-        today = get_utc_date(candles_signal[-1]['timestamp'])
+        if not sessions:
+            if trace is not None:
+                trace.append(TraceEvent(None, None, 'waiting', 'skip', "no ORB candle for today yet"))
+            self.status = {'state': 'no_orb', 'last_close': candles_signal[-1]['close']}
+            return []
         
-        # Filter candles to only today's candles AFTER ORB period
-        orb_duration_ms = self._parse_timeframe_to_ms(config.ORB_TIMEFRAME)
-        orb_end_time = orb_start_time + orb_duration_ms
+        # Indicators over the whole buffer, shared by every session
+        indicators = Indicators(candles_signal, self.ema_length, config.ATR_LENGTH)
         
+        entries = []
+        for window, orb_high, orb_low in sessions:
+            status, entry_data = self._run_session(candles_signal, indicators, window, orb_high, orb_low)
+            self.statuses[window.id] = status
+            if entry_data:
+                entries.append(entry_data)
+        
+        # The board shows one state per pair: an open trade first, else the newest session
+        open_trades = [st for st in self.statuses.values() if st['state'] == 'entry_taken']
+        self.status = open_trades[-1] if open_trades else list(self.statuses.values())[-1]
+        return entries
+    
+    def _run_session(self, candles_signal: List[Dict], indicators: Indicators, window: SessionWindow,
+                     orb_high: float, orb_low: float) -> Tuple[Dict, Optional[Dict]]:
+        """One session's state machine; returns its status and its open entry (or None)"""
+        trace = self.trace
+        today = window.id
+        if trace is not None:
+            trace.append(TraceEvent(today, window.start, 'waiting', 'orb',
+                                    f"{window.name} session: high={orb_high:.6g} low={orb_low:.6g}"))
+        
+        # Filter candles to only the session's candles AFTER ORB period
         today_candles = []
         for i, candle in enumerate(candles_signal):
-            if get_utc_date(candle['timestamp']) == today and candle['timestamp'] >= orb_end_time:
+            if window.orb_end <= candle['timestamp'] < window.end:
                 today_candles.append((i, candle))
         
         if len(today_candles) < 2:
-            return None, None
-        
-        # Calculate EMA for all candles
-        hl2 = [(c['high'] + c['low']) / 2 for c in candles_signal]
-        ema_values = calculate_ema(hl2, self.ema_length)
-        atr_values = calculate_atr(candles_signal)
+            if trace is not None:
+                trace.append(TraceEvent(today, None, 'waiting', 'skip',
+                                        f"only {len(today_candles)} candles after the ORB"))
+            return {'state': 'waiting', 'session': today, 'orb_high': orb_high, 'orb_low': orb_low,
+                    'last_close': candles_signal[-1]['close']}, None
         
-        # Simulate the algo logic on today's candles
+        # Simulate the algo logic on the session's candles
         state = 'waiting'  # waiting, in_breakout, entry_taken
         breakout_bullish = None
         breakout_start_idx = None
         retests = 0
         entry_data = None
+        # The day's trade, kept after it closes so the outcome can be reported
+        trade = None
+        exit_reason = None
+        exit_price = None
+        # Current stop of the trade (moves to the entry under ADAPTIVE_SL)
+        stop_price = None
+        ema_values = indicators.ema
         
         for idx, candle in today_candles:
             ema = ema_values[idx]
@@ -162,6 +379,12 @@ class ORBAlgo:
                         breakout_bullish = True
                         breakout_start_idx = idx
                         retests = 0
+                        if trace is not None:
+                            trace.append(TraceEvent(today, candle['timestamp'], 'waiting', 'breakout',
+                                                    f"bullish: close={close:.6g} {self.breakout_condition}={condition_price:.6g} > high={orb_high:.6g}"))
+                    elif trace is not None:
+                        trace.append(TraceEvent(today, candle['timestamp'], state, 'no_breakout',
+                                                f"{self.breakout_condition} above high but close={close:.6g} is not"))
                 elif condition_price < orb_low:
                     # Bearish breakout - but verify close is also below
                     if close < orb_low:
@@ -169,6 +392,15 @@ class ORBAlgo:
                         breakout_bullish = False
                         breakout_start_idx = idx
                         retests = 0
+                        if trace is not None:
+                            trace.append(TraceEvent(today, candle['timestamp'], 'waiting', 'breakout',
+                                                    f"bearish: close={close:.6g} {self.breakout_condition}={condition_price:.6g} < low={orb_low:.6g}"))
+                    elif trace is not None:
+                        trace.append(TraceEvent(today, candle['timestamp'], state, 'no_breakout',
+                                                f"{self.breakout_condition} below low but close={close:.6g} is not"))
+                elif trace is not None:
+                    trace.append(TraceEvent(today, candle['timestamp'], state, 'inside',
+                                            f"close={close:.6g} {self.breakout_condition}={condition_price:.6g}"))
             
             elif state == 'in_breakout':
                 # Check for failed breakout
@@ -176,17 +408,33 @@ class ORBAlgo:
                     state = 'waiting'
                     breakout_bullish = None
                     retests = 0
+                    if trace is not None:
+                        trace.append(TraceEvent(today, candle['timestamp'], 'in_breakout', 'failed_breakout',
+                                                f"close={close:.6g} back below high={orb_high:.6g}"))
                 elif not breakout_bullish and close > orb_low:
                     state = 'waiting'
                     breakout_bullish = None
                     retests = 0
+                    if trace is not None:
+                        trace.append(TraceEvent(today, candle['timestamp'], 'in_breakout', 'failed_breakout',
+                                                f"close={close:.6g} back above low={orb_low:.6g}"))
                 else:
                     # Check for retest (only after breakout bar)
+                    retested = False
                     if idx > breakout_start_idx:
                         if breakout_bullish and close > orb_high and low < orb_high:
                             retests += 1
+                            retested = True
                         elif not breakout_bullish and close < orb_low and high > orb_low:
                             retests += 1
+                            retested = True
+                    if trace is not None:
+                        if retested:
+                            trace.append(TraceEvent(today, candle['timestamp'], state, 'retest',
+                                                    f"{retests}/{self.retests_needed} wick into ORB, close={close:.6g}"))
+                        else:
+                            trace.append(TraceEvent(today, candle['timestamp'], state, 'hold',
+                                                    f"close={close:.6g}, retests {retests}/{self.retests_needed}"))
                     
                     # Check entry condition
                     if retests >= self.retests_needed:
@@ -201,20 +449,33 @@ class ORBAlgo:
                         else:  # Risky
                             sl_price = (center + orb_low) / 2.0 if breakout_bullish else (center + orb_high) / 2.0
                         
+                        tp_price = None
+                        if self.tp_method == 'ATR':
+                            tp_price = atr_take_profit(close, breakout_bullish, indicators.atr[idx])
+                        
                         entry_data = {
                             'direction': 'buy' if breakout_bullish else 'sell',
                             'entry_price': close,
                             'sl_price': sl_price,
+                            'tp_price': tp_price,
                             'orb_high': orb_high,
                             'orb_low': orb_low,
                             'entry_index': idx,
-                            'candle_time': candle['timestamp']
+                            'candle_time': candle['timestamp'],
+                            'session': today
                         }
+                        trade = entry_data
+                        stop_price = sl_price
+                        if trace is not None:
+                            target = f", TP1={tp_price:.6g} (ATR)" if tp_price is not None else ""
+                            trace.append(TraceEvent(today, candle['timestamp'], 'in_breakout', 'entry',
+                                                    f"{'LONG' if breakout_bullish else 'SHORT'} @ {close:.6g}, "
+                                                    f"SL={sl_price:.6g} ({self.sl_method}){target}"))
             
             elif state == 'entry_taken':
-                # EMA CROSSBACK VERSION
+                # EMA CROSSBACK VERSION (or the ATR target with TP_METHOD = 'ATR')
                 entry_price = entry_data['entry_price']
-                sl_price = entry_data['sl_price']
+                tp_price = entry_data['tp_price']
                 is_long = entry_data['direction'] == 'buy'
                 entry_idx = entry_data['entry_index']
                 
@@ -222,32 +483,87 @@ class ORBAlgo:
                 is_profitable = (is_long and ema > entry_price) or (not is_long and ema < entry_price)
                 ema_profit = abs(ema - entry_price) / entry_price * 100
                 
+                if trace is not None:
+                    crossback = (is_long and close < ema) or (not is_long and close > ema)
+                    trace.append(TraceEvent(today, candle['timestamp'], state, 'tp1_check',
+                                            f"ema={ema:.6g} profitable={is_profitable} "
+                                            f"ema_profit={ema_profit:.2f}% (min {self.minimum_profit_percent}%) "
+                                            f"crossback={crossback} bars_since_entry={idx - entry_idx}"))
+                
+                if tp_price is not None:
+                    # TP1: ATR target, filled when a wick reaches it (from the candle after entry)
+                    if idx > entry_idx and ((is_long and high >= tp_price) or (not is_long and low <= tp_price)):
+                        entry_data = None
+                        state = 'closed'
+                        exit_reason, exit_price = 'tp1', tp_price
+                        if trace is not None:
+                            trace.append(TraceEvent(today, candle['timestamp'], 'entry_taken', 'tp1',
+                                                    f"wick {high if is_long else low:.6g} reached TP1={tp_price:.6g}"))
+                
                 # TP1: EMA crossback (at least 2 candles after entry, with minimum profit)
-                if idx > entry_idx + 1 and is_profitable and ema_profit >= self.minimum_profit_percent:
+                elif idx > entry_idx + 1 and is_profitable and ema_profit >= self.minimum_profit_percent:
                     # Check for crossback
                     if (is_long and close < ema) or (not is_long and close > ema):
                         # Position closed by TP1 (profit)
                         entry_data = None
                         state = 'closed'
+                        exit_reason, exit_price = 'tp1', close
+                        if trace is not None:
+                            trace.append(TraceEvent(today, candle['timestamp'], 'entry_taken', 'tp1',
+                                                    f"close={close:.6g} crossed back over ema={ema:.6g}"))
                 
                 # SL check (if not already closed)
                 if entry_data and state == 'entry_taken':
-                    if is_long and low < sl_price:  # Pine uses < (strict)
+                    if is_long and low < stop_price:  # Pine uses < (strict)
                         entry_data = None  # Position closed by SL
                         state = 'closed'
-                    elif not is_long and high > sl_price:  # Pine uses > (strict)
+                    elif not is_long and high > stop_price:  # Pine uses > (strict)
                         entry_data = None  # Position closed by SL
                         state = 'closed'
+                    if state == 'closed':
+                        exit_reason, exit_price = 'sl', stop_price
+                    if trace is not None and state == 'closed':
+                        wick = low if is_long else high
+                        trace.append(TraceEvent(today, candle['timestamp'], 'entry_taken', 'sl',
+                                                f"wick {wick:.6g} through SL={stop_price:.6g}"))
+                
+                # Adaptive SL: once the EMA is in profit, the stop sits at the entry from the next candle on
+                if (state == 'entry_taken' and self.adaptive_sl and stop_price != entry_price
+                        and is_profitable and ema_profit >= self.minimum_profit_percent):
+                    stop_price = entry_price
+                    if trace is not None:
+                        trace.append(TraceEvent(today, candle['timestamp'], state, 'adaptive_sl',
+                                                f"ema_profit={ema_profit:.2f}%, SL moved to entry {entry_price:.6g}"))
             
             elif state == 'closed':
                 # Position already closed, no signal to send
                 pass
         
-        # Return entry if one was found today AND position is still open
+        status = {
+            'state': state,
+            'session': today,
+            'orb_high': orb_high,
+            'orb_low': orb_low,
+            'retests': retests,
+            'breakout_bullish': breakout_bullish,
+            'direction': trade['direction'] if trade else None,
+            'entry_price': trade['entry_price'] if trade else None,
+            'sl_price': stop_price,
+            'tp_price': trade['tp_price'] if trade else None,
+            'exit_reason': exit_reason,
+            'exit_price': exit_price,
+            'last_close': candles_signal[-1]['close'],
+        }
+        
+        # Return entry if one was found in the session AND position is still open
         if entry_data and state == 'entry_taken':
-            return 'entry', entry_data
+            if trace is not None:
+                trace.append(TraceEvent(today, None, state, 'result', "entry signal (position still open)"))
+            return status, entry_data
         
-        return None, None
+        if trace is not None:
+            trace.append(TraceEvent(today, None, state, 'result', "no open entry"))
+        return status, None
     
     def reset_session(self):
         """No-op for stateless implementation"""
@@ -0,0 +1,123 @@
+"""
+ORB Registry - Each session's opening range, computed once
+The range of a session is fixed as soon as its ORB candle closes, so it is
+downloaded once per symbol and session, stored in SQLite and served from
+memory for the rest of the session. The stored rows double as a history
+of session ranges for analytics.
+"""
+import asyncio
+import functools
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import clock
+
+
+# Sessions kept in memory (a few days of every configured session)
+MEMORY_SESSIONS = 16
+
+
+class ORBLevel(NamedTuple):
+    session: str     # Session id ("<UTC date> <name>", see orb_algo.SessionWindow)
+    start: int       # ORB candle open time (ms)
+    high: float
+    low: float
+
+
+class ORBRegistry:
+    def __init__(self, db_path: str = "orb_levels.db", timeframe: str = '1h'):
+        self.db_path = db_path
+        self.timeframe = timeframe
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='orb-db')
+        self._conn: Optional[sqlite3.Connection] = None
+        # session -> symbol -> level, for the most recently used sessions
+        self._levels: Dict[str, Dict[str, ORBLevel]] = {}
+        self._load_lock = asyncio.Lock()
+
+    async def _db(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS orb_levels (
+                    symbol TEXT NOT NULL,
+                    session TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    orb_start INTEGER NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    recorded INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, session, timeframe)
+                )
+            ''')
+            self._conn.commit()
+        return self._conn
+
+    def _load(self, session: str) -> List[tuple]:
+        conn = self._connect()
+        return conn.execute('''
+            SELECT symbol, session, orb_start, high, low FROM orb_levels
+            WHERE session = ? AND timeframe = ?
+        ''', (session, self.timeframe)).fetchall()
+
+    def _insert(self, symbol: str, level: ORBLevel):
+        conn = self._connect()
+        conn.execute('''
+            INSERT OR REPLACE INTO orb_levels (symbol, session, timeframe, orb_start, high, low, recorded)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (symbol, level.session, self.timeframe, level.start, level.high, level.low, clock.now_ms()))
+        conn.commit()
+
+    def _history(self, symbol: Optional[str], limit: int) -> List[Dict]:
+        conn = self._connect()
+        sql = 'SELECT symbol, session, orb_start, high, low FROM orb_levels WHERE timeframe = ?'
+        params = [self.timeframe]
+        if symbol:
+            sql += ' AND symbol = ?'
+            params.append(symbol)
+        sql += ' ORDER BY orb_start DESC, symbol LIMIT ?'
+        params.append(limit)
+        keys = ('symbol', 'session', 'orb_start', 'high', 'low')
+        return [dict(zip(keys, row)) for row in conn.execute(sql, params).fetchall()]
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def get(self, symbol: str, session: str) -> Optional[ORBLevel]:
+        """Level of symbol's session, or None until put(); hits the database once per session"""
+        if session not in self._levels:
+            async with self._load_lock:
+                if session not in self._levels:
+                    # New session (or first call after a restart)
+                    rows = await self._db(self._load, session)
+                    self._levels[session] = {row[0]: ORBLevel(*row[1:]) for row in rows}
+                    while len(self._levels) > MEMORY_SESSIONS:
+                        del self._levels[next(iter(self._levels))]
+        return self._levels[session].get(symbol)
+
+    async def put(self, symbol: str, session: str, start: int, high: float, low: float) -> ORBLevel:
+        """Record a session's range once its ORB candle has closed"""
+        level = ORBLevel(session, start, high, low)
+        await self._db(self._insert, symbol, level)
+        if session in self._levels:
+            self._levels[session][symbol] = level
+        return level
+
+    async def history(self, symbol: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Stored ranges, newest session first, with width in percent of the low"""
+        rows = await self._db(self._history, symbol, limit)
+        for row in rows:
+            row['width'] = (row['high'] - row['low']) / row['low'] * 100 if row['low'] else 0.0
+        return rows
+
+    async def close(self):
+        await self._db(self._close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,68 @@
+"""
+ORB Trace - Explain why the algo did (or didn't) signal for a symbol
+Replays one day's sessions through a traced ORBAlgo and prints every
+decision: ORB levels, breakouts, failed breakouts, retests, entry, TP1/SL
+checks.
+
+Usage: python orb_trace.py SYMBOL [YYYY-MM-DD]
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import clock
+import config
+from binance_client import BinanceClient
+from orb_algo import ORBAlgo, active_sessions, format_trace, session_windows, timeframe_to_ms
+
+
+def explain_symbol(binance: BinanceClient, symbol: str, session_date: Optional[str] = None) -> str:
+    """
+    Decision trace for symbol's sessions on session_date (UTC, YYYY-MM-DD),
+    or today's sessions when omitted. Blocking: fetches candles from Binance.
+    """
+    end_time = None
+    if session_date:
+        day = datetime.strptime(session_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        end_time = int((day + timedelta(days=1)).timestamp() * 1000) - 1
+        day_start = int(day.timestamp() * 1000)
+        windows = session_windows(day_start)
+    else:
+        now = clock.now_ms()
+        day_start = now - now % timeframe_to_ms('1d')
+        # Today's sessions plus yesterday's that are still running, like the scanner
+        windows = {w.id: w for w in session_windows(day_start) + active_sessions(now)}
+        windows = sorted(windows.values(), key=lambda w: w.start)
+
+    # Closed candles only: the scanner never acts on the forming one
+    candles_signal = [c for c in binance.get_klines(symbol, config.SIGNAL_TIMEFRAME, 100, end_time=end_time)
+                      if c['is_closed']]
+    candles_orb = binance.get_klines(symbol, config.ORB_TIMEFRAME, 50, end_time=end_time)
+
+    # Sessions whose ORB candle has closed
+    orb_candles = {c['timestamp']: c for c in candles_orb if c['is_closed']}
+    sessions = [(window, orb_candles[window.start]['high'], orb_candles[window.start]['low'])
+                for window in windows if window.start in orb_candles]
+
+    algo = ORBAlgo()
+    algo.enable_trace()
+    entries = algo.analyze_sessions(candles_signal, sessions)
+
+    result = ", ".join(f"{e['session']} {e['direction']}" for e in entries) or 'no signal'
+    session = session_date or datetime.fromtimestamp(day_start / 1000, tz=timezone.utc).date().isoformat()
+    header = f"{symbol} {session} ({config.SIGNAL_TIMEFRAME}, ORB {config.ORB_TIMEFRAME}) -> {result}"
+    return header + "\n" + format_trace(algo.trace)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    symbol = sys.argv[1].upper()
+    session_date = sys.argv[2] if len(sys.argv) > 2 else None
+    print(explain_symbol(BinanceClient(), symbol, session_date))
+
+
+if __name__ == "__main__":
+    main()
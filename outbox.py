@@ -0,0 +1,433 @@
+"""
+Outbox - Durable, rate-limited outbound message queue
+Messages are written to SQLite before sending and deleted once Telegram
+accepts them, so nothing queued is lost across restarts. A sender task
+drains the queue within global and per-chat rate limits and merges bursts
+of signals for the same chat into one digest message.
+Attached images are stored once per media key and, after the first upload,
+re-sent by Telegram file_id.
+"""
+import asyncio
+import functools
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import clock
+import event_log
+
+
+log = event_log.get_logger('outbox')
+
+
+MAX_MESSAGE_LENGTH = 4096
+
+# Unreferenced media is kept this long so late re-sends can reuse the file_id
+MEDIA_RETENTION_MS = 24 * 60 * 60 * 1000
+
+
+class RateLimiter:
+    """Token bucket shared by all senders"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Outbox:
+    def __init__(self, send: Callable[[int, str, Optional[List], Union[str, bytes, None]], Awaitable[Optional[str]]],
+                 db_path: str = "outbox.db",
+                 global_rate: float = 25.0,
+                 chat_interval: float = 1.0,
+                 group_interval: float = 3.0,
+                 digest_min: int = 3,
+                 digest_window: float = 2.0,
+                 max_attempts: int = 5,
+                 permanent_errors: Tuple = (),
+                 on_delivered: Optional[Callable[[List[int], int], Awaitable[None]]] = None):
+        """
+        Args:
+            send: coroutine (chat_id, text, buttons, photo) that delivers one
+                message; photo is PNG bytes or a file_id, and the return value
+                is the file_id Telegram assigned to an uploaded photo
+            global_rate: messages per second across all chats
+            chat_interval / group_interval: min seconds between messages to
+                one private chat / group chat
+            digest_min: pending digestible messages for a chat that get
+                merged into one digest
+            digest_window: seconds digestible messages wait for siblings
+            permanent_errors: exception types that drop a message immediately
+            on_delivered: coroutine (latency ids, ack time ms) called after
+                Telegram accepted messages that were enqueued with a latency_id
+        """
+        self._send = send
+        self.db_path = db_path
+        self.limiter = RateLimiter(global_rate)
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.digest_min = digest_min
+        self.digest_window = digest_window
+        self.max_attempts = max_attempts
+        self.permanent_errors = permanent_errors
+        self.on_delivered = on_delivered
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='outbox-db')
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # chat_id -> monotonic time the chat may receive its next message
+        self._chat_ready: Dict[int, float] = {}
+        # media key -> Telegram file_id of an already uploaded image
+        self._file_ids: Dict[str, str] = {}
+        self._last_prune = 0.0
+
+        self.sent = 0
+        self.digests = 0
+        self.failed = 0
+
+    # --- DB (runs on the outbox thread) ---
+
+    async def _db(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                buttons TEXT,
+                digest_line TEXT,
+                digest_buttons TEXT,
+                created_at INTEGER NOT NULL,
+                not_before INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                media_key TEXT,
+                latency_id INTEGER
+            )
+        ''')
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(outbox)')}
+        if 'media_key' not in columns:
+            self._conn.execute('ALTER TABLE outbox ADD COLUMN media_key TEXT')
+        if 'latency_id' not in columns:
+            self._conn.execute('ALTER TABLE outbox ADD COLUMN latency_id INTEGER')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS outbox_media (
+                key TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                file_id TEXT,
+                created_at INTEGER NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_not_before ON outbox (not_before)')
+        self._conn.commit()
+
+    def _insert(self, rows: List[Tuple], media: Optional[Tuple[str, bytes, int]] = None):
+        if media:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO outbox_media (key, data, created_at) VALUES (?, ?, ?)', media
+            )
+        self._conn.executemany('''
+            INSERT INTO outbox (chat_id, text, buttons, digest_line, digest_buttons, created_at, not_before,
+                                media_key, latency_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        self._conn.commit()
+
+    def _fetch_due(self, now_ms: int) -> List[Dict]:
+        cursor = self._conn.execute('''
+            SELECT id, chat_id, text, buttons, digest_line, digest_buttons, attempts, media_key, latency_id
+            FROM outbox WHERE not_before <= ? ORDER BY id
+        ''', (now_ms,))
+        keys = ('id', 'chat_id', 'text', 'buttons', 'digest_line', 'digest_buttons', 'attempts', 'media_key',
+                'latency_id')
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+    def _load_media(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        row = self._conn.execute('SELECT data, file_id FROM outbox_media WHERE key = ?', (key,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def _store_file_id(self, key: str, file_id: str):
+        self._conn.execute('UPDATE outbox_media SET file_id = ? WHERE key = ?', (file_id, key))
+        self._conn.commit()
+
+    def _prune_media(self, cutoff_ms: int):
+        self._conn.execute('''
+            DELETE FROM outbox_media
+            WHERE created_at < ? AND key NOT IN (SELECT media_key FROM outbox WHERE media_key IS NOT NULL)
+        ''', (cutoff_ms,))
+        self._conn.commit()
+
+    def _next_due(self, after_ms: int) -> Optional[int]:
+        """Earliest not_before of the rows that weren't due yet at after_ms"""
+        return self._conn.execute('SELECT MIN(not_before) FROM outbox WHERE not_before > ?',
+                                  (after_ms,)).fetchone()[0]
+
+    def _delete(self, ids: List[int]):
+        self._conn.executemany('DELETE FROM outbox WHERE id = ?', [(i,) for i in ids])
+        self._conn.commit()
+
+    def _reschedule(self, ids: List[int], not_before: int, count_attempt: bool):
+        self._conn.executemany(
+            'UPDATE outbox SET not_before = ?, attempts = attempts + ? WHERE id = ?',
+            [(not_before, 1 if count_attempt else 0, i) for i in ids]
+        )
+        self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- Public API ---
+
+    async def start(self):
+        """Open the outbox and start draining it (including leftovers from a previous run)"""
+        await self._db(self._open)
+        pending = await self._db(self._count)
+        if pending:
+            log.info("Outbox: %d messages pending from previous run", pending)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sending; unsent messages stay in the outbox"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._db(self._close)
+        self._executor.shutdown(wait=True)
+
+    async def enqueue(self, chat_ids: Iterable[int], text: str, buttons: Optional[List] = None,
+                      digest_line: Optional[str] = None, digest_buttons: Optional[List] = None,
+                      photo: Optional[Tuple[str, bytes]] = None, latency_id: Optional[int] = None):
+        """
+        Persist one message per chat. Messages with a digest_line wait
+        digest_window seconds so a burst can be merged into one digest
+        (digests are text-only). photo is (media key, PNG bytes); the
+        image is stored once no matter how many chats receive it.
+        latency_id is handed to on_delivered when Telegram accepts the message.
+        """
+        now = int(time.time() * 1000)
+        not_before = now + int(self.digest_window * 1000) if digest_line else now
+        buttons_json = json.dumps(buttons) if buttons else None
+        digest_buttons_json = json.dumps(digest_buttons) if digest_buttons else None
+        media_key = photo[0] if photo else None
+        rows = [(chat_id, text, buttons_json, digest_line, digest_buttons_json, now, not_before, media_key,
+                 latency_id) for chat_id in chat_ids]
+        if rows:
+            media = (photo[0], photo[1], now) if photo else None
+            await self._db(self._insert, rows, media)
+            self._wakeup.set()
+
+    async def pending(self) -> int:
+        """Messages still waiting in the outbox"""
+        return await self._db(self._count)
+
+    def stats(self) -> Dict:
+        return {'sent': self.sent, 'digests': self.digests, 'failed': self.failed}
+
+    # --- Sender ---
+
+    def _interval_for(self, chat_id: int) -> float:
+        # Telegram allows ~20 messages/min per group and ~1/s per private
+        # chat; group chat ids are negative
+        return self.group_interval if chat_id < 0 else self.chat_interval
+
+    def _plan(self, rows: List[Dict]) -> List[Tuple[int, str, Optional[List], List[int], Optional[str]]]:
+        """Pick at most one outgoing message per ready chat: (chat, text, buttons, row ids, media key)"""
+        by_chat: Dict[int, List[Dict]] = {}
+        for row in rows:
+            by_chat.setdefault(row['chat_id'], []).append(row)
+
+        now = time.monotonic()
+        plan = []
+        for chat_id, chat_rows in by_chat.items():
+            if self._chat_ready.get(chat_id, 0) > now:
+                continue
+
+            digestible = [r for r in chat_rows if r['digest_line']]
+            if len(digestible) >= self.digest_min:
+                plan.append(self._build_digest(chat_id, digestible))
+            else:
+                row = chat_rows[0]
+                buttons = json.loads(row['buttons']) if row['buttons'] else None
+                plan.append((chat_id, row['text'], buttons, [row['id']], row['media_key']))
+        return plan
+
+    def _build_digest(self, chat_id: int, rows: List[Dict]) -> Tuple[int, str, Optional[List], List[int], None]:
+        """Merge as many digestible rows as fit into one message"""
+        footer = "\nPozisyona girdiyseniz butona tıklayın veya /girdim PARİTE yazın"
+        lines, buttons, ids = [], [], []
+        for row in rows:
+            candidate = "\n".join(lines + [row['digest_line']])
+            if lines and len(candidate) + len(footer) + 64 > MAX_MESSAGE_LENGTH:
+                break
+            lines.append(row['digest_line'])
+            ids.append(row['id'])
+            row_buttons = row['digest_buttons'] or row['buttons']
+            if row_buttons:
+                buttons.extend(json.loads(row_buttons))
+
+        header = f"📢 <b>{len(ids)} yeni sinyal</b>\n\n"
+        return chat_id, header + "\n".join(lines) + "\n" + footer, buttons or None, ids, None
+
+    async def pace(self, chat_id: int):
+        """
+        Wait for a send slot to chat_id for a call made outside the queue
+        (e.g. editing a pinned message), under the same per-chat and
+        global limits as queued messages
+        """
+        while True:
+            delay = self._chat_ready.get(chat_id, 0) - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self.limiter.acquire()
+        self._chat_ready[chat_id] = time.monotonic() + self._interval_for(chat_id)
+
+    def hold(self, chat_id: int, seconds: float):
+        """Keep chat_id blocked for seconds (Telegram flood control)"""
+        self._chat_ready[chat_id] = max(self._chat_ready.get(chat_id, 0), time.monotonic() + seconds)
+
+    async def _photo_for(self, media_key: Optional[str]) -> Union[str, bytes, None]:
+        """file_id if the image was uploaded before, else its bytes"""
+        if not media_key:
+            return None
+        if media_key in self._file_ids:
+            return self._file_ids[media_key]
+        data, file_id = await self._db(self._load_media, media_key)
+        if file_id:
+            self._file_ids[media_key] = file_id
+            return file_id
+        return data
+
+    async def _deliver(self, chat_id: int, text: str, buttons: Optional[List], ids: List[int],
+                       media_key: Optional[str], attempts: int, latency_ids: List[int]):
+        photo = await self._photo_for(media_key)
+        await self.limiter.acquire()
+        self._chat_ready[chat_id] = time.monotonic() + self._interval_for(chat_id)
+        try:
+            file_id = await self._send(chat_id, text, buttons, photo)
+        except self.permanent_errors as e:
+            log.warning("Outbox: dropping message to %s: %s", chat_id, e, extra={'chat_id': chat_id})
+            self.failed += len(ids)
+            await self._db(self._delete, ids)
+            return
+        except Exception as e:
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after is not None:
+                # Flood control: hold the whole chat, don't count as a failure
+                delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+                self.hold(chat_id, delay)
+                await self._db(self._reschedule, ids, int((time.time() + delay) * 1000), False)
+                return
+
+            if attempts + 1 >= self.max_attempts:
+                log.error("Outbox: giving up on message to %s: %s", chat_id, e, extra={'chat_id': chat_id})
+                self.failed += len(ids)
+                await self._db(self._delete, ids)
+            else:
+                backoff = 2 ** attempts * 5
+                log.warning("Outbox: send to %s failed (%s), retry in %ds", chat_id, e, backoff,
+                            extra={'chat_id': chat_id})
+                await self._db(self._reschedule, ids, int((time.time() + backoff) * 1000), True)
+            return
+
+        self.sent += 1
+        if len(ids) > 1:
+            self.digests += 1
+        if media_key and file_id and media_key not in self._file_ids:
+            self._file_ids[media_key] = file_id
+            await self._db(self._store_file_id, media_key, file_id)
+        await self._db(self._delete, ids)
+        if latency_ids and self.on_delivered:
+            try:
+                # Stamped on the bot clock so it lines up with the candle close
+                await self.on_delivered(latency_ids, clock.now_ms())
+            except Exception as e:
+                log.warning("Outbox: delivery callback failed: %s", e)
+
+    async def _run(self):
+        while True:
+            try:
+                fetched_ms = int(time.time() * 1000)
+                rows = await self._db(self._fetch_due, fetched_ms)
+                plan = self._plan(rows)
+
+                # Upload each new image once; other chats wait a pass and
+                # then reuse its file_id
+                uploading = set()
+                batch = []
+                for entry in plan:
+                    media_key = entry[4]
+                    if media_key and media_key not in self._file_ids:
+                        if media_key in uploading:
+                            continue
+                        uploading.add(media_key)
+                    batch.append(entry)
+                plan = batch
+
+                if plan:
+                    attempts = {row['id']: row['attempts'] for row in rows}
+                    latency = {row['id']: row['latency_id'] for row in rows if row['latency_id'] is not None}
+                    await asyncio.gather(*(
+                        self._deliver(chat_id, text, buttons, ids, media_key, max(attempts[i] for i in ids),
+                                      [latency[i] for i in ids if i in latency])
+                        for chat_id, text, buttons, ids, media_key in plan
+                    ))
+                    continue
+
+                if time.monotonic() - self._last_prune > 3600:
+                    self._last_prune = time.monotonic()
+                    await self._db(self._prune_media, int(time.time() * 1000) - MEDIA_RETENTION_MS)
+
+                # Nothing sendable now: sleep until the next due message,
+                # the next chat becomes ready, or a new enqueue
+                timeout = 60.0
+                next_due = await self._db(self._next_due, fetched_ms)
+                if next_due is not None:
+                    timeout = next_due / 1000 - time.time()
+                if rows:
+                    # Due rows left over are only waiting on per-chat pacing
+                    ready = min(self._chat_ready.get(r['chat_id'], 0) for r in rows)
+                    timeout = min(timeout, ready - time.monotonic())
+                timeout = max(0.05, timeout)
+                self._wakeup.clear()
+                # asyncio.wait (unlike wait_for) never swallows a stop() cancel
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait({waiter}, timeout=timeout)
+                finally:
+                    waiter.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception("Outbox error: %s", e)
+                await asyncio.sleep(5)
@@ -2,23 +2,397 @@
 Position Tracker - Tracks active positions that user has entered
 Uses SQLite for persistence
 """
+import asyncio
+import functools
 import sqlite3
 import json
-from datetime import datetime
-from typing import Optional, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple
 from pathlib import Path
 
+import clock
+import event_log
+
+
+log = event_log.get_logger('position_tracker')
+
+
+# Bumped whenever the table layout changes; stored in PRAGMA user_version.
+# v1: original layout with ISO text timestamps
+# v2: epoch-ms integer timestamps, secondary indexes, stats_rollup table
+# v3: equity/drawdown in stats_rollup, stats_breakdown and equity_curve tables
+# v4: per-chat positions (chat_id/signal_id) and subscriber tables
+# v5: tp_price (fixed take-profit target, TP_METHOD = 'ATR') on active positions
+SCHEMA_VERSION = 5
+
+# Dimensions kept in stats_breakdown (bucket values are UTC, by entry time)
+BREAKDOWN_DIMENSIONS = ('symbol', 'weekday', 'hour')
+
+# Statements are module constants so the connection's statement cache
+# (keyed by SQL text) reuses the compiled form in persistent mode.
+SQL_INSERT_SIGNAL = '''
+    INSERT INTO active_positions (symbol, direction, entry_price, sl_price, tp_price, orb_high, orb_low, entry_time,
+                                  confirmed)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+'''
+SQL_CONFIRM_BY_ID = 'UPDATE active_positions SET confirmed = 1 WHERE id = ?'
+SQL_CONFIRM_LATEST_FOR_SYMBOL = '''
+    UPDATE active_positions SET confirmed = 1 
+    WHERE symbol = ? AND confirmed = 0 
+    ORDER BY entry_time DESC LIMIT 1
+'''
+SQL_CONFIRM_LATEST = '''
+    UPDATE active_positions SET confirmed = 1 
+    WHERE confirmed = 0 
+    ORDER BY entry_time DESC LIMIT 1
+'''
+# Pending signal rows have chat_id NULL. Confirming from a chat inserts a
+# confirmed copy with that chat_id and signal_id -> the pending row, so every
+# chat gets its own position while the signal stays open for other chats.
+SQL_CONFIRM_COPY_FOR_CHAT = '''
+    INSERT OR IGNORE INTO active_positions
+    (symbol, direction, entry_price, sl_price, tp_price, orb_high, orb_low, entry_time, confirmed, chat_id, signal_id)
+    SELECT symbol, direction, entry_price, sl_price, tp_price, orb_high, orb_low, entry_time, 1, ?, id
+    FROM active_positions WHERE id = ? AND confirmed = 0 AND chat_id IS NULL
+'''
+# Latest pending signal this chat has not confirmed yet and whose symbol
+# passes the chat's filter (no filter rows = all symbols)
+SQL_LATEST_PENDING_FOR_CHAT = '''
+    SELECT a.id FROM active_positions a
+    WHERE a.confirmed = 0 AND a.chat_id IS NULL
+      AND (:symbol IS NULL OR a.symbol = :symbol)
+      AND NOT EXISTS (
+          SELECT 1 FROM active_positions c WHERE c.signal_id = a.id AND c.chat_id = :chat_id)
+      AND (NOT EXISTS (SELECT 1 FROM subscriber_symbols f WHERE f.chat_id = :chat_id)
+           OR EXISTS (SELECT 1 FROM subscriber_symbols f
+                      WHERE f.chat_id = :chat_id AND f.symbol = a.symbol))
+    ORDER BY a.entry_time DESC LIMIT 1
+'''
+ACTIVE_COLUMNS = ('id', 'symbol', 'direction', 'entry_price', 'sl_price', 'tp_price', 'orb_high', 'orb_low',
+                  'entry_time', 'confirmed', 'chat_id', 'signal_id')
+SQL_SELECT_ACTIVE = f'''
+    SELECT {', '.join(ACTIVE_COLUMNS)}
+    FROM active_positions
+'''
+SQL_SELECT_ACTIVE_BY_ID = SQL_SELECT_ACTIVE + ' WHERE id = ?'
+SQL_SELECT_CONFIRMED = '''
+    SELECT id, symbol, direction, entry_price, sl_price, orb_high, orb_low, entry_time, chat_id, tp_price
+    FROM active_positions WHERE confirmed = 1
+'''
+SQL_SELECT_CONFIRMED_FOR_CHAT = SQL_SELECT_CONFIRMED + ' AND chat_id = ?'
+SQL_SELECT_PENDING = '''
+    SELECT id, symbol, direction, entry_price, sl_price, entry_time
+    FROM active_positions WHERE confirmed = 0
+'''
+# Every chat's copy of the newest open signal for a symbol
+SQL_SELECT_OPEN_GROUP_FOR_SYMBOL = '''
+    SELECT id, symbol, direction, entry_price, sl_price, entry_time, chat_id, signal_id
+    FROM active_positions
+    WHERE symbol = :symbol AND confirmed = 1 AND COALESCE(signal_id, id) = (
+        SELECT COALESCE(signal_id, id) FROM active_positions
+        WHERE symbol = :symbol AND confirmed = 1
+        ORDER BY entry_time DESC LIMIT 1)
+'''
+SQL_INSERT_CLOSED = '''
+    INSERT INTO closed_positions 
+    (symbol, direction, entry_price, close_price, profit_percent, close_type, entry_time, close_time,
+     chat_id, signal_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_UPSERT_SUBSCRIBER = '''
+    INSERT INTO subscribers (chat_id, subscribed_at) VALUES (?, ?)
+    ON CONFLICT (chat_id) DO NOTHING
+'''
+SQL_DELETE_ACTIVE = 'DELETE FROM active_positions WHERE id = ?'
+# A closed group's signal row, so a late /girdim can't confirm a finished trade
+SQL_DELETE_PENDING_SIGNAL = 'DELETE FROM active_positions WHERE id = ? AND confirmed = 0'
+SQL_CLEANUP_PENDING = '''
+    DELETE FROM active_positions 
+    WHERE confirmed = 0 AND entry_time < ?
+'''
+# Equity is the running sum of profit_percent. SQLite evaluates every SET
+# expression against the old row, so peak/drawdown see the pre-trade equity.
+SQL_UPDATE_ROLLUP = '''
+    UPDATE stats_rollup SET
+        wins = wins + :win, losses = losses + :loss,
+        win_profit = win_profit + :win_profit, loss_amount = loss_amount + :loss_amount,
+        total_profit = total_profit + :profit,
+        equity = equity + :profit,
+        peak_equity = MAX(peak_equity, equity + :profit),
+        max_drawdown = MAX(max_drawdown, MAX(peak_equity, equity + :profit) - (equity + :profit))
+    WHERE id = 1
+'''
+SQL_APPEND_EQUITY = '''
+    INSERT INTO equity_curve (closed_id, close_time, equity, drawdown)
+    SELECT ?, ?, equity, peak_equity - equity FROM stats_rollup WHERE id = 1
+'''
+SQL_UPSERT_BREAKDOWN = '''
+    INSERT INTO stats_breakdown (dimension, bucket, trades, wins, total_profit, win_profit, loss_amount)
+    VALUES (?, ?, 1, ?, ?, ?, ?)
+    ON CONFLICT (dimension, bucket) DO UPDATE SET
+        trades = trades + 1,
+        wins = wins + excluded.wins,
+        total_profit = total_profit + excluded.total_profit,
+        win_profit = win_profit + excluded.win_profit,
+        loss_amount = loss_amount + excluded.loss_amount
+'''
+SQL_SELECT_ROLLUP = '''
+    SELECT wins, losses, win_profit, loss_amount, total_profit, equity, peak_equity, max_drawdown
+    FROM stats_rollup WHERE id = 1
+'''
+SQL_SELECT_BREAKDOWN = '''
+    SELECT bucket, trades, wins, total_profit, win_profit, loss_amount
+    FROM stats_breakdown WHERE dimension = ?
+'''
+
+
+def breakdown_buckets(symbol: str, entry_time: int) -> List[Tuple[str, str]]:
+    """(dimension, bucket) pairs a closed trade is counted under"""
+    entry = datetime.fromtimestamp(entry_time / 1000, tz=timezone.utc)
+    return [
+        ('symbol', symbol),
+        ('weekday', str(entry.weekday())),   # 0 = Monday
+        ('hour', f"{entry.hour:02d}"),
+    ]
+
+
+def summarize_stats(wins: int, losses: int, win_profit: float, loss_amount: float,
+                    total_profit: float) -> Dict:
+    """Derived metrics shared by get_stats and get_breakdown"""
+    total_trades = wins + losses
+    return {
+        'total_trades': total_trades,
+        'wins': wins,
+        'losses': losses,
+        'winrate': (wins / total_trades * 100) if total_trades > 0 else 0,
+        'total_profit': total_profit,
+        # None when there are no losing trades yet (infinite profit factor)
+        'profit_factor': (win_profit / -loss_amount) if loss_amount < 0 else None,
+        'expectancy': (total_profit / total_trades) if total_trades > 0 else 0,
+        'avg_win': (win_profit / wins) if wins else 0,
+        'avg_loss': (loss_amount / losses) if losses else 0,
+    }
+
+
+def now_ms() -> int:
+    """Current time as epoch milliseconds (virtual during a replay)"""
+    return clock.now_ms()
+
+
+def iso_to_ms(value: str) -> int:
+    """Convert a legacy ISO timestamp (naive = local time) to epoch milliseconds"""
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
 
 class PositionTracker:
-    def __init__(self, db_path: str = "positions.db"):
+    def __init__(self, db_path: str = "positions.db", persistent: bool = False):
+        """
+        Args:
+            db_path: SQLite database file
+            persistent: Keep one WAL-mode connection open instead of
+                connecting per call; enables batch() transactions
+        """
         self.db_path = db_path
+        self.persistent = persistent
+        self._conn: Optional[sqlite3.Connection] = None
+        self._batch_depth = 0
+        self._batch_failed = False
+        
+        if persistent:
+            # check_same_thread=False: the connection may be handed to a
+            # worker thread, callers serialize access themselves
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=128)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            # NORMAL is durable in WAL mode except for the last commit on power loss
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        
         self._init_db()
     
+    @contextmanager
+    def _cursor(self):
+        """Yield a cursor and commit afterwards (deferred while batching)"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                yield conn.cursor()
+                conn.commit()
+            finally:
+                conn.close()
+            return
+        
+        try:
+            yield self._conn.cursor()
+        except Exception:
+            if self._batch_depth == 0:
+                self._conn.rollback()
+            else:
+                # A half-applied write dooms the whole batch
+                self._batch_failed = True
+            raise
+        if self._batch_depth == 0:
+            self._conn.commit()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group every write made inside the block into a single transaction,
+        rolled back if the block raises. Only has an effect in persistent
+        mode; nested blocks join the outer one.
+        """
+        self.begin_batch()
+        try:
+            yield self
+        except BaseException:
+            self.end_batch(ok=False)
+            raise
+        self.end_batch()
+    
+    def begin_batch(self):
+        """Open a batch (see batch()); must be paired with end_batch()"""
+        if self._conn is not None:
+            self._batch_depth += 1
+    
+    def end_batch(self, ok: bool = True):
+        """
+        Close a batch. The outermost one commits, or rolls back if any
+        nested block failed (ok=False) or a write inside it raised.
+        """
+        if self._conn is None:
+            return
+        self._batch_depth -= 1
+        self._batch_failed = self._batch_failed or not ok
+        if self._batch_depth == 0:
+            if self._batch_failed:
+                self._conn.rollback()
+            else:
+                self._conn.commit()
+            self._batch_failed = False
+    
+    def close(self):
+        """Close the persistent connection"""
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+    
     def _init_db(self):
-        """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Initialize database tables, migrating older layouts in place"""
+        with self._cursor() as cursor:
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            legacy = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'active_positions'"
+            ).fetchone()
+            
+            if legacy and version < 2:
+                # Rebuilds every table in the current layout
+                self._migrate_to_v2(cursor)
+            else:
+                if legacy and version < 3:
+                    self._migrate_to_v3(cursor)
+                if legacy and version < 4:
+                    self._migrate_to_v4(cursor)
+                if legacy and version < 5:
+                    self._migrate_to_v5(cursor)
+                self._create_tables(cursor)
+                if legacy and version < 3:
+                    self._rebuild_rollups(cursor)
+            
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    
+    def _migrate_to_v2(self, cursor: sqlite3.Cursor):
+        """Convert ISO text timestamps to epoch ms and build indexes/rollups"""
+        log.info("Migrating positions database to schema v2...")
+        cursor.execute('ALTER TABLE active_positions RENAME TO active_positions_v1')
+        cursor.execute('ALTER TABLE closed_positions RENAME TO closed_positions_v1')
+        self._create_tables(cursor)
+        
+        cursor.execute('''
+            SELECT id, symbol, direction, entry_price, sl_price, orb_high, orb_low, entry_time, confirmed
+            FROM active_positions_v1
+        ''')
+        active = [row[:7] + (iso_to_ms(row[7]), row[8]) for row in cursor.fetchall()]
+        cursor.executemany('''
+            INSERT INTO active_positions
+            (id, symbol, direction, entry_price, sl_price, orb_high, orb_low, entry_time, confirmed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', active)
+        
+        cursor.execute('''
+            SELECT id, symbol, direction, entry_price, close_price, profit_percent, close_type, entry_time, close_time
+            FROM closed_positions_v1
+        ''')
+        closed = [row[:7] + (iso_to_ms(row[7]), iso_to_ms(row[8])) for row in cursor.fetchall()]
+        cursor.executemany('''
+            INSERT INTO closed_positions
+            (id, symbol, direction, entry_price, close_price, profit_percent, close_type, entry_time, close_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', closed)
+        
+        cursor.execute('DROP TABLE active_positions_v1')
+        cursor.execute('DROP TABLE closed_positions_v1')
+        self._rebuild_rollups(cursor)
+        log.info("Migrated %d active and %d closed positions", len(active), len(closed))
+    
+    def _migrate_to_v3(self, cursor: sqlite3.Cursor):
+        """Add equity/drawdown columns (new tables come from _create_tables)"""
+        log.info("Migrating positions database to schema v3...")
+        for column in ('equity', 'peak_equity', 'max_drawdown'):
+            cursor.execute(f'ALTER TABLE stats_rollup ADD COLUMN {column} REAL NOT NULL DEFAULT 0')
+    
+    def _migrate_to_v4(self, cursor: sqlite3.Cursor):
+        """Add chat ownership columns; existing rows stay chat-less (legacy)"""
+        log.info("Migrating positions database to schema v4...")
+        cursor.execute('ALTER TABLE active_positions ADD COLUMN chat_id INTEGER')
+        cursor.execute('ALTER TABLE active_positions ADD COLUMN signal_id INTEGER')
+        cursor.execute('ALTER TABLE closed_positions ADD COLUMN chat_id INTEGER')
+        cursor.execute('ALTER TABLE closed_positions ADD COLUMN signal_id INTEGER')
+    
+    def _migrate_to_v5(self, cursor: sqlite3.Cursor):
+        """Add the take-profit target; existing positions keep the EMA exit (NULL)"""
+        log.info("Migrating positions database to schema v5...")
+        cursor.execute('ALTER TABLE active_positions ADD COLUMN tp_price REAL')
+    
+    def _rebuild_rollups(self, cursor: sqlite3.Cursor):
+        """Recompute every rollup by replaying closed_positions in close order"""
+        cursor.execute('DELETE FROM stats_rollup')
+        cursor.execute('DELETE FROM stats_breakdown')
+        cursor.execute('DELETE FROM equity_curve')
+        cursor.execute('INSERT INTO stats_rollup (id) VALUES (1)')
         
+        # Chats closing the same signal share one close event (one trade)
+        cursor.execute('''
+            SELECT MIN(id), symbol, profit_percent, entry_time, close_time
+            FROM closed_positions
+            GROUP BY COALESCE(signal_id, -id)
+            ORDER BY close_time, MIN(id)
+        ''')
+        for closed_id, symbol, profit_percent, entry_time, close_time in cursor.fetchall():
+            self._record_close(cursor, closed_id, symbol, profit_percent, entry_time, close_time)
+    
+    def _record_close(self, cursor: sqlite3.Cursor, closed_id: int, symbol: str,
+                      profit_percent: float, entry_time: int, close_time: int):
+        """Fold one closed trade into the rollup tables"""
+        is_win = profit_percent > 0
+        win_profit = profit_percent if is_win else 0
+        loss_amount = 0 if is_win else profit_percent
+        
+        cursor.execute(SQL_UPDATE_ROLLUP, {
+            'win': 1 if is_win else 0,
+            'loss': 0 if is_win else 1,
+            'win_profit': win_profit,
+            'loss_amount': loss_amount,
+            'profit': profit_percent,
+        })
+        cursor.execute(SQL_APPEND_EQUITY, (closed_id, close_time))
+        cursor.executemany(SQL_UPSERT_BREAKDOWN, [
+            (dimension, bucket, 1 if is_win else 0, profit_percent, win_profit, loss_amount)
+            for dimension, bucket in breakdown_buckets(symbol, entry_time)
+        ])
+    
+    def _create_tables(self, cursor: sqlite3.Cursor):
+        """Create the current schema"""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS active_positions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,10 +402,26 @@ class PositionTracker:
                 sl_price REAL NOT NULL,
                 orb_high REAL,
                 orb_low REAL,
-                entry_time TEXT NOT NULL,
-                confirmed INTEGER DEFAULT 0
+                entry_time INTEGER NOT NULL,
+                confirmed INTEGER DEFAULT 0,
+                chat_id INTEGER,
+                signal_id INTEGER,
+                tp_price REAL
             )
         ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_active_symbol_confirmed_time
+            ON active_positions (symbol, confirmed, entry_time)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_active_chat_confirmed_time
+            ON active_positions (chat_id, confirmed, entry_time)
+        ''')
+        # One position per (signal, chat): repeated confirmations are no-ops
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_active_signal_chat
+            ON active_positions (signal_id, chat_id)
+        ''')
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS closed_positions (
@@ -42,70 +432,143 @@ class PositionTracker:
                 close_price REAL NOT NULL,
                 profit_percent REAL NOT NULL,
                 close_type TEXT NOT NULL,
-                entry_time TEXT NOT NULL,
-                close_time TEXT NOT NULL
+                entry_time INTEGER NOT NULL,
+                close_time INTEGER NOT NULL,
+                chat_id INTEGER,
+                signal_id INTEGER
             )
         ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_closed_close_time
+            ON closed_positions (close_time)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_closed_chat_time
+            ON closed_positions (chat_id, close_time)
+        ''')
         
-        conn.commit()
-        conn.close()
-    
-    def add_signal(self, symbol: str, direction: str, entry_price: float, 
-                   sl_price: float, orb_high: float = None, orb_low: float = None) -> int:
-        """Add a new unconfirmed signal"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Chats that receive signals; symbol filter rows are optional
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS subscribers (
+                chat_id INTEGER PRIMARY KEY,
+                subscribed_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS subscriber_symbols (
+                chat_id INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                PRIMARY KEY (chat_id, symbol)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_subscriber_symbols_symbol
+            ON subscriber_symbols (symbol)
+        ''')
         
+        # Single-row running totals, updated together with each close
         cursor.execute('''
-            INSERT INTO active_positions (symbol, direction, entry_price, sl_price, orb_high, orb_low, entry_time, confirmed)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
-        ''', (symbol, direction, entry_price, sl_price, orb_high, orb_low, datetime.now().isoformat()))
+            CREATE TABLE IF NOT EXISTS stats_rollup (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0,
+                win_profit REAL NOT NULL DEFAULT 0,
+                loss_amount REAL NOT NULL DEFAULT 0,
+                total_profit REAL NOT NULL DEFAULT 0,
+                equity REAL NOT NULL DEFAULT 0,
+                peak_equity REAL NOT NULL DEFAULT 0,
+                max_drawdown REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO stats_rollup (id) VALUES (1)')
         
-        position_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Per-symbol / weekday / hour totals, one row per bucket
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_breakdown (
+                dimension TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                trades INTEGER NOT NULL DEFAULT 0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                total_profit REAL NOT NULL DEFAULT 0,
+                win_profit REAL NOT NULL DEFAULT 0,
+                loss_amount REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, bucket)
+            )
+        ''')
         
-        return position_id
+        # Equity after each closed trade (append-only)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS equity_curve (
+                closed_id INTEGER PRIMARY KEY,
+                close_time INTEGER NOT NULL,
+                equity REAL NOT NULL,
+                drawdown REAL NOT NULL
+            )
+        ''')
     
-    def confirm_position(self, symbol: str = None, position_id: int = None) -> bool:
-        """Confirm user has entered the position"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if position_id:
-            cursor.execute('UPDATE active_positions SET confirmed = 1 WHERE id = ?', (position_id,))
-        elif symbol:
-            cursor.execute('''
-                UPDATE active_positions SET confirmed = 1 
-                WHERE symbol = ? AND confirmed = 0 
-                ORDER BY entry_time DESC LIMIT 1
-            ''', (symbol,))
-        else:
-            # Confirm most recent unconfirmed position
-            cursor.execute('''
-                UPDATE active_positions SET confirmed = 1 
-                WHERE confirmed = 0 
-                ORDER BY entry_time DESC LIMIT 1
-            ''')
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+    def add_signal(self, symbol: str, direction: str, entry_price: float, 
+                   sl_price: float, orb_high: float = None, orb_low: float = None,
+                   entry_time: int = None, tp_price: float = None) -> int:
+        """Add a new unconfirmed signal (tp_price only for a fixed take-profit target)"""
+        if entry_time is None:
+            entry_time = now_ms()
+        with self._cursor() as cursor:
+            cursor.execute(SQL_INSERT_SIGNAL, (symbol, direction, entry_price, sl_price, tp_price, orb_high,
+                                               orb_low, entry_time))
+            return cursor.lastrowid
     
-    def get_confirmed_positions(self) -> List[Dict]:
-        """Get all confirmed active positions"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def confirm_position(self, symbol: str = None, position_id: int = None, chat_id: int = None) -> bool:
+        """
+        Confirm user has entered the position.
+        With chat_id the confirmation is recorded for that chat only
+        (see confirm_for_chat); without it the signal row itself is confirmed.
+        """
+        if chat_id is not None:
+            return self.confirm_for_chat(chat_id, position_id=position_id, symbol=symbol) is not None
         
-        cursor.execute('''
-            SELECT id, symbol, direction, entry_price, sl_price, orb_high, orb_low, entry_time
-            FROM active_positions WHERE confirmed = 1
-        ''')
+        with self._cursor() as cursor:
+            if position_id:
+                cursor.execute(SQL_CONFIRM_BY_ID, (position_id,))
+            elif symbol:
+                cursor.execute(SQL_CONFIRM_LATEST_FOR_SYMBOL, (symbol,))
+            else:
+                # Confirm most recent unconfirmed position
+                cursor.execute(SQL_CONFIRM_LATEST)
+            
+            return cursor.rowcount > 0
+    
+    def confirm_for_chat(self, chat_id: int, position_id: int = None, symbol: str = None) -> Optional[Dict]:
+        """
+        Open a position for chat_id from a pending signal (the given one, or
+        the chat's most recent unconfirmed one). Returns the new active row,
+        or None if there was nothing to confirm or the chat already had it.
+        """
+        with self._cursor() as cursor:
+            if not position_id:
+                cursor.execute(SQL_LATEST_PENDING_FOR_CHAT, {'symbol': symbol, 'chat_id': chat_id})
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                position_id = row[0]
+            
+            cursor.execute(SQL_CONFIRM_COPY_FOR_CHAT, (chat_id, position_id))
+            if cursor.rowcount == 0:
+                return None
+            
+            cursor.execute(SQL_SELECT_ACTIVE_BY_ID, (cursor.lastrowid,))
+            return dict(zip(ACTIVE_COLUMNS, cursor.fetchone()))
+    
+    def get_confirmed_positions(self, chat_id: int = None) -> List[Dict]:
+        """Get all confirmed active positions (optionally only one chat's)"""
+        with self._cursor() as cursor:
+            if chat_id is None:
+                cursor.execute(SQL_SELECT_CONFIRMED)
+            else:
+                cursor.execute(SQL_SELECT_CONFIRMED_FOR_CHAT, (chat_id,))
+            rows = cursor.fetchall()
         
         positions = []
-        for row in cursor.fetchall():
+        for row in rows:
             positions.append({
                 'id': row[0],
                 'symbol': row[1],
@@ -114,24 +577,29 @@ class PositionTracker:
                 'sl_price': row[4],
                 'orb_high': row[5],
                 'orb_low': row[6],
-                'entry_time': row[7]
+                'entry_time': row[7],
+                'chat_id': row[8],
+                'tp_price': row[9]
             })
         
-        conn.close()
         return positions
     
+    def get_active_rows(self) -> List[Dict]:
+        """Get every active row, pending and confirmed"""
+        with self._cursor() as cursor:
+            cursor.execute(SQL_SELECT_ACTIVE)
+            rows = cursor.fetchall()
+        
+        return [dict(zip(ACTIVE_COLUMNS, row)) for row in rows]
+    
     def get_pending_signals(self) -> List[Dict]:
         """Get unconfirmed signals"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, symbol, direction, entry_price, sl_price, entry_time
-            FROM active_positions WHERE confirmed = 0
-        ''')
+        with self._cursor() as cursor:
+            cursor.execute(SQL_SELECT_PENDING)
+            rows = cursor.fetchall()
         
         signals = []
-        for row in cursor.fetchall():
+        for row in rows:
             signals.append({
                 'id': row[0],
                 'symbol': row[1],
@@ -141,101 +609,327 @@ class PositionTracker:
                 'entry_time': row[5]
             })
         
-        conn.close()
         return signals
     
     def close_position(self, symbol: str, close_price: float, close_type: str = 'tp1') -> Optional[Dict]:
-        """Close a position and move to history"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Find the position
-        cursor.execute('''
-            SELECT id, symbol, direction, entry_price, sl_price, entry_time
-            FROM active_positions 
-            WHERE symbol = ? AND confirmed = 1
-            ORDER BY entry_time DESC LIMIT 1
-        ''', (symbol,))
-        
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return None
+        """Close the newest position for a symbol (every chat's copy) and return the first"""
+        results = self.close_positions(symbol, close_price, close_type)
+        return results[0] if results else None
+    
+    def close_positions(self, symbol: str, close_price: float, close_type: str = 'tp1') -> List[Dict]:
+        """
+        Close every chat's copy of the newest open position for a symbol and
+        move them to history. Rollups count the close once per signal.
+        """
+        results = []
+        with self._cursor() as cursor:
+            cursor.execute(SQL_SELECT_OPEN_GROUP_FOR_SYMBOL, {'symbol': symbol})
+            rows = cursor.fetchall()
+            if not rows:
+                return results
+            
+            close_time = now_ms()
+            first_closed_id = None
+            for position_id, symbol, direction, entry_price, sl_price, entry_time, chat_id, signal_id in rows:
+                # Calculate profit
+                if direction == 'buy':
+                    profit_percent = ((close_price - entry_price) / entry_price) * 100
+                else:
+                    profit_percent = ((entry_price - close_price) / entry_price) * 100
+                
+                # Move to closed positions
+                cursor.execute(SQL_INSERT_CLOSED, (symbol, direction, entry_price, close_price, profit_percent,
+                                                   close_type, entry_time, close_time, chat_id,
+                                                   signal_id or position_id))
+                if first_closed_id is None:
+                    first_closed_id = cursor.lastrowid
+                
+                # Remove from active
+                cursor.execute(SQL_DELETE_ACTIVE, (position_id,))
+                
+                results.append({
+                    'id': position_id,
+                    'chat_id': chat_id,
+                    'signal_id': signal_id or position_id,
+                    'symbol': symbol,
+                    'direction': direction,
+                    'entry_price': entry_price,
+                    'close_price': close_price,
+                    'profit_percent': profit_percent,
+                    'close_type': close_type
+                })
+            
+            cursor.execute(SQL_DELETE_PENDING_SIGNAL, (results[0]['signal_id'],))
+            
+            # Keep running totals in the same transaction
+            first = results[0]
+            self._record_close(cursor, first_closed_id, symbol, first['profit_percent'], rows[0][5], close_time)
         
-        position_id, symbol, direction, entry_price, sl_price, entry_time = row
+        return results
+    
+    # --- Subscribers ---
+    
+    def add_subscriber(self, chat_id: int, symbols: Optional[List[str]] = None):
+        """Subscribe a chat; symbols limits it to those pairs (None = all)"""
+        with self._cursor() as cursor:
+            cursor.execute(SQL_UPSERT_SUBSCRIBER, (chat_id, now_ms()))
+            cursor.execute('DELETE FROM subscriber_symbols WHERE chat_id = ?', (chat_id,))
+            if symbols:
+                cursor.executemany('INSERT OR IGNORE INTO subscriber_symbols (chat_id, symbol) VALUES (?, ?)',
+                                   [(chat_id, symbol) for symbol in symbols])
+    
+    def remove_subscriber(self, chat_id: int) -> bool:
+        """Unsubscribe a chat, returns False if it wasn't subscribed"""
+        with self._cursor() as cursor:
+            cursor.execute('DELETE FROM subscriber_symbols WHERE chat_id = ?', (chat_id,))
+            cursor.execute('DELETE FROM subscribers WHERE chat_id = ?', (chat_id,))
+            return cursor.rowcount > 0
+    
+    def get_subscribers(self) -> Dict[int, Optional[List[str]]]:
+        """chat_id -> symbol filter (None = all symbols)"""
+        with self._cursor() as cursor:
+            cursor.execute('SELECT chat_id FROM subscribers')
+            subscribers: Dict[int, Optional[List[str]]] = {row[0]: None for row in cursor.fetchall()}
+            cursor.execute('SELECT chat_id, symbol FROM subscriber_symbols')
+            for chat_id, symbol in cursor.fetchall():
+                if chat_id in subscribers:
+                    if subscribers[chat_id] is None:
+                        subscribers[chat_id] = []
+                    subscribers[chat_id].append(symbol)
+        return subscribers
+    
+    def cleanup_old_signals(self, hours: int = 24) -> int:
+        """Remove old unconfirmed signals, returns how many were removed"""
+        cutoff = now_ms() - hours * 60 * 60 * 1000
+        with self._cursor() as cursor:
+            cursor.execute(SQL_CLEANUP_PENDING, (cutoff,))
+            return cursor.rowcount
+    
+    def get_stats(self) -> Dict:
+        """Get trading statistics (single-row read from the rollup table)"""
+        with self._cursor() as cursor:
+            cursor.execute(SQL_SELECT_ROLLUP)
+            (wins, losses, win_profit, loss_amount, total_profit,
+             equity, peak_equity, max_drawdown) = cursor.fetchone()
         
-        # Calculate profit
-        if direction == 'buy':
-            profit_percent = ((close_price - entry_price) / entry_price) * 100
-        else:
-            profit_percent = ((entry_price - close_price) / entry_price) * 100
+        stats = summarize_stats(wins, losses, win_profit, loss_amount, total_profit)
+        stats.update({
+            'equity': equity,
+            'peak_equity': peak_equity,
+            'max_drawdown': max_drawdown,
+        })
+        return stats
+    
+    def get_breakdown(self, dimension: str) -> List[Dict]:
+        """Per-bucket stats for 'symbol', 'weekday' or 'hour', best total profit first"""
+        if dimension not in BREAKDOWN_DIMENSIONS:
+            raise ValueError(f"Unknown breakdown dimension: {dimension}")
         
-        # Move to closed positions
-        cursor.execute('''
-            INSERT INTO closed_positions 
-            (symbol, direction, entry_price, close_price, profit_percent, close_type, entry_time, close_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (symbol, direction, entry_price, close_price, profit_percent, close_type, entry_time, datetime.now().isoformat()))
+        with self._cursor() as cursor:
+            cursor.execute(SQL_SELECT_BREAKDOWN, (dimension,))
+            rows = cursor.fetchall()
         
-        # Remove from active
-        cursor.execute('DELETE FROM active_positions WHERE id = ?', (position_id,))
+        breakdown = []
+        for bucket, trades, wins, total_profit, win_profit, loss_amount in rows:
+            stats = summarize_stats(wins, trades - wins, win_profit, loss_amount, total_profit)
+            stats['bucket'] = bucket
+            breakdown.append(stats)
         
-        conn.commit()
-        conn.close()
+        breakdown.sort(key=lambda b: b['total_profit'], reverse=True)
+        return breakdown
+    
+    def get_equity_curve(self, limit: int = 100) -> List[Dict]:
+        """Most recent points of the equity curve, oldest first"""
+        with self._cursor() as cursor:
+            cursor.execute('''
+                SELECT closed_id, close_time, equity, drawdown FROM equity_curve
+                ORDER BY closed_id DESC LIMIT ?
+            ''', (limit,))
+            rows = cursor.fetchall()
         
-        return {
+        keys = ('closed_id', 'close_time', 'equity', 'drawdown')
+        return [dict(zip(keys, row)) for row in reversed(rows)]
+
+
+class AsyncPositionTracker:
+    """
+    Async facade over PositionTracker for use from the event loop.
+    All SQLite work runs on one dedicated thread (so statements stay
+    serialized), and active/pending rows are mirrored in a write-through
+    cache so the per-cycle reads never touch disk.
+    """
+    def __init__(self, tracker: PositionTracker):
+        self.tracker = tracker
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tracker-db')
+        # Held by the open batch; other tasks' writes wait for it (see _write)
+        self._batch_lock = asyncio.Lock()
+        self._batch_owner: Optional[asyncio.Task] = None
+        # position id -> row dict (with 'confirmed' flag)
+        self._active: Dict[int, Dict] = {}
+        self._load_cache(tracker.get_active_rows())
+        # Bumped on every write (version) / every close (stats_version) so
+        # callers can tell whether anything they rendered is stale
+        self.version = 0
+        self.stats_version = 0
+    
+    def _load_cache(self, rows: List[Dict]):
+        self._active = {row['id']: row for row in rows}
+    
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking tracker call on the DB thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+    
+    async def _write(self, fn, *args, **kwargs):
+        """
+        Run a tracker write. Unless it comes from the task that owns the open
+        batch, it waits for that batch to end, so a rollback can't undo it.
+        """
+        if self._batch_owner is not None and self._batch_owner is asyncio.current_task():
+            return await self._run(fn, *args, **kwargs)
+        async with self._batch_lock:
+            return await self._run(fn, *args, **kwargs)
+    
+    @asynccontextmanager
+    async def batch(self):
+        """
+        Async version of PositionTracker.batch(). Writes from other tasks
+        wait until the block ends, so keep it to tracker writes. Not reentrant.
+        """
+        async with self._batch_lock:
+            self._batch_owner = asyncio.current_task()
+            try:
+                await self._run(self.tracker.begin_batch)
+                try:
+                    yield self
+                except BaseException:
+                    await self._run(self.tracker.end_batch, False)
+                    # The cache still holds the rolled-back writes
+                    self._load_cache(await self._run(self.tracker.get_active_rows))
+                    self.version += 1
+                    self.stats_version += 1
+                    raise
+                await self._run(self.tracker.end_batch)
+            finally:
+                self._batch_owner = None
+    
+    async def close(self):
+        await self._run(self.tracker.close)
+        self._executor.shutdown(wait=True)
+    
+    # --- Cached reads (no I/O) ---
+    
+    def get_confirmed_positions(self, chat_id: int = None) -> List[Dict]:
+        """Get all confirmed active positions (optionally only one chat's)"""
+        keys = ('id', 'symbol', 'direction', 'entry_price', 'sl_price', 'orb_high', 'orb_low',
+                'entry_time', 'chat_id', 'tp_price')
+        return [{k: row.get(k) for k in keys} for row in self._active.values()
+                if row['confirmed'] and (chat_id is None or row['chat_id'] == chat_id)]
+    
+    def get_pending_signals(self) -> List[Dict]:
+        """Get unconfirmed signals"""
+        keys = ('id', 'symbol', 'direction', 'entry_price', 'sl_price', 'entry_time')
+        return [{k: row[k] for k in keys} for row in self._active.values() if not row['confirmed']]
+    
+    # --- Write-through operations ---
+    
+    async def add_signal(self, symbol: str, direction: str, entry_price: float,
+                         sl_price: float, orb_high: float = None, orb_low: float = None,
+                         tp_price: float = None) -> int:
+        """Add a new unconfirmed signal"""
+        entry_time = now_ms()
+        position_id = await self._write(self.tracker.add_signal, symbol, direction, entry_price,
+                                      sl_price, orb_high, orb_low, entry_time, tp_price)
+        self._active[position_id] = {
+            'id': position_id,
             'symbol': symbol,
             'direction': direction,
             'entry_price': entry_price,
-            'close_price': close_price,
-            'profit_percent': profit_percent,
-            'close_type': close_type
+            'sl_price': sl_price,
+            'tp_price': tp_price,
+            'orb_high': orb_high,
+            'orb_low': orb_low,
+            'entry_time': entry_time,
+            'confirmed': 0,
+            'chat_id': None,
+            'signal_id': None,
         }
+        self.version += 1
+        return position_id
     
-    def cleanup_old_signals(self, hours: int = 24):
-        """Remove old unconfirmed signals"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    async def confirm_position(self, symbol: str = None, position_id: int = None, chat_id: int = None) -> bool:
+        """Confirm user has entered the position (for one chat if chat_id is given)"""
+        if chat_id is not None:
+            # Chat filters live in the DB, so the tracker picks the signal
+            row = await self._write(self.tracker.confirm_for_chat, chat_id, position_id, symbol)
+            if row:
+                self._active[row['id']] = row
+                self.version += 1
+            return row is not None
         
-        cursor.execute('''
-            DELETE FROM active_positions 
-            WHERE confirmed = 0 
-            AND datetime(entry_time) < datetime('now', ?)
-        ''', (f'-{hours} hours',))
+        if not position_id:
+            # Same rule as the SQL: most recent pending signal (optionally per symbol)
+            pending = [row for row in self._active.values()
+                       if not row['confirmed'] and (symbol is None or row['symbol'] == symbol)]
+            if not pending:
+                return False
+            position_id = max(pending, key=lambda row: row['entry_time'])['id']
         
-        conn.commit()
-        conn.close()
+        success = await self._write(self.tracker.confirm_position, position_id=position_id)
+        if success:
+            if position_id in self._active:
+                self._active[position_id]['confirmed'] = 1
+            self.version += 1
+        return success
     
-    def get_stats(self) -> Dict:
+    async def close_position(self, symbol: str, close_price: float, close_type: str = 'tp1') -> Optional[Dict]:
+        """Close the newest position for a symbol and return the first chat's result"""
+        results = await self.close_positions(symbol, close_price, close_type)
+        return results[0] if results else None
+    
+    async def close_positions(self, symbol: str, close_price: float, close_type: str = 'tp1') -> List[Dict]:
+        """Close every chat's copy of the newest position for a symbol"""
+        results = await self._write(self.tracker.close_positions, symbol, close_price, close_type)
+        for result in results:
+            self._active.pop(result['id'], None)
+            # The tracker dropped the group's pending signal row as well
+            self._active.pop(result['signal_id'], None)
+        if results:
+            self.version += 1
+            self.stats_version += 1
+        return results
+    
+    async def cleanup_old_signals(self, hours: int = 24) -> int:
+        """Remove old unconfirmed signals"""
+        removed = await self._write(self.tracker.cleanup_old_signals, hours)
+        if removed:
+            self._load_cache(await self._run(self.tracker.get_active_rows))
+            self.version += 1
+        return removed
+    
+    async def get_stats(self) -> Dict:
         """Get trading statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*), SUM(profit_percent) FROM closed_positions WHERE profit_percent > 0')
-        wins, win_profit = cursor.fetchone()
-        wins = wins or 0
-        win_profit = win_profit or 0
-        
-        cursor.execute('SELECT COUNT(*), SUM(profit_percent) FROM closed_positions WHERE profit_percent <= 0')
-        losses, loss_amount = cursor.fetchone()
-        losses = losses or 0
-        loss_amount = loss_amount or 0
-        
-        cursor.execute('SELECT SUM(profit_percent) FROM closed_positions')
-        total_profit = cursor.fetchone()[0] or 0
-        
-        conn.close()
-        
-        total_trades = wins + losses
-        winrate = (wins / total_trades * 100) if total_trades > 0 else 0
-        
-        return {
-            'total_trades': total_trades,
-            'wins': wins,
-            'losses': losses,
-            'winrate': winrate,
-            'total_profit': total_profit
-        }
+        return await self._run(self.tracker.get_stats)
+    
+    async def get_breakdown(self, dimension: str) -> List[Dict]:
+        """Per-bucket stats for 'symbol', 'weekday' or 'hour'"""
+        return await self._run(self.tracker.get_breakdown, dimension)
+    
+    async def get_equity_curve(self, limit: int = 100) -> List[Dict]:
+        """Most recent points of the equity curve"""
+        return await self._run(self.tracker.get_equity_curve, limit)
+    
+    async def add_subscriber(self, chat_id: int, symbols: Optional[List[str]] = None):
+        """Subscribe a chat (symbols=None means all pairs)"""
+        await self._write(self.tracker.add_subscriber, chat_id, symbols)
+    
+    async def remove_subscriber(self, chat_id: int) -> bool:
+        """Unsubscribe a chat"""
+        return await self._write(self.tracker.remove_subscriber, chat_id)
+    
+    async def get_subscribers(self) -> Dict[int, Optional[List[str]]]:
+        """chat_id -> symbol filter (None = all symbols)"""
+        return await self._run(self.tracker.get_subscribers)
 
 
 # Test
@@ -0,0 +1,177 @@
+"""
+Profiler - Opt-in sampling profiler for the running worker
+A background thread samples every thread's Python stack at a fixed
+interval and aggregates them in collapsed-stack format (one
+"frame;frame;frame count" line per unique stack, the input of
+flamegraph.pl / speedscope). While active, tracemalloc is on, and a
+snapshot is taken at a point where the cycle's candle buffers are alive.
+Nothing runs until start() is called, and samples are only taken between
+begin_cycle() and end_cycle(), so idle time between scans is left out.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+# Modules whose allocations hold candle data
+CANDLE_MODULES = ('*binance_client.py', '*orb_algo.py', '*main.py', '*analysis_cache.py')
+
+TRACEMALLOC_FRAMES = 10
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01, out_dir: str = 'profiles'):
+        self.interval = interval
+        self.out_dir = out_dir
+
+        self._stacks: Counter = Counter()
+        # Inclusive samples of functions defined in this repo
+        self._own: Counter = Counter()
+        self._samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._sampling = threading.Event()
+        self._cycle_started = 0.0
+        self._sampled_time = 0.0
+        self.cycles = 0
+        self._started_tracemalloc = False
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_size = 0
+        self._snapshot_label = ''
+        self._snapshot_taken = False
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.active:
+            return
+        self._stacks.clear()
+        self._own.clear()
+        self._samples = 0
+        self._sampled_time = 0.0
+        self.cycles = 0
+        self._snapshot = None
+        self._snapshot_size = 0
+        self._snapshot_taken = False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        self._stop.clear()
+        self._sampling.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+        self._thread.start()
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if not self._sampling.is_set():
+                continue
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                idle = frame.f_code.co_name == 'wait' and frame.f_code.co_filename == threading.__file__
+                stack = []
+                own = set()
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename == __file__:
+                        # The profiler's own snapshot work, not the worker's
+                        break
+                    stack.append(_frame_name(code))
+                    if code.co_filename.startswith(REPO_DIR) and code.co_name != '<module>':
+                        own.add(stack[-1])
+                    frame = frame.f_back
+                if frame is not None:
+                    continue
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+                if not idle:
+                    # Parked threads (Event/Condition waits) aren't time spent in our code
+                    self._own.update(own)
+            self._samples += 1
+
+    def begin_cycle(self):
+        """Start sampling a scan cycle (one allocation snapshot per cycle)"""
+        if not self.active:
+            return
+        self._snapshot_taken = False
+        self._cycle_started = time.monotonic()
+        self._sampling.set()
+
+    def end_cycle(self):
+        if not self._sampling.is_set():
+            return
+        self._sampling.clear()
+        self._sampled_time += time.monotonic() - self._cycle_started
+        self.cycles += 1
+
+    def snapshot_candles(self, label: str):
+        """Take this cycle's allocation snapshot now, while the candle buffers are referenced"""
+        if not self.active or self._snapshot_taken:
+            return
+        self._snapshot_taken = True
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, pattern) for pattern in CANDLE_MODULES]
+        )
+        size = sum(stat.size for stat in snapshot.statistics('filename'))
+        # Keep the cycle where the candle data was largest
+        if size >= self._snapshot_size:
+            self._snapshot, self._snapshot_size, self._snapshot_label = snapshot, size, label
+
+    def stop(self) -> Dict:
+        """Stop sampling, write the results to out_dir and return a summary"""
+        if not self.active:
+            return {}
+        self.end_cycle()
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        traced, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        allocations: List[Tuple[str, int, int]] = []
+        if self._snapshot is not None:
+            for stat in self._snapshot.statistics('lineno')[:20]:
+                frame = stat.traceback[0]
+                allocations.append((f"{os.path.basename(frame.filename)}:{frame.lineno}", stat.size, stat.count))
+        with open(base + '.alloc.txt', 'w') as f:
+            f.write(f"traced={traced} peak={peak}\n")
+            f.write(f"candle buffers at {self._snapshot_label or '-'}: {self._snapshot_size} bytes\n")
+            for where, size, count in allocations:
+                f.write(f"{size:>12} {count:>8} {where}\n")
+
+        return {
+            'cycles': self.cycles,
+            'duration': self._sampled_time,
+            'samples': self._samples,
+            'top': [(name, count / self._samples * 100 if self._samples else 0.0)
+                    for name, count in self._own.most_common(10)],
+            'candle_bytes': self._snapshot_size,
+            'allocations': allocations[:5],
+            'peak': peak,
+            'files': [base + '.collapsed', base + '.alloc.txt'],
+        }
@@ -0,0 +1,203 @@
+"""
+Replay - Run the whole bot against a fake exchange on a virtual clock
+ORBAlertSystem runs unmodified against fake_exchange.py (archived or
+synthetic candles) and fake_bot_api.py (Telegram sink) while a
+VirtualClock drives its scheduling and candle-close checks. A full day of
+scans for every pair finishes in seconds, which makes it a throughput and
+load test for the pipeline, the tracker and the outbox.
+
+Usage:
+    python replay.py [YYYY-MM-DD] [--speed N] [--pairs N] [--archive DIR] [--charts] [--verbose]
+        --speed 0 (default) jumps over idle time; N > 0 runs N times faster than real time
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import clock
+import config
+import event_log
+from fake_bot_api import FakeBotAPI
+from fake_exchange import FakeExchange, load_archive, synthetic_archive
+
+
+# Chat that receives the replayed alerts
+REPLAY_CHAT_ID = 4242
+
+# Seconds (real time) to wait for the outbox to drain after the last scan
+DRAIN_TIMEOUT = 30
+
+
+def _configure(workdir: str, pairs: Optional[int], charts: bool):
+    """Point the bot at throwaway state and lift the real-world pacing"""
+    config.STATE_BACKEND = f"sqlite:{os.path.join(workdir, 'positions.db')}"
+    config.OUTBOX_DB = os.path.join(workdir, 'outbox.db')
+    config.LATENCY_DB = os.path.join(workdir, 'latency.db')
+    config.ORB_DB = os.path.join(workdir, 'orb_levels.db')
+    config.PROFILE_DIR = os.path.join(workdir, 'profiles')
+    config.TELEGRAM_BOT_TOKEN = '1:replay'
+    config.CHAT_ID = config.OPS_CHAT_ID = REPLAY_CHAT_ID
+    config.ADMIN_CHAT_IDS = [REPLAY_CHAT_ID]
+    config.WEBHOOK_URL = ''
+    config.TELEGRAM_GLOBAL_RATE = 1_000_000
+    config.TELEGRAM_CHAT_INTERVAL = 0
+    config.TELEGRAM_GROUP_INTERVAL = 0
+    config.DIGEST_WINDOW = 0.05
+    config.CHARTS_ENABLED = charts
+    config.ORB_TRACE = False
+    if pairs:
+        config.TRADING_PAIRS = config.TRADING_PAIRS[:pairs]
+
+
+async def _auto_confirm(api: FakeBotAPI):
+    """Press every "Girdim" button the bot sends, so exits get tracked too"""
+    seen = 0
+    while True:
+        await asyncio.sleep(0.02)
+        calls, seen = api.calls[seen:], len(api.calls)
+        for call in calls:
+            if call['method'] not in ('sendMessage', 'sendPhoto'):
+                continue
+            markup = call['result'].get('reply_markup') or {}
+            for row in markup.get('inline_keyboard', []):
+                data = row[0].get('callback_data', '')
+                if data.startswith('confirm_'):
+                    await api.push_update(api.callback_update(call['result']['message_id'], data))
+
+
+async def replay(day: datetime, speed: float = 0, pairs: Optional[int] = None,
+                 archive_dir: Optional[str] = None, charts: bool = False, confirm: bool = True,
+                 verbose: bool = False) -> Dict:
+    """Replay one UTC day; returns throughput figures"""
+    workdir = tempfile.mkdtemp(prefix='orb-replay-')
+    _configure(workdir, pairs, charts)
+    day_start = int(day.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    day_end = day_start + 86400000
+
+    if archive_dir:
+        archive = load_archive(archive_dir)
+        config.TRADING_PAIRS = [s for s in config.TRADING_PAIRS
+                                if (s, config.SIGNAL_TIMEFRAME) in archive and (s, config.ORB_TIMEFRAME) in archive]
+    else:
+        # Two days in front cover the scanner's 100 x 15m / 50 x 1h history
+        archive = synthetic_archive(config.TRADING_PAIRS, day_start - 2 * 86400000, day_end,
+                                    (config.SIGNAL_TIMEFRAME, config.ORB_TIMEFRAME))
+
+    exchange = FakeExchange(archive)
+    api = FakeBotAPI()
+    await exchange.start()
+    await api.start()
+    config.BINANCE_API_URL = exchange.url
+    config.TELEGRAM_API_URL = api.url
+
+    # The scan loop's first cycle runs right away, then follows the schedule
+    clock.install(clock.VirtualClock(day_start + 30 * 1000, speed))
+    from main import ORBAlertSystem
+
+    # The log ring buffer keeps recording when the console is quiet
+    event_log.setup(config.LOG_LEVEL, config.LOG_RING_SIZE, console=verbose)
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        system = ORBAlertSystem()
+        await system.bot.start()
+        await system.monitor.start()
+        system._running = True
+        confirmer = asyncio.create_task(_auto_confirm(api)) if confirm else None
+
+        started = time.perf_counter()
+        scanner = asyncio.create_task(system._scan_loop())
+        while clock.now_ms() < day_end and not scanner.done():
+            await asyncio.sleep(0.01)
+        system._running = False
+        # The loop notices on its next wake-up; the last cycle finishes first
+        await scanner
+        virtual = (clock.now_ms() - day_start) / 1000
+        scan_wall = time.perf_counter() - started
+
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while await system.bot.outbox.pending() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        undelivered = await system.bot.outbox.pending()
+        wall = time.perf_counter() - started
+        if confirmer:
+            confirmer.cancel()
+
+        stats = await system.tracker.get_stats()
+        open_positions = len(system.tracker.get_confirmed_positions())
+        latency = await system.latency.summary(days=3)
+        pipeline = system.pipeline.format_stats()
+        await system.stop()
+
+    problems = event_log.recent(config.LOG_RING_SIZE, logging.WARNING)
+    event_log.shutdown()
+    clock.install(clock.RealClock())
+    await api.stop()
+    await exchange.stop()
+
+    return {
+        'day': day.strftime('%Y-%m-%d'),
+        'pairs': len(config.TRADING_PAIRS),
+        'speed': speed,
+        'virtual': virtual,
+        'scan_wall': scan_wall,
+        'wall': wall,
+        'cycles': system.cycles,
+        'klines': exchange.requests['klines'],
+        'telegram': Counter(call['method'] for call in api.calls),
+        'undelivered': undelivered,
+        'stats': stats,
+        'open_positions': open_positions,
+        'latency': latency,
+        'pipeline': pipeline,
+        'problems': problems,
+        'workdir': workdir,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a trading day against local fakes")
+    parser.add_argument('date', nargs='?', default=(datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d'))
+    parser.add_argument('--speed', type=float, default=0, help="0 = jump over idle time (default)")
+    parser.add_argument('--pairs', type=int, help="Only the first N pairs of config.TRADING_PAIRS")
+    parser.add_argument('--archive', help="Directory written by 'fake_exchange.py download' (default: synthetic)")
+    parser.add_argument('--charts', action='store_true', help="Render charts (slow)")
+    parser.add_argument('--no-confirm', action='store_true', help="Don't confirm entries, so no exits are tracked")
+    parser.add_argument('--verbose', action='store_true', help="Show the bot's own output")
+    args = parser.parse_args()
+
+    r = asyncio.run(replay(datetime.strptime(args.date, '%Y-%m-%d'), args.speed, args.pairs,
+                           args.archive, args.charts, not args.no_confirm, args.verbose))
+
+    print("=" * 50)
+    mode = f"{r['speed']:g}x" if r['speed'] else 'jump'
+    print(f"[*] Replay {r['day']}: {r['pairs']} pairs, {mode}")
+    print(f"[i] {r['virtual'] / 3600:.0f}h virtual in {r['scan_wall']:.2f}s "
+          f"({r['virtual'] / r['scan_wall']:.0f}x), {r['wall']:.2f}s incl. outbox drain")
+    print(f"[i] {r['cycles']} scan cycles ({r['cycles'] / r['scan_wall']:.1f}/s), "
+          f"{r['klines']} kline requests ({r['klines'] / r['scan_wall']:.0f}/s)")
+    sent = ", ".join(f"{method} {n}" for method, n in r['telegram'].most_common())
+    print(f"[i] Telegram calls: {sent or '-'}")
+    if r['undelivered']:
+        print(f"[!] {r['undelivered']} messages still in the outbox")
+    s = r['stats']
+    print(f"[i] Trades: {s['total_trades']} closed ({s['total_profit']:+.2f}%), {r['open_positions']} still open")
+    total = r['latency']['phases'].get('total')
+    # In jump mode the clock leaps while the outbox sends, so latency is only meaningful with --speed
+    if total and r['speed']:
+        print(f"[i] Signal latency (virtual): p50 {total[50]:.1f}s, p95 {total[95]:.1f}s")
+    print(f"[i] {r['pipeline']}")
+    if r['problems']:
+        print(f"[!] {len(r['problems'])} warnings/errors logged, last: {event_log.format_event(r['problems'][-1])}")
+    print(f"[i] State kept in {r['workdir']}")
+
+
+if __name__ == "__main__":
+    main()
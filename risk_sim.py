@@ -0,0 +1,139 @@
+"""
+Risk Simulation - Monte Carlo over the closed-trade ledger
+Resamples the per-trade P&L sequence many times (bootstrap with
+replacement, or reshuffled order) and reports the distribution of final
+return, max drawdown and the probability of hitting a ruin drawdown.
+Paths are simulated in batches of NumPy arrays, so tens of thousands of
+runs take well under a second. numpy is optional; without it the
+simulation is unavailable.
+
+Usage: python risk_sim.py [LEDGER]   # LEDGER: one P&L % per line (CSV: last column)
+                                     # default: closed trades of config.STATE_BACKEND
+"""
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+import config
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+
+FINAL_PERCENTILES = (5, 25, 50, 75, 95)
+DRAWDOWN_PERCENTILES = (50, 95, 99)
+
+
+def returns_from_equity(curve: List[Dict], limit: int) -> List[float]:
+    """
+    Per-trade P&L from get_equity_curve(limit + 1) points. A curve shorter
+    than that is the whole history and starts from zero equity.
+    """
+    equity = [point['equity'] for point in curve]
+    if len(equity) <= limit:
+        equity.insert(0, 0.0)
+    return [b - a for a, b in zip(equity, equity[1:])]
+
+
+def simulate(returns: Sequence[float], runs: int = 10000, trades: Optional[int] = None,
+             method: str = 'bootstrap', ruin_drawdown: float = 30.0,
+             batch: int = 2000, seed: Optional[int] = None) -> Dict:
+    """
+    Monte Carlo over a P&L sequence (percent per trade, summed like the
+    tracker's equity curve).
+
+    Args:
+        returns: Per-trade profit in percent
+        runs: Number of simulated paths
+        trades: Trades per path (default: len(returns))
+        method: 'bootstrap' (draw with replacement) or 'shuffle' (reorder the ledger)
+        ruin_drawdown: Drawdown in percent points that counts as ruin
+        batch: Paths per NumPy batch (bounds memory at batch * trades floats)
+        seed: RNG seed for reproducible runs
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("numpy is required for the risk simulation")
+    if method not in ('bootstrap', 'shuffle'):
+        raise ValueError(f"Unknown method: {method}")
+
+    started = time.perf_counter()
+    ledger = np.asarray(returns, dtype=np.float64)
+    if ledger.size == 0:
+        raise ValueError("No trades to simulate")
+    trades = ledger.size if method == 'shuffle' or not trades else trades
+    rng = np.random.default_rng(seed)
+
+    final = np.empty(runs)
+    max_drawdown = np.empty(runs)
+    for start in range(0, runs, batch):
+        n = min(batch, runs - start)
+        if method == 'bootstrap':
+            paths = ledger[rng.integers(0, ledger.size, size=(n, trades))]
+        else:
+            paths = rng.permuted(np.broadcast_to(ledger, (n, trades)), axis=1)
+
+        equity = np.cumsum(paths, axis=1)
+        # The starting balance (0) counts as the first peak
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+        final[start:start + n] = equity[:, -1]
+        max_drawdown[start:start + n] = (peak - equity).max(axis=1)
+
+    return {
+        'runs': runs,
+        'trades': trades,
+        'method': method,
+        'ledger_trades': int(ledger.size),
+        'ledger_total': float(ledger.sum()),
+        'final': dict(zip(FINAL_PERCENTILES, np.percentile(final, FINAL_PERCENTILES).tolist())),
+        'max_drawdown': dict(zip(DRAWDOWN_PERCENTILES, np.percentile(max_drawdown, DRAWDOWN_PERCENTILES).tolist())),
+        'ruin_drawdown': ruin_drawdown,
+        'risk_of_ruin': float((max_drawdown >= ruin_drawdown).mean() * 100),
+        'prob_loss': float((final < 0).mean() * 100),
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+def load_ledger(path: str) -> List[float]:
+    """P&L values from a text/CSV ledger; lines whose last field isn't a number are skipped"""
+    returns = []
+    with open(path) as f:
+        for line in f:
+            field = line.strip().split(',')[-1]
+            try:
+                returns.append(float(field))
+            except ValueError:
+                continue
+    return returns
+
+
+def main():
+    if len(sys.argv) > 1:
+        returns = load_ledger(sys.argv[1])
+    else:
+        from state_store import open_store
+        store = open_store(config.STATE_BACKEND)
+        try:
+            returns = returns_from_equity(store.get_equity_curve(config.RISK_MAX_TRADES + 1),
+                                          config.RISK_MAX_TRADES)
+        finally:
+            store.close()
+
+    if not returns:
+        print("[!] No closed trades to simulate")
+        sys.exit(1)
+
+    for method in ('bootstrap', 'shuffle'):
+        r = simulate(returns, config.RISK_SIM_RUNS, method=method,
+                     ruin_drawdown=config.RISK_RUIN_DRAWDOWN, batch=config.RISK_SIM_BATCH)
+        print(f"[*] {method}: {r['runs']} runs x {r['trades']} trades in {r['elapsed'] * 1000:.0f}ms")
+        print("    Final return: " + "  ".join(f"p{p}={v:+.2f}%" for p, v in r['final'].items()))
+        print("    Max drawdown: " + "  ".join(f"p{p}={v:.2f}%" for p, v in r['max_drawdown'].items()))
+        print(f"    P(loss)={r['prob_loss']:.1f}%  P(drawdown >= {r['ruin_drawdown']:g}%)={r['risk_of_ruin']:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
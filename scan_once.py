@@ -1,17 +1,25 @@
 """
 ORB Algo Telegram Alert Bot - One-shot scan for GitHub Actions
-Scans all pairs, tracks active signals, sends entry/close notifications
+Scans all pairs, tracks active signals, sends entry/close notifications.
+Built for short billable runs: all pairs are fetched concurrently under a
+deadline, and Telegram is only imported and contacted if there is
+something to send (no Application, no polling).
 """
 import asyncio
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
+from requests.adapters import HTTPAdapter
+
+import clock
 import config
 from binance_client import BinanceClient
-from orb_algo import ORBAlgo
-from telegram_bot import TelegramAlertBot
+from orb_algo import ORBAlgo, adaptive_stop
+from state_store import open_store
 
 
 # Override config with environment variables if available
@@ -19,40 +27,64 @@ if os.environ.get('TELEGRAM_BOT_TOKEN'):
     config.TELEGRAM_BOT_TOKEN = os.environ['TELEGRAM_BOT_TOKEN']
 if os.environ.get('CHAT_ID'):
     config.CHAT_ID = int(os.environ['CHAT_ID'])
+if os.environ.get('STATE_BACKEND'):
+    config.SCAN_ONCE_STATE_BACKEND = os.environ['STATE_BACKEND']
 
-# File to store active signals between runs
-SIGNALS_FILE = 'active_signals.json'
-
+# State file of older versions, imported once into the state backend
+LEGACY_SIGNALS_FILE = 'active_signals.json'
 
-def load_active_signals() -> Dict:
-    """Load active signals from JSON file"""
-    if os.path.exists(SIGNALS_FILE):
-        try:
-            with open(SIGNALS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
 
-
-def save_active_signals(signals: Dict):
-    """Save active signals to JSON file"""
-    with open(SIGNALS_FILE, 'w') as f:
-        json.dump(signals, f, indent=2)
+def import_legacy_signals(store) -> int:
+    """Move signals from the old active_signals.json into the store"""
+    if not os.path.exists(LEGACY_SIGNALS_FILE):
+        return 0
+    
+    with open(LEGACY_SIGNALS_FILE, 'r') as f:
+        signals = json.load(f)
+    
+    known = {p['symbol'] for p in store.get_confirmed_positions()}
+    imported = 0
+    with store.batch():
+        for symbol, info in signals.items():
+            if symbol in known:
+                continue
+            position_id = store.add_signal(
+                symbol=symbol,
+                direction=info['direction'],
+                entry_price=info['entry_price'],
+                sl_price=info['sl_price'],
+                orb_high=info.get('orb_high'),
+                orb_low=info.get('orb_low'),
+                entry_time=int(datetime.fromisoformat(info['entry_time']).timestamp() * 1000),
+            )
+            store.confirm_position(position_id=position_id)
+            imported += 1
+    
+    os.replace(LEGACY_SIGNALS_FILE, LEGACY_SIGNALS_FILE + '.migrated')
+    print(f"[i] Imported {imported} signals from {LEGACY_SIGNALS_FILE}")
+    return imported
 
 
 class ORBScanner:
     def __init__(self):
         self.binance = BinanceClient()
-        self.bot = TelegramAlertBot()
+        # One pooled connection per fetch thread
+        self.binance.session.mount('https://', HTTPAdapter(pool_maxsize=config.SCAN_ONCE_FETCH_WORKERS))
+        
+        # Messages produced by the scan, sent after state is saved
+        self._outgoing: List[str] = []
         
         # One ORB algo instance per symbol
         self.algos: Dict[str, ORBAlgo] = {}
         for symbol in config.TRADING_PAIRS:
             self.algos[symbol] = ORBAlgo()
         
-        # Load active signals
-        self.active_signals = load_active_signals()
+        # Load active signals (every signal is tracked, so they are stored confirmed)
+        self.store = open_store(config.SCAN_ONCE_STATE_BACKEND, persistent=True)
+        import_legacy_signals(self.store)
+        self.active_signals: Dict[str, Dict] = {
+            p['symbol']: p for p in self.store.get_confirmed_positions()
+        }
     
     async def run_scan(self):
         """Run a single scan of all pairs"""
@@ -62,36 +94,76 @@ class ORBScanner:
         print(f"[i] Active signals: {len(self.active_signals)}")
         print("=" * 50)
         
-        # Initialize Telegram bot
-        await self.bot.start()
+        started = time.monotonic()
+        candles = await self._fetch_all(config.SCAN_ONCE_DEADLINE)
+        print(f"[i] Fetched {len(candles)}/{len(config.TRADING_PAIRS)} pairs in {time.monotonic() - started:.1f}s")
         
         new_signals = 0
         closed_signals = 0
         
-        for symbol in config.TRADING_PAIRS:
-            try:
-                result = await self._scan_pair(symbol)
-                if result == 'new':
-                    new_signals += 1
-                elif result == 'closed':
-                    closed_signals += 1
-            except Exception as e:
-                print(f"   [!] Error scanning {symbol}: {e}")
-        
-        # Save updated signals
-        save_active_signals(self.active_signals)
+        # Only changed records are written, in a single transaction/flush
+        with self.store.batch():
+            for symbol in config.TRADING_PAIRS:
+                if symbol not in candles:
+                    continue
+                try:
+                    result = self._scan_pair(symbol, *candles[symbol])
+                    if result == 'new':
+                        new_signals += 1
+                    elif result == 'closed':
+                        closed_signals += 1
+                except Exception as e:
+                    print(f"   [!] Error scanning {symbol}: {e}")
+        
+        self.store.close()
         
         print(f"\n[+] Scan complete. New: {new_signals}, Closed: {closed_signals}")
         
-        # Stop bot
-        await self.bot.stop()
+        await self._send_notifications()
+        print(f"[i] Run took {time.monotonic() - started:.1f}s")
     
-    async def _scan_pair(self, symbol: str) -> Optional[str]:
+    async def _fetch_all(self, deadline: float) -> Dict[str, Tuple[List[Dict], List[Dict]]]:
+        """Fetch both timeframes for every pair concurrently; pairs not done by the deadline are skipped"""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=config.SCAN_ONCE_FETCH_WORKERS)
+        stop_at = time.monotonic() + deadline
+        
+        def get_klines(symbol: str, interval: str, limit: int) -> List[Dict]:
+            # A request only gets what is left of the deadline, so no worker
+            # thread (joined at interpreter exit) outlives it by much
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                return []
+            return self.binance.get_klines(symbol, interval, limit, timeout=remaining)
+        
+        async def fetch(symbol: str):
+            candles_15m, candles_30m = await asyncio.gather(
+                loop.run_in_executor(executor, get_klines, symbol, '15m', 100),
+                loop.run_in_executor(executor, get_klines, symbol, '30m', 50),
+            )
+            return symbol, candles_15m, candles_30m
+        
+        tasks = [asyncio.create_task(fetch(symbol)) for symbol in config.TRADING_PAIRS]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        # Queued requests are dropped; running ones time out at the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        if pending:
+            print(f"   [!] Deadline ({deadline:g}s) hit, skipping {len(pending)} pairs")
+        
+        results = {}
+        for task in done:
+            if task.exception():
+                print(f"   [!] Fetch error: {task.exception()}")
+                continue
+            symbol, candles_15m, candles_30m = task.result()
+            results[symbol] = (candles_15m, candles_30m)
+        return results
+    
+    def _scan_pair(self, symbol: str, candles_15m: List[Dict], candles_30m: List[Dict]) -> Optional[str]:
         """Scan a single pair for signals"""
-        # Get candle data
-        candles_15m = self.binance.get_klines(symbol, '15m', limit=100)
-        candles_30m = self.binance.get_klines(symbol, '30m', limit=50)
-        
         if not candles_15m or not candles_30m:
             print(f"   [!] No data for {symbol}")
             return None
@@ -100,7 +172,7 @@ class ORBScanner:
         
         # If we have an active signal for this symbol, check for close
         if symbol in self.active_signals:
-            return await self._check_active_signal(symbol, candles_15m, candles_30m, algo)
+            return self._check_active_signal(symbol, candles_15m, candles_30m, algo)
         
         # Otherwise, check for new entry
         signal_type, signal_data = algo.analyze(candles_15m, candles_30m)
@@ -109,22 +181,32 @@ class ORBScanner:
             print(f"   [SIGNAL] {symbol}: {signal_data['direction'].upper()} signal!")
             
             # Store active signal
+            position_id = self.store.add_signal(
+                symbol=symbol,
+                direction=signal_data['direction'],
+                entry_price=signal_data['entry_price'],
+                sl_price=signal_data['sl_price'],
+                orb_high=signal_data.get('orb_high'),
+                orb_low=signal_data.get('orb_low'),
+                tp_price=signal_data.get('tp_price')
+            )
+            self.store.confirm_position(position_id=position_id)
             self.active_signals[symbol] = {
+                'id': position_id,
                 'direction': signal_data['direction'],
                 'entry_price': signal_data['entry_price'],
                 'sl_price': signal_data['sl_price'],
-                'orb_high': signal_data.get('orb_high'),
-                'orb_low': signal_data.get('orb_low'),
-                'entry_time': datetime.now().isoformat()
+                'tp_price': signal_data.get('tp_price'),
+                'entry_time': clock.now_ms()
             }
             
-            # Send Telegram notification
-            await self._send_entry_notification(symbol, signal_data)
+            # Telegram notification (sent after the scan)
+            self._queue_entry_notification(symbol, signal_data)
             return 'new'
         
         return None
     
-    async def _check_active_signal(self, symbol: str, candles_15m, candles_30m, algo) -> Optional[str]:
+    def _check_active_signal(self, symbol: str, candles_15m, candles_30m, algo) -> Optional[str]:
         """Check if an active signal has hit TP1 or SL"""
         signal_info = self.active_signals[symbol]
         
@@ -135,7 +217,7 @@ class ORBScanner:
         current_candle = candles_15m[-1]
         current_price = current_candle['close']
         entry_price = signal_info['entry_price']
-        sl_price = signal_info['sl_price']
+        tp_price = signal_info.get('tp_price')
         is_long = signal_info['direction'] == 'buy'
         
         # Calculate EMA for TP1 check (Pine Script uses EMA for Dynamic TP)
@@ -143,6 +225,12 @@ class ORBScanner:
         ema = self._calculate_ema(hl2, config.EMA_LENGTH)
         current_ema = ema[-1] if ema else current_price
         
+        # Adaptive SL: break-even once an earlier candle since the entry had the EMA in profit
+        sl_price = adaptive_stop(entry_price, signal_info['sl_price'], is_long,
+                                 [ema[i] for i, c in enumerate(candles_15m[:-1])
+                                  if c['close_time'] > signal_info['entry_time']],
+                                 config.MINIMUM_PROFIT_PERCENT)
+        
         # Calculate profit percentage
         if is_long:
             profit_pct = ((current_price - entry_price) / entry_price) * 100
@@ -166,10 +254,21 @@ class ORBScanner:
             is_crossback = current_price > current_ema
             hit_sl = current_candle['high'] >= sl_price
         
+        # ATR target (TP_METHOD = 'ATR'): a wick through it fills at the target
+        if tp_price is not None:
+            if (is_long and current_candle['high'] >= tp_price) or (not is_long and current_candle['low'] <= tp_price):
+                tp_pct = abs(tp_price - entry_price) / entry_price * 100
+                print(f"   [TP1] {symbol}: TP1 target hit! +{tp_pct:.2f}%")
+                self._queue_close_notification(symbol, signal_info, tp_price, tp_pct, 'TP1')
+                self.store.close_position(symbol, tp_price, 'tp1')
+                del self.active_signals[symbol]
+                return 'closed'
+        
         # Check TP1 - must have minimum profit AND crossback
-        if is_ema_profitable and abs(ema_profit_pct) >= min_profit and is_crossback:
+        elif is_ema_profitable and abs(ema_profit_pct) >= min_profit and is_crossback:
             print(f"   [TP1] {symbol}: TP1 hit! +{abs(ema_profit_pct):.2f}%")
-            await self._send_close_notification(symbol, signal_info, current_ema, abs(ema_profit_pct), 'TP1')
+            self._queue_close_notification(symbol, signal_info, current_ema, abs(ema_profit_pct), 'TP1')
+            self.store.close_position(symbol, current_ema, 'tp1')
             del self.active_signals[symbol]
             return 'closed'
         
@@ -177,7 +276,8 @@ class ORBScanner:
         if hit_sl:
             loss_pct = abs(profit_pct)
             print(f"   [SL] {symbol}: Stop Loss hit! -{loss_pct:.2f}%")
-            await self._send_close_notification(symbol, signal_info, sl_price, -loss_pct, 'SL')
+            self._queue_close_notification(symbol, signal_info, sl_price, -loss_pct, 'SL')
+            self.store.close_position(symbol, sl_price, 'sl')
             del self.active_signals[symbol]
             return 'closed'
         
@@ -201,30 +301,28 @@ class ORBScanner:
         
         return ema
     
-    async def _send_entry_notification(self, symbol: str, signal_data: Dict):
-        """Send entry signal notification to Telegram"""
+    def _queue_entry_notification(self, symbol: str, signal_data: Dict):
+        """Queue entry signal notification for Telegram"""
         direction = signal_data['direction']
         emoji = "🟢" if direction == 'buy' else "🔴"
         direction_text = "LONG" if direction == 'buy' else "SHORT"
         
+        tp_line = f"🎯 TP1: <code>{signal_data['tp_price']:.4f}</code>\n" if signal_data.get('tp_price') is not None else ""
         message = (
             f"{emoji} <b>YENİ SİNYAL: {symbol}</b>\n\n"
             f"📊 Yön: <b>{direction_text}</b>\n"
             f"💰 Giriş: <code>{signal_data['entry_price']:.4f}</code>\n"
             f"🛑 Stop Loss: <code>{signal_data['sl_price']:.4f}</code>\n"
-            f"⏰ Zaman: {datetime.now().strftime('%H:%M')}\n\n"
+            f"{tp_line}"
+            f"⏰ Zaman: {datetime.fromtimestamp(clock.now()).strftime('%H:%M')}\n\n"
             f"📈 ORB High: {signal_data.get('orb_high', 0):.4f}\n"
             f"📉 ORB Low: {signal_data.get('orb_low', 0):.4f}"
         )
         
-        await self.bot.app.bot.send_message(
-            chat_id=config.CHAT_ID,
-            text=message,
-            parse_mode='HTML'
-        )
+        self._outgoing.append(message)
     
-    async def _send_close_notification(self, symbol: str, signal_info: Dict, close_price: float, profit_pct: float, close_type: str):
-        """Send close signal notification to Telegram"""
+    def _queue_close_notification(self, symbol: str, signal_info: Dict, close_price: float, profit_pct: float, close_type: str):
+        """Queue close signal notification for Telegram"""
         direction = signal_info['direction']
         is_profit = profit_pct > 0
         
@@ -236,6 +334,7 @@ class ORBScanner:
             result_text = f"{profit_pct:.2f}%"
         
         direction_text = "LONG" if direction == 'buy' else "SHORT"
+        entry_time = datetime.fromtimestamp(signal_info['entry_time'] / 1000).strftime('%Y-%m-%dT%H:%M')
         
         message = (
             f"{emoji} <b>{close_type} - {symbol}</b>\n\n"
@@ -243,14 +342,31 @@ class ORBScanner:
             f"💰 Giriş: <code>{signal_info['entry_price']:.4f}</code>\n"
             f"📍 Çıkış: <code>{close_price:.4f}</code>\n"
             f"📈 Sonuç: <b>{result_text}</b>\n"
-            f"⏰ Giriş zamanı: {signal_info.get('entry_time', 'N/A')[:16]}"
+            f"⏰ Giriş zamanı: {entry_time}"
         )
         
-        await self.bot.app.bot.send_message(
-            chat_id=config.CHAT_ID,
-            text=message,
-            parse_mode='HTML'
-        )
+        self._outgoing.append(message)
+    
+    async def _send_notifications(self):
+        """Send queued messages; Telegram is only imported and contacted if there are any"""
+        if not self._outgoing:
+            return
+        
+        from telegram import Bot
+        
+        kwargs = {}
+        if config.TELEGRAM_API_URL:
+            kwargs = {'base_url': f"{config.TELEGRAM_API_URL}/bot",
+                      'base_file_url': f"{config.TELEGRAM_API_URL}/file/bot"}
+        
+        async with Bot(config.TELEGRAM_BOT_TOKEN, **kwargs) as bot:
+            for message in self._outgoing:
+                try:
+                    await bot.send_message(chat_id=config.CHAT_ID, text=message, parse_mode='HTML')
+                except Exception as e:
+                    print(f"   [!] Telegram send failed: {e}")
+        print(f"[+] Sent {len(self._outgoing)} notifications")
+        self._outgoing.clear()
 
 
 async def main():
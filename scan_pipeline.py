@@ -0,0 +1,154 @@
+"""
+Scan Pipeline - Staged asyncio pipeline for a single scan cycle
+Each stage has its own worker pool and hands results to the next stage
+through a bounded queue, so a slow sink only backs up its own queue.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import event_log
+
+
+log = event_log.get_logger('scan_pipeline')
+
+
+# Sentinel pushed through the queues to shut down stage workers
+_DONE = object()
+
+
+def _label(item: Any) -> str:
+    """Short description of a pipeline item for error messages"""
+    if isinstance(item, dict) and 'symbol' in item:
+        return item['symbol']
+    return str(item)
+
+
+class Stage:
+    """A named pipeline stage with its own concurrency"""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Optional[Any]]],
+                 workers: int = 1, queue_size: int = 0):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        # queue_size=0 means "pick a default from the worker count"
+        self.queue_size = queue_size or self.workers * 4
+
+        # Per-cycle metrics
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+
+    def reset_metrics(self):
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+
+
+class ScanPipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues.
+
+    A handler returns the item for the next stage, or None to drop it.
+    Handlers of the last stage are sinks and their return value is ignored.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self._queues: List[asyncio.Queue] = []
+        self.last_duration = 0.0
+
+    async def run(self, items: Iterable[Any]) -> Dict[str, Dict]:
+        """Feed items through every stage and wait until all queues drain"""
+        started = time.monotonic()
+        self._queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        for stage in self.stages:
+            stage.reset_metrics()
+
+        worker_groups = [
+            [asyncio.create_task(self._worker(i)) for _ in range(stage.workers)]
+            for i, stage in enumerate(self.stages)
+        ]
+
+        try:
+            for item in items:
+                await self._put(0, item)
+
+            # Shut stages down in order: once every worker of a stage has
+            # exited, nothing more can reach the next queue.
+            for i, stage in enumerate(self.stages):
+                for _ in range(stage.workers):
+                    await self._queues[i].put(_DONE)
+                await asyncio.gather(*worker_groups[i])
+        finally:
+            for group in worker_groups:
+                for task in group:
+                    if not task.done():
+                        task.cancel()
+
+        self.last_duration = time.monotonic() - started
+        return self.stats()
+
+    async def _put(self, index: int, item: Any):
+        queue = self._queues[index]
+        await queue.put(item)
+        stage = self.stages[index]
+        stage.max_depth = max(stage.max_depth, queue.qsize())
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        in_queue = self._queues[index]
+        next_index = index + 1 if index + 1 < len(self.stages) else None
+        while True:
+            item = await in_queue.get()
+            if item is _DONE:
+                return
+
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stage.errors += 1
+                log.error("%s error for %s: %s", stage.name, _label(item), e,
+                          extra={'stage': stage.name, 'symbol': _label(item)})
+                result = None
+            finally:
+                stage.busy_seconds += time.monotonic() - started
+                stage.processed += 1
+
+            # Blocks when the next stage is saturated (backpressure)
+            if result is not None and next_index is not None:
+                await self._put(next_index, result)
+
+    def depths(self) -> Dict[str, int]:
+        """Current queue depth per stage"""
+        return {stage.name: queue.qsize() for stage, queue in zip(self.stages, self._queues)}
+
+    def stats(self) -> Dict[str, Dict]:
+        """Metrics for the last run, keyed by stage name"""
+        return {
+            stage.name: {
+                'workers': stage.workers,
+                'queue_size': stage.queue_size,
+                'max_depth': stage.max_depth,
+                'processed': stage.processed,
+                'errors': stage.errors,
+                'busy_seconds': stage.busy_seconds,
+            }
+            for stage in self.stages
+        }
+
+    def format_stats(self) -> str:
+        """One-line summary for the console"""
+        parts = []
+        for name, s in self.stats().items():
+            parts.append(
+                f"{name}={s['processed']} (q {s['max_depth']}/{s['queue_size']}, "
+                f"x{s['workers']}, {s['busy_seconds']:.1f}s)"
+            )
+        return f"Pipeline {self.last_duration:.1f}s: " + ", ".join(parts)
@@ -0,0 +1,526 @@
+"""
+State Store - Interchangeable backends for position state
+Every backend exposes the PositionTracker API (add_signal, confirm_position,
+close_position, get_stats, ...) so main.py and scan_once.py can share one.
+
+Backends (selected with a spec string, see open_store):
+    sqlite:<path>   PositionTracker on SQLite (default)
+    jsonl:<path>    append-only JSON-lines log, replayed on startup
+    memory          in-process only, for tests and benchmarks
+"""
+import copy
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import config
+import event_log
+from position_tracker import (
+    BREAKDOWN_DIMENSIONS,
+    PositionTracker,
+    breakdown_buckets,
+    now_ms,
+    summarize_stats,
+)
+
+
+log = event_log.get_logger('state_store')
+
+
+class MemoryPositionStore:
+    """Keeps all state in dictionaries; rollups are maintained on close"""
+
+    def __init__(self):
+        self._active: Dict[int, Dict] = {}
+        self._next_id = 1
+        self._next_closed_id = 1
+        self._rollup = {
+            'wins': 0, 'losses': 0, 'win_profit': 0.0, 'loss_amount': 0.0, 'total_profit': 0.0,
+            'equity': 0.0, 'peak_equity': 0.0, 'max_drawdown': 0.0,
+        }
+        self._breakdown: Dict[tuple, Dict] = {}
+        self._equity_curve: List[Dict] = []
+        # chat_id -> symbol filter (None = all symbols)
+        self._subscribers: Dict[int, Optional[List[str]]] = {}
+        self._batch_depth = 0
+        self._batch_failed = False
+        self._batch_snapshot: Optional[Dict] = None
+
+    # --- Hooks for persistent subclasses ---
+
+    def _log(self, record: Dict):
+        """Called with every state change; the memory backend keeps nothing"""
+        pass
+
+    _STATE = ('_active', '_next_id', '_next_closed_id', '_rollup', '_breakdown', '_equity_curve',
+              '_subscribers')
+
+    def begin_batch(self):
+        # A failed batch restores the state it started from
+        if self._batch_depth == 0:
+            self._batch_snapshot = copy.deepcopy({name: getattr(self, name) for name in self._STATE})
+        self._batch_depth += 1
+
+    def end_batch(self, ok: bool = True):
+        self._batch_depth -= 1
+        self._batch_failed = self._batch_failed or not ok
+        if self._batch_depth == 0:
+            if self._batch_failed:
+                for name, value in self._batch_snapshot.items():
+                    setattr(self, name, value)
+            self._batch_snapshot = None
+            self._batch_failed = False
+
+    @contextmanager
+    def batch(self):
+        self.begin_batch()
+        try:
+            yield self
+        except BaseException:
+            self.end_batch(ok=False)
+            raise
+        self.end_batch()
+
+    def close(self):
+        pass
+
+    # --- State transitions (shared by live calls and log replay) ---
+
+    def _apply_add(self, row: Dict):
+        # Rows logged before per-chat positions have no chat columns
+        row.setdefault('chat_id', None)
+        row.setdefault('signal_id', None)
+        self._active[row['id']] = row
+        self._next_id = max(self._next_id, row['id'] + 1)
+
+    def _apply_confirm(self, position_id: int):
+        if position_id in self._active:
+            self._active[position_id]['confirmed'] = 1
+
+    def _apply_close(self, position_ids: List[int], closed_rows: List[Dict]):
+        """Close one signal's positions; rollups count it as a single trade"""
+        for position_id in position_ids:
+            self._active.pop(position_id, None)
+        for row in closed_rows:
+            self._next_closed_id = max(self._next_closed_id, row['id'] + 1)
+
+        # Same arithmetic as PositionTracker._record_close
+        closed = closed_rows[0]
+        profit = closed['profit_percent']
+        is_win = profit > 0
+        win_profit = profit if is_win else 0
+        loss_amount = 0 if is_win else profit
+
+        r = self._rollup
+        r['wins'] += 1 if is_win else 0
+        r['losses'] += 0 if is_win else 1
+        r['win_profit'] += win_profit
+        r['loss_amount'] += loss_amount
+        r['total_profit'] += profit
+        r['equity'] += profit
+        r['peak_equity'] = max(r['peak_equity'], r['equity'])
+        r['max_drawdown'] = max(r['max_drawdown'], r['peak_equity'] - r['equity'])
+
+        self._equity_curve.append({
+            'closed_id': closed['id'],
+            'close_time': closed['close_time'],
+            'equity': r['equity'],
+            'drawdown': r['peak_equity'] - r['equity'],
+        })
+
+        for key in breakdown_buckets(closed['symbol'], closed['entry_time']):
+            b = self._breakdown.setdefault(key, {
+                'trades': 0, 'wins': 0, 'total_profit': 0.0, 'win_profit': 0.0, 'loss_amount': 0.0,
+            })
+            b['trades'] += 1
+            b['wins'] += 1 if is_win else 0
+            b['total_profit'] += profit
+            b['win_profit'] += win_profit
+            b['loss_amount'] += loss_amount
+
+    def _apply_delete(self, ids: List[int]):
+        for position_id in ids:
+            self._active.pop(position_id, None)
+
+    def _apply_subscribe(self, chat_id: int, symbols: Optional[List[str]]):
+        self._subscribers[chat_id] = list(symbols) if symbols else None
+
+    def _apply_unsubscribe(self, chat_id: int):
+        self._subscribers.pop(chat_id, None)
+
+    # --- PositionTracker API ---
+
+    def add_signal(self, symbol: str, direction: str, entry_price: float,
+                   sl_price: float, orb_high: float = None, orb_low: float = None,
+                   entry_time: int = None, tp_price: float = None) -> int:
+        """Add a new unconfirmed signal"""
+        row = {
+            'id': self._next_id,
+            'symbol': symbol,
+            'direction': direction,
+            'entry_price': entry_price,
+            'sl_price': sl_price,
+            'tp_price': tp_price,
+            'orb_high': orb_high,
+            'orb_low': orb_low,
+            'entry_time': entry_time if entry_time is not None else now_ms(),
+            'confirmed': 0,
+            'chat_id': None,
+            'signal_id': None,
+        }
+        self._apply_add(row)
+        self._log({'op': 'add', 'row': row})
+        return row['id']
+
+    def confirm_position(self, symbol: str = None, position_id: int = None, chat_id: int = None) -> bool:
+        """Confirm user has entered the position (for one chat if chat_id is given)"""
+        if chat_id is not None:
+            return self.confirm_for_chat(chat_id, position_id=position_id, symbol=symbol) is not None
+
+        if not position_id:
+            pending = [row for row in self._active.values()
+                       if not row['confirmed'] and (symbol is None or row['symbol'] == symbol)]
+            if not pending:
+                return False
+            position_id = max(pending, key=lambda row: row['entry_time'])['id']
+
+        if position_id not in self._active:
+            return False
+
+        self._apply_confirm(position_id)
+        self._log({'op': 'confirm', 'id': position_id})
+        return True
+
+    def confirm_for_chat(self, chat_id: int, position_id: int = None, symbol: str = None) -> Optional[Dict]:
+        """Open a position for chat_id from a pending signal (see PositionTracker)"""
+        confirmed_signals = {row['signal_id'] for row in self._active.values() if row['chat_id'] == chat_id}
+        symbols = self._subscribers.get(chat_id)
+
+        if not position_id:
+            pending = [row for row in self._active.values()
+                       if not row['confirmed'] and row['chat_id'] is None
+                       and (symbol is None or row['symbol'] == symbol)
+                       and row['id'] not in confirmed_signals
+                       and (not symbols or row['symbol'] in symbols)]
+            if not pending:
+                return None
+            position_id = max(pending, key=lambda row: row['entry_time'])['id']
+
+        signal = self._active.get(position_id)
+        if (signal is None or signal['confirmed'] or signal['chat_id'] is not None
+                or position_id in confirmed_signals):
+            return None
+
+        row = dict(signal, id=self._next_id, confirmed=1, chat_id=chat_id, signal_id=position_id)
+        self._apply_add(row)
+        self._log({'op': 'add', 'row': row})
+        return dict(row)
+
+    def get_active_rows(self) -> List[Dict]:
+        """Get every active row, pending and confirmed"""
+        return [dict(row) for row in self._active.values()]
+
+    def get_confirmed_positions(self, chat_id: int = None) -> List[Dict]:
+        """Get all confirmed active positions (optionally only one chat's)"""
+        # tp_price is missing from rows logged before it existed
+        keys = ('id', 'symbol', 'direction', 'entry_price', 'sl_price', 'orb_high', 'orb_low',
+                'entry_time', 'chat_id', 'tp_price')
+        return [{k: row.get(k) for k in keys} for row in self._active.values()
+                if row['confirmed'] and (chat_id is None or row['chat_id'] == chat_id)]
+
+    def get_pending_signals(self) -> List[Dict]:
+        """Get unconfirmed signals"""
+        keys = ('id', 'symbol', 'direction', 'entry_price', 'sl_price', 'entry_time')
+        return [{k: row[k] for k in keys} for row in self._active.values() if not row['confirmed']]
+
+    def close_position(self, symbol: str, close_price: float, close_type: str = 'tp1') -> Optional[Dict]:
+        """Close the newest position for a symbol (every chat's copy) and return the first"""
+        results = self.close_positions(symbol, close_price, close_type)
+        return results[0] if results else None
+
+    def close_positions(self, symbol: str, close_price: float, close_type: str = 'tp1') -> List[Dict]:
+        """Close every chat's copy of the newest open position for a symbol"""
+        candidates = [row for row in self._active.values() if row['symbol'] == symbol and row['confirmed']]
+        if not candidates:
+            return []
+        newest = max(candidates, key=lambda row: row['entry_time'])
+        group_key = newest['signal_id'] or newest['id']
+        group = [row for row in candidates if (row['signal_id'] or row['id']) == group_key]
+
+        close_time = now_ms()
+        closed_rows = []
+        results = []
+        for i, position in enumerate(group):
+            entry_price = position['entry_price']
+            if position['direction'] == 'buy':
+                profit_percent = ((close_price - entry_price) / entry_price) * 100
+            else:
+                profit_percent = ((entry_price - close_price) / entry_price) * 100
+
+            closed_rows.append({
+                'id': self._next_closed_id + i,
+                'symbol': symbol,
+                'direction': position['direction'],
+                'entry_price': entry_price,
+                'close_price': close_price,
+                'profit_percent': profit_percent,
+                'close_type': close_type,
+                'entry_time': position['entry_time'],
+                'close_time': close_time,
+                'chat_id': position['chat_id'],
+                'signal_id': group_key,
+            })
+            results.append({
+                'id': position['id'],
+                'chat_id': position['chat_id'],
+                'signal_id': group_key,
+                'symbol': symbol,
+                'direction': position['direction'],
+                'entry_price': entry_price,
+                'close_price': close_price,
+                'profit_percent': profit_percent,
+                'close_type': close_type
+            })
+
+        ids = [position['id'] for position in group]
+        # Drop the pending signal row too, so a late /girdim can't confirm a finished trade
+        pending = self._active.get(group_key)
+        if pending is not None and not pending['confirmed']:
+            ids.append(group_key)
+        self._apply_close(ids, closed_rows)
+        self._log({'op': 'close', 'ids': ids, 'closed': closed_rows})
+        return results
+
+    # --- Subscribers ---
+
+    def add_subscriber(self, chat_id: int, symbols: Optional[List[str]] = None):
+        """Subscribe a chat; symbols limits it to those pairs (None = all)"""
+        self._apply_subscribe(chat_id, symbols)
+        self._log({'op': 'subscribe', 'chat_id': chat_id, 'symbols': self._subscribers[chat_id]})
+
+    def remove_subscriber(self, chat_id: int) -> bool:
+        """Unsubscribe a chat, returns False if it wasn't subscribed"""
+        if chat_id not in self._subscribers:
+            return False
+        self._apply_unsubscribe(chat_id)
+        self._log({'op': 'unsubscribe', 'chat_id': chat_id})
+        return True
+
+    def get_subscribers(self) -> Dict[int, Optional[List[str]]]:
+        """chat_id -> symbol filter (None = all symbols)"""
+        return {chat_id: (list(symbols) if symbols else None) for chat_id, symbols in self._subscribers.items()}
+
+    def cleanup_old_signals(self, hours: int = 24) -> int:
+        """Remove old unconfirmed signals, returns how many were removed"""
+        cutoff = now_ms() - hours * 60 * 60 * 1000
+        ids = [row['id'] for row in self._active.values()
+               if not row['confirmed'] and row['entry_time'] < cutoff]
+        if ids:
+            self._apply_delete(ids)
+            self._log({'op': 'delete', 'ids': ids})
+        return len(ids)
+
+    def get_stats(self) -> Dict:
+        """Get trading statistics"""
+        r = self._rollup
+        stats = summarize_stats(r['wins'], r['losses'], r['win_profit'], r['loss_amount'], r['total_profit'])
+        stats.update({
+            'equity': r['equity'],
+            'peak_equity': r['peak_equity'],
+            'max_drawdown': r['max_drawdown'],
+        })
+        return stats
+
+    def get_breakdown(self, dimension: str) -> List[Dict]:
+        """Per-bucket stats for 'symbol', 'weekday' or 'hour', best total profit first"""
+        if dimension not in BREAKDOWN_DIMENSIONS:
+            raise ValueError(f"Unknown breakdown dimension: {dimension}")
+
+        breakdown = []
+        for (dim, bucket), b in self._breakdown.items():
+            if dim != dimension:
+                continue
+            stats = summarize_stats(b['wins'], b['trades'] - b['wins'], b['win_profit'],
+                                    b['loss_amount'], b['total_profit'])
+            stats['bucket'] = bucket
+            breakdown.append(stats)
+
+        breakdown.sort(key=lambda b: b['total_profit'], reverse=True)
+        return breakdown
+
+    def get_equity_curve(self, limit: int = 100) -> List[Dict]:
+        """Most recent points of the equity curve, oldest first"""
+        return [dict(point) for point in self._equity_curve[-limit:]]
+
+
+class JsonlPositionStore(MemoryPositionStore):
+    """
+    Memory store backed by an append-only JSON-lines log.
+    Each change is one appended line (fsynced), so a crash can at worst
+    leave a torn final line, which is skipped on replay. Once the log
+    holds compact_records records it is rewritten as a snapshot.
+    """
+
+    def __init__(self, path: str, compact_records: int = 5000):
+        super().__init__()
+        self.path = path
+        self.compact_records = compact_records
+        # Records in the log file, snapshot included
+        self._records = 0
+        self._pending: List[str] = []
+        self._replay()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        self._records = 0
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            lines = f.readlines()
+
+        good_bytes = 0
+        for line_no, line in enumerate(lines, 1):
+            is_last = line_no == len(lines)
+            try:
+                # A line without its newline was cut off mid-write
+                if not line.endswith(b'\n'):
+                    raise ValueError("incomplete record")
+                record = json.loads(line) if line.strip() else None
+            except ValueError:
+                if not is_last:
+                    raise ValueError(f"{self.path}:{line_no}: corrupt record")
+                log.warning("%s: dropping torn last record", self.path)
+                # Cut it off so new appends start on a clean line
+                os.truncate(self.path, good_bytes)
+                break
+            if record is not None:
+                self._apply(record)
+                self._records += 1
+            good_bytes += len(line)
+
+    def _apply(self, record: Dict):
+        op = record['op']
+        if op == 'add':
+            self._apply_add(record['row'])
+        elif op == 'confirm':
+            self._apply_confirm(record['id'])
+        elif op == 'close':
+            if 'ids' in record:
+                self._apply_close(record['ids'], record['closed'])
+            else:
+                # Single-position records written before per-chat positions
+                self._apply_close([record['id']], [record['closed']])
+        elif op == 'delete':
+            self._apply_delete(record['ids'])
+        elif op == 'subscribe':
+            self._apply_subscribe(record['chat_id'], record['symbols'])
+        elif op == 'unsubscribe':
+            self._apply_unsubscribe(record['chat_id'])
+        elif op == 'snapshot':
+            self._apply_snapshot(record)
+        else:
+            raise ValueError(f"Unknown record op: {op}")
+
+    def _log(self, record: Dict):
+        self._pending.append(json.dumps(record, separators=(',', ':')) + '\n')
+        if self._batch_depth == 0:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self._file.write(''.join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records += len(self._pending)
+        self._pending = []
+
+    def _maybe_compact(self):
+        if self._batch_depth == 0 and self._records >= self.compact_records:
+            self.compact()
+
+    def close_positions(self, symbol: str, close_price: float, close_type: str = 'tp1') -> List[Dict]:
+        results = super().close_positions(symbol, close_price, close_type)
+        if results:
+            self._maybe_compact()
+        return results
+
+    def begin_batch(self):
+        self._batch_depth += 1
+
+    def end_batch(self, ok: bool = True):
+        self._batch_depth -= 1
+        self._batch_failed = self._batch_failed or not ok
+        if self._batch_depth == 0:
+            if self._batch_failed:
+                self._rollback()
+            else:
+                self._flush()
+                self._maybe_compact()
+            self._batch_failed = False
+
+    def _rollback(self):
+        """Drop the unflushed records and rebuild state from the log"""
+        self._pending = []
+        MemoryPositionStore.__init__(self)
+        self._replay()
+
+    def close(self):
+        if self._file is not None:
+            self._flush()
+            # Start the next run from a snapshot unless the log already is one
+            if self._records > len(self._active) + 1:
+                self.compact()
+            self._file.close()
+            self._file = None
+
+    def _apply_snapshot(self, record: Dict):
+        self._rollup = dict(record['rollup'])
+        self._breakdown = {(dim, bucket): dict(b) for dim, bucket, b in record['breakdown']}
+        self._equity_curve = list(record['equity_curve'])
+        self._next_id = max(self._next_id, record['next_id'])
+        self._next_closed_id = max(self._next_closed_id, record['next_closed_id'])
+        # JSON object keys are strings
+        self._subscribers = {int(chat_id): symbols for chat_id, symbols in record.get('subscribers', {}).items()}
+
+    def compact(self):
+        """Rewrite the log as one snapshot plus the active rows (atomic replace)"""
+        self._flush()
+        snapshot = {
+            'op': 'snapshot',
+            'rollup': self._rollup,
+            'breakdown': [[dim, bucket, b] for (dim, bucket), b in self._breakdown.items()],
+            'equity_curve': self._equity_curve,
+            'next_id': self._next_id,
+            'next_closed_id': self._next_closed_id,
+            'subscribers': self._subscribers,
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot, separators=(',', ':')) + '\n')
+            for row in self._active.values():
+                f.write(json.dumps({'op': 'add', 'row': row}, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._records = len(self._active) + 1
+
+
+def open_store(spec: str, persistent: bool = False):
+    """
+    Create a backend from a spec string ('sqlite:positions.db',
+    'jsonl:state.jsonl' or 'memory'). persistent only affects SQLite.
+    """
+    kind, _, path = spec.partition(':')
+    if kind == 'sqlite':
+        return PositionTracker(path or "positions.db", persistent=persistent)
+    if kind == 'jsonl':
+        return JsonlPositionStore(path or "positions.jsonl", config.JSONL_COMPACT_RECORDS)
+    if kind == 'memory':
+        return MemoryPositionStore()
+    raise ValueError(f"Unknown state backend: {spec}")
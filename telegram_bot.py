@@ -2,22 +2,160 @@
 Telegram Bot - Sends signals and receives user confirmation
 """
 import asyncio
+import html
+import logging
+import re
+import secrets
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, RetryAfter
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+import clock
 import config
+import event_log
+from outbox import MAX_MESSAGE_LENGTH, Outbox
+import risk_sim
+from webhook_server import WebhookServer
+
+
+log = event_log.get_logger('telegram_bot')
+
+
+WEEKDAYS_TR = ['Pazartesi', 'Salı', 'Çarşamba', 'Perşembe', 'Cuma', 'Cumartesi', 'Pazar']
+
+# Telegram's limit for photo captions
+MAX_CAPTION_LENGTH = 1024
+
+# /loglar level filters (English and Turkish names)
+LOG_LEVELS = {'DEBUG': logging.DEBUG, 'INFO': logging.INFO, 'BILGI': logging.INFO,
+              'WARNING': logging.WARNING, 'UYARI': logging.WARNING, 'ERROR': logging.ERROR, 'HATA': logging.ERROR}
 
 
 class TelegramAlertBot:
-    def __init__(self, position_tracker=None):
+    def __init__(self, position_tracker=None,
+                 explain: Optional[Callable[[str, Optional[str]], Awaitable[str]]] = None,
+                 latency=None,
+                 profile: Optional[Callable[[int, Optional[int]], None]] = None):
         self.token = config.TELEGRAM_BOT_TOKEN
         self.chat_id = config.CHAT_ID
         self.position_tracker = position_tracker
+        # (symbol, session date or None) -> decision trace text, see orb_trace.py
+        self.explain = explain
+        # LatencyLog; the outbox stamps Telegram's ack on each alert's row
+        self.latency = latency
+        # (cycles, chat_id) -> profile the next scan cycles, see profiler.py
+        self.profile = profile
         self.app = None
+        self.webhook: Optional[WebhookServer] = None
         self._running = False
+        
+        # chat_id -> allowed symbols (None = all); mirrors the subscriber tables
+        self._subscribers: Dict[int, Optional[Set[str]]] = {}
+        # symbol -> chat ids, computed on first use and dropped on any change
+        self._fanout: Dict[str, List[int]] = {}
+        # (command, chat_id) -> (tracker version it was built at, rendered HTML)
+        self._responses: "OrderedDict[Tuple[str, int], Tuple[int, str]]" = OrderedDict()
+        # Pinned status board: message id once found or sent, and its current text
+        self._board_message_id: Optional[int] = None
+        self._board_text: Optional[str] = None
+        # Newest render not yet applied, and the task applying renders
+        self._board_pending: Optional[str] = None
+        self._board_task: Optional[asyncio.Task] = None
+        
+        # Every outgoing alert goes through the durable, rate-limited outbox
+        self.outbox = Outbox(
+            self._send_now,
+            db_path=config.OUTBOX_DB,
+            global_rate=config.TELEGRAM_GLOBAL_RATE,
+            chat_interval=config.TELEGRAM_CHAT_INTERVAL,
+            group_interval=config.TELEGRAM_GROUP_INTERVAL,
+            digest_min=config.DIGEST_MIN_SIGNALS,
+            digest_window=config.DIGEST_WINDOW,
+            max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+            # Blocked bot / deleted chat / malformed message: retrying won't help
+            permanent_errors=(Forbidden, BadRequest),
+            on_delivered=latency.mark_acked if latency else None,
+        )
+    
+    async def _load_subscribers(self):
+        """Load subscribers; the configured chat is subscribed on first run"""
+        if not self.position_tracker:
+            self._set_subscribers({self.chat_id: None})
+            return
+        
+        subscribers = await self.position_tracker.get_subscribers()
+        if not subscribers:
+            await self.position_tracker.add_subscriber(self.chat_id)
+            subscribers = {self.chat_id: None}
+        self._set_subscribers(subscribers)
+    
+    def _set_subscribers(self, subscribers: Dict[int, Optional[List[str]]]):
+        self._subscribers = {
+            chat_id: (set(symbols) if symbols else None) for chat_id, symbols in subscribers.items()
+        }
+        self._fanout.clear()
+    
+    def chats_for(self, symbol: str) -> List[int]:
+        """Chats whose filter accepts symbol (computed once per symbol)"""
+        chats = self._fanout.get(symbol)
+        if chats is None:
+            chats = [chat_id for chat_id, symbols in self._subscribers.items()
+                     if symbols is None or symbol in symbols]
+            self._fanout[symbol] = chats
+        return chats
+    
+    def chats_for_positions(self, positions: Iterable[Dict]) -> List[int]:
+        """Chats that hold these positions (pre-subscription rows -> default chat)"""
+        return sorted({pos.get('chat_id') or self.chat_id for pos in positions})
+    
+    async def _send_now(self, chat_id: int, text: str, buttons: Optional[List] = None,
+                        photo: Union[str, bytes, None] = None) -> Optional[str]:
+        """Deliver one message; called by the outbox sender. Returns the photo's file_id"""
+        reply_markup = None
+        if buttons:
+            reply_markup = InlineKeyboardMarkup([
+                [InlineKeyboardButton(label, callback_data=data) for label, data in row]
+                for row in buttons
+            ])
+        
+        if photo is not None and len(text) <= MAX_CAPTION_LENGTH:
+            message = await self.app.bot.send_photo(
+                chat_id=chat_id,
+                photo=photo,
+                caption=text,
+                parse_mode='HTML',
+                reply_markup=reply_markup
+            )
+            return message.photo[-1].file_id if message.photo else None
+        
+        await self.app.bot.send_message(
+            chat_id=chat_id,
+            text=text,
+            parse_mode='HTML',
+            reply_markup=reply_markup
+        )
+        return None
+    
+    async def _broadcast(self, chat_ids: Iterable[int], text: str, buttons: Optional[List] = None,
+                         digest_line: Optional[str] = None, digest_buttons: Optional[List] = None,
+                         chart: Optional[Tuple[str, bytes]] = None, latency_id: Optional[int] = None):
+        """
+        Queue the same rendered message for several chats. Buttons are rows
+        of (label, callback_data) so they can be stored in the outbox; chart
+        is an optional (key, PNG) attached as a photo.
+        """
+        await self.outbox.enqueue(chat_ids, text, buttons, digest_line, digest_buttons, chart, latency_id)
     
     async def start(self):
         """Start the bot"""
-        self.app = Application.builder().token(self.token).build()
+        builder = (Application.builder()
+                   .token(self.token)
+                   .concurrent_updates(config.TELEGRAM_CONCURRENT_UPDATES))
+        if config.TELEGRAM_API_URL:
+            builder = (builder.base_url(f"{config.TELEGRAM_API_URL}/bot")
+                       .base_file_url(f"{config.TELEGRAM_API_URL}/file/bot"))
+        self.app = builder.build()
         
         # Add handlers
         self.app.add_handler(CommandHandler("start", self.cmd_start))
@@ -26,27 +164,64 @@ class TelegramAlertBot:
         self.app.add_handler(CommandHandler("istatistik", self.cmd_stats))
         self.app.add_handler(CommandHandler("istatistikler", self.cmd_stats))
         self.app.add_handler(CommandHandler("yardim", self.cmd_help))
+        self.app.add_handler(CommandHandler("abone", self.cmd_subscribe))
+        self.app.add_handler(CommandHandler("ayril", self.cmd_unsubscribe))
+        self.app.add_handler(CommandHandler("neden", self.cmd_explain))
+        self.app.add_handler(CommandHandler("risk", self.cmd_risk))
+        self.app.add_handler(CommandHandler("gecikme", self.cmd_latency))
+        self.app.add_handler(CommandHandler("profil", self.cmd_profile))
+        self.app.add_handler(CommandHandler("loglar", self.cmd_logs))
         self.app.add_handler(CallbackQueryHandler(self.button_callback))
         
+        await self._load_subscribers()
+        
         await self.app.initialize()
         await self.app.start()
-        # drop_pending_updates=True fixes conflict when previous instance wasn't closed properly
-        await self.app.updater.start_polling(drop_pending_updates=True)
+        if config.WEBHOOK_URL:
+            await self._start_webhook()
+        else:
+            # drop_pending_updates=True fixes conflict when previous instance wasn't closed properly
+            await self.app.updater.start_polling(drop_pending_updates=True)
+        await self.outbox.start()
         self._running = True
         
-        print("[+] Telegram bot started!")
+        log.info("Telegram bot started!")
+    
+    async def _start_webhook(self):
+        """Listen for pushed updates instead of long polling"""
+        secret = config.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+        self.webhook = WebhookServer(self.app, secret, config.WEBHOOK_LISTEN,
+                                     config.WEBHOOK_PORT, config.WEBHOOK_PATH)
+        await self.webhook.start()
+        await self.app.bot.set_webhook(
+            url=config.WEBHOOK_URL,
+            secret_token=secret,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=config.TELEGRAM_CONCURRENT_UPDATES,
+            drop_pending_updates=True
+        )
     
     async def stop(self):
         """Stop the bot"""
         if self.app and self._running:
-            await self.app.updater.stop()
+            if self._board_task:
+                self._board_task.cancel()
+            await self.outbox.stop()
+            if self.webhook:
+                # The webhook stays registered so Telegram queues updates until restart
+                await self.webhook.stop()
+                self.webhook = None
+            else:
+                await self.app.updater.stop()
             await self.app.stop()
             await self.app.shutdown()
             self._running = False
     
     async def send_entry_signal(self, symbol: str, direction: str, entry_price: float, 
-                                sl_price: float, signal_id: int = None, candle_time: int = None):
-        """Send entry signal to user"""
+                                sl_price: float, signal_id: int = None, candle_time: int = None,
+                                chart: Optional[Tuple[str, bytes]] = None, latency_id: Optional[int] = None,
+                                tp_price: Optional[float] = None):
+        """Send entry signal to user (tp_price for a fixed TP1 target)"""
         from datetime import datetime, timezone, timedelta
         emoji = "🟢" if direction == "buy" else "🔴"
         direction_tr = "LONG" if direction == "buy" else "SHORT"
@@ -58,8 +233,9 @@ class TelegramAlertBot:
             turkey_time = utc_time.astimezone(turkey_tz)
             candle_time_str = turkey_time.strftime("%H:%M")
         else:
-            candle_time_str = datetime.now().strftime("%H:%M")
+            candle_time_str = datetime.fromtimestamp(clock.now()).strftime("%H:%M")
         
+        tp_line = f"\n🎯 <b>TP1:</b> {tp_price:.4f}" if tp_price is not None else ""
         message = f"""
 {emoji} <b>{direction_tr} Sinyali!</b>
 
@@ -67,24 +243,27 @@ class TelegramAlertBot:
 ⏰ <b>Timeframe:</b> 15dk
 🕐 <b>Mum Saati:</b> {candle_time_str}
 💰 <b>Giriş:</b> {entry_price:.4f}
-🛑 <b>Stop Loss:</b> {sl_price:.4f}
+🛑 <b>Stop Loss:</b> {sl_price:.4f}{tp_line}
 
 Pozisyona girdiyseniz /girdim yazın
 """
         
         # Add inline button
-        keyboard = [[InlineKeyboardButton("✅ Girdim", callback_data=f"confirm_{signal_id}_{symbol}")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        callback_data = f"confirm_{signal_id}_{symbol}"
+        keyboard = [[("✅ Girdim", callback_data)]]
         
-        await self.app.bot.send_message(
-            chat_id=self.chat_id,
-            text=message,
-            parse_mode='HTML',
-            reply_markup=reply_markup
-        )
+        # A burst of entries for one chat is merged into a digest of these lines
+        digest_line = (f"{emoji} <b>{symbol}</b> {direction_tr} @ {entry_price:.4f} "
+                       f"| SL {sl_price:.4f} | {candle_time_str}")
+        digest_keyboard = [[(f"✅ Girdim {symbol}", callback_data)]]
+        
+        # Rendered once, delivered to every subscribed chat
+        await self._broadcast(self.chats_for(symbol), message, keyboard, digest_line, digest_keyboard, chart,
+                              latency_id)
     
     async def send_close_signal(self, symbol: str, direction: str, entry_price: float,
-                                close_price: float, profit_percent: float):
+                                close_price: float, profit_percent: float, chat_ids: List[int] = None,
+                                chart: Optional[Tuple[str, bytes]] = None, latency_id: Optional[int] = None):
         """Send TP1/Close signal to user"""
         profit_emoji = "📈" if profit_percent > 0 else "📉"
         profit_sign = "+" if profit_percent > 0 else ""
@@ -98,14 +277,11 @@ Pozisyona girdiyseniz /girdim yazın
 {profit_emoji} <b>Kar:</b> {profit_sign}{profit_percent:.2f}%
 """
         
-        await self.app.bot.send_message(
-            chat_id=self.chat_id,
-            text=message,
-            parse_mode='HTML'
-        )
+        await self._broadcast(chat_ids or [self.chat_id], message, chart=chart, latency_id=latency_id)
     
     async def send_stoploss_signal(self, symbol: str, entry_price: float, 
-                                   sl_price: float, loss_percent: float):
+                                   sl_price: float, loss_percent: float, chat_ids: List[int] = None,
+                                   chart: Optional[Tuple[str, bytes]] = None, latency_id: Optional[int] = None):
         """Send stop loss notification"""
         message = f"""
 🛑 <b>Stop Loss Tetiklendi!</b>
@@ -116,11 +292,119 @@ Pozisyona girdiyseniz /girdim yazın
 📉 <b>Kayıp:</b> -{loss_percent:.2f}%
 """
         
-        await self.app.bot.send_message(
-            chat_id=self.chat_id,
-            text=message,
-            parse_mode='HTML'
-        )
+        await self._broadcast(chat_ids or [self.chat_id], message, chart=chart, latency_id=latency_id)
+    
+    async def send_ops_alert(self, text: str):
+        """Operational warning (stalls, overruns) for OPS_CHAT_ID"""
+        await self._broadcast([config.OPS_CHAT_ID], f"⚠️ <b>Ops</b>\n\n{html.escape(text)}")
+    
+    def _render_status_board(self, statuses: Dict[str, Optional[Dict]]) -> str:
+        """One line per pair from ORBAlgo.status; no clock in it, so unchanged states render identically"""
+        lines = []
+        for symbol, st in statuses.items():
+            state = st['state'] if st else 'no_data'
+            if state == 'no_data':
+                lines.append(f"⚪ <b>{symbol}</b> veri yok")
+                continue
+            if state == 'no_orb':
+                lines.append(f"⚪ <b>{symbol}</b> ORB bekleniyor")
+                continue
+            
+            orb = f"ORB {st['orb_low']:.4f}-{st['orb_high']:.4f}"
+            if state == 'waiting':
+                lines.append(f"⏳ <b>{symbol}</b> bekliyor | {orb}")
+            elif state == 'in_breakout':
+                arrow = "⬆️" if st['breakout_bullish'] else "⬇️"
+                lines.append(f"{arrow} <b>{symbol}</b> kırılım, retest {st['retests']}/{config.RETESTS_NEEDED} | {orb}")
+            elif state == 'entry_taken':
+                is_long = st['direction'] == 'buy'
+                pnl = (st['last_close'] - st['entry_price']) / st['entry_price'] * 100 * (1 if is_long else -1)
+                lines.append(f"{'🟢' if is_long else '🔴'} <b>{symbol}</b> {'LONG' if is_long else 'SHORT'} "
+                             f"@ {st['entry_price']:.4f} | SL {st['sl_price']:.4f} | {pnl:+.2f}%")
+            elif state == 'closed':
+                is_long = st['direction'] == 'buy'
+                pnl = (st['exit_price'] - st['entry_price']) / st['entry_price'] * 100 * (1 if is_long else -1)
+                label = "TP1" if st['exit_reason'] == 'tp1' else "SL"
+                lines.append(f"{'✅' if st['exit_reason'] == 'tp1' else '❌'} <b>{symbol}</b> kapandı ({label}) {pnl:+.2f}%")
+        
+        sessions = sorted({st['session'] for st in statuses.values() if st and st.get('session')})
+        header = f"📋 <b>ORB Durum Panosu</b> {sessions[-1] if sessions else ''}".rstrip()
+        return header + "\n\n" + "\n".join(lines)
+    
+    def update_status_board(self, statuses: Dict[str, Optional[Dict]]):
+        """
+        Keep one pinned board in the default chat. The message is edited only
+        when its rendered text changed since the last cycle. A background task
+        applies the newest render, so callers never wait on chat pacing.
+        """
+        text = self._render_status_board(statuses)
+        if text == self._board_text or not self.app:
+            return
+        self._board_pending = text
+        if self._board_task is None or self._board_task.done():
+            self._board_task = asyncio.create_task(self._board_worker())
+    
+    async def _board_worker(self):
+        """Apply board renders until none is pending; older ones are skipped"""
+        while self._board_pending is not None:
+            text, self._board_pending = self._board_pending, None
+            await self._apply_status_board(text)
+    
+    async def _apply_status_board(self, text: str):
+        """Edit, or send and pin, the board; each call takes an outbox slot"""
+        if text == self._board_text:
+            return
+        
+        bot = self.app.bot
+        if self._board_message_id is None:
+            # Reuse the board pinned by a previous run instead of pinning another
+            try:
+                chat = await bot.get_chat(self.chat_id)
+                pinned = chat.pinned_message
+                if pinned and pinned.from_user and pinned.from_user.id == bot.id:
+                    self._board_message_id = pinned.message_id
+            except Exception as e:
+                log.warning("Could not read pinned message: %s", e)
+        
+        if self._board_message_id is not None:
+            try:
+                await self.outbox.pace(self.chat_id)
+                await bot.edit_message_text(text, chat_id=self.chat_id,
+                                            message_id=self._board_message_id, parse_mode='HTML')
+                self._board_text = text
+                return
+            except BadRequest as e:
+                if 'not modified' in str(e).lower():
+                    self._board_text = text
+                    return
+                # Deleted or no longer editable: post a fresh board below
+                log.warning("Status board edit failed, posting a new one: %s", e)
+                self._board_message_id = None
+            except RetryAfter as e:
+                self._hold_board_chat(e)
+                return
+            except Exception as e:
+                log.warning("Status board edit failed: %s", e)
+                return
+        
+        try:
+            await self.outbox.pace(self.chat_id)
+            message = await bot.send_message(self.chat_id, text, parse_mode='HTML')
+            self._board_message_id = message.message_id
+            self._board_text = text
+            await self.outbox.pace(self.chat_id)
+            await bot.pin_chat_message(self.chat_id, message.message_id, disable_notification=True)
+        except RetryAfter as e:
+            self._hold_board_chat(e)
+        except Exception as e:
+            log.warning("Status board send failed: %s", e)
+    
+    def _hold_board_chat(self, e: RetryAfter):
+        """Flood control on a board call: queued messages to the chat wait too"""
+        retry_after = e.retry_after
+        delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+        log.warning("Status board rate limited, retry in %.0fs", delay)
+        self.outbox.hold(self.chat_id, delay)
     
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
@@ -133,6 +417,11 @@ Bu bot, ORB stratejisine göre kripto sinyalleri gönderir.
 /girdim - Pozisyona girdiğinizi onaylayın
 /pozisyonlar - Aktif pozisyonları görün
 /istatistik - Trading istatistikleri
+/risk - Monte Carlo risk analizi
+/gecikme [PARİTE] - Sinyal gecikme istatistikleri
+/abone [PARİTE...] - Sinyallere abone olun (isteğe bağlı parite filtresi)
+/ayril - Aboneliği bitirin
+/neden PARİTE [YYYY-AA-GG] - Algoritmanın kararlarını açıklar
 /yardim - Yardım
 
 Bot çalışıyor ve sinyalleri takip ediyor! 🚀
@@ -142,7 +431,11 @@ Bot çalışıyor ve sinyalleri takip ediyor! 🚀
     async def cmd_girdim(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /girdim command - confirm position entry"""
         if self.position_tracker:
-            success = self.position_tracker.confirm_position()
+            # /girdim [PARİTE] confirms this chat's latest signal (optionally for one pair)
+            symbol = context.args[0].upper() if context.args else None
+            success = await self.position_tracker.confirm_position(
+                symbol=symbol, chat_id=update.effective_chat.id
+            )
             if success:
                 await update.message.reply_text("✅ Pozisyon onaylandı! TP1 takibi başladı.")
             else:
@@ -150,26 +443,55 @@ Bot çalışıyor ve sinyalleri takip ediyor! 🚀
         else:
             await update.message.reply_text("❌ Position tracker bağlı değil.")
     
+    def _cached_response(self, key: Tuple[str, int], version: int) -> Optional[str]:
+        """Rendered response for key if nothing was written since it was built"""
+        cached = self._responses.get(key)
+        if cached and cached[0] == version:
+            self._responses.move_to_end(key)
+            return cached[1]
+        return None
+    
+    def _store_response(self, key: Tuple[str, int], version: int, message: str):
+        """Cache a rendered response; LRU-bounded, older versions of the same command are dropped"""
+        for stale in [k for k, (v, _) in self._responses.items() if k[0] == key[0] and v != version]:
+            del self._responses[stale]
+        self._responses[key] = (version, message)
+        self._responses.move_to_end(key)
+        if len(self._responses) > config.RESPONSE_CACHE_SIZE:
+            self._responses.popitem(last=False)
+    
     async def cmd_positions(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /pozisyonlar command - show active positions"""
         if not self.position_tracker:
             await update.message.reply_text("❌ Position tracker bağlı değil.")
             return
         
-        positions = self.position_tracker.get_confirmed_positions()
+        chat_id = update.effective_chat.id
+        version = self.position_tracker.version
+        message = self._cached_response(('positions', chat_id), version)
+        if message is None:
+            message = self._render_positions(chat_id)
+            self._store_response(('positions', chat_id), version, message)
+        
+        await update.message.reply_text(message, parse_mode='HTML')
+    
+    def _render_positions(self, chat_id: int) -> str:
+        positions = [pos for pos in self.position_tracker.get_confirmed_positions()
+                     if pos['chat_id'] in (chat_id, None)]
         
         if not positions:
-            await update.message.reply_text("📋 Aktif pozisyon yok.")
-            return
+            return "📋 Aktif pozisyon yok."
         
         message = "📋 <b>Aktif Pozisyonlar:</b>\n\n"
         for pos in positions:
             emoji = "🟢" if pos['direction'] == 'buy' else "🔴"
             message += f"{emoji} {pos['symbol']}\n"
             message += f"   Giriş: {pos['entry_price']:.4f}\n"
-            message += f"   SL: {pos['sl_price']:.4f}\n\n"
-        
-        await update.message.reply_text(message, parse_mode='HTML')
+            message += f"   SL: {pos['sl_price']:.4f}\n"
+            if pos.get('tp_price') is not None:
+                message += f"   TP1: {pos['tp_price']:.4f}\n"
+            message += "\n"
+        return message
     
     async def cmd_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /istatistik command - show trading stats"""
@@ -177,7 +499,23 @@ Bot çalışıyor ve sinyalleri takip ediyor! 🚀
             await update.message.reply_text("❌ Position tracker bağlı değil.")
             return
         
-        stats = self.position_tracker.get_stats()
+        # Stats only change when a position closes; same text for every chat
+        version = self.position_tracker.stats_version
+        message = self._cached_response(('stats', 0), version)
+        if message is None:
+            message = await self._render_stats()
+            self._store_response(('stats', 0), version, message)
+        
+        await update.message.reply_text(message, parse_mode='HTML')
+    
+    async def _render_stats(self) -> str:
+        stats = await self.position_tracker.get_stats()
+        by_symbol = await self.position_tracker.get_breakdown('symbol')
+        by_weekday = await self.position_tracker.get_breakdown('weekday')
+        by_hour = await self.position_tracker.get_breakdown('hour')
+        
+        profit_factor = stats['profit_factor']
+        profit_factor_str = f"{profit_factor:.2f}" if profit_factor is not None else "∞"
         
         message = f"""
 📊 <b>Trading İstatistikleri</b>
@@ -187,9 +525,182 @@ Bot çalışıyor ve sinyalleri takip ediyor! 🚀
 ❌ Kaybeden: {stats['losses']}
 🎯 Winrate: {stats['winrate']:.1f}%
 💰 Toplam Kar: {stats['total_profit']:.2f}%
+
+⚖️ Profit Factor: {profit_factor_str}
+🎲 Beklenti: {stats['expectancy']:+.2f}% / işlem
+📉 Max Drawdown: -{stats['max_drawdown']:.2f}%
+"""
+        
+        if by_symbol:
+            message += "\n🏆 <b>En İyi Pariteler:</b>\n"
+            for b in by_symbol[:3]:
+                message += f"   {b['bucket']}: {b['total_profit']:+.2f}% ({b['total_trades']} işlem)\n"
+            
+            worst = [b for b in by_symbol[-3:] if b['total_profit'] < 0]
+            if worst:
+                message += "\n⚠️ <b>En Kötü Pariteler:</b>\n"
+                for b in reversed(worst):
+                    message += f"   {b['bucket']}: {b['total_profit']:+.2f}% ({b['total_trades']} işlem)\n"
+        
+        if by_weekday:
+            best_day = by_weekday[0]
+            day_name = WEEKDAYS_TR[int(best_day['bucket'])]
+            message += f"\n📅 En İyi Gün: {day_name} ({best_day['total_profit']:+.2f}%)\n"
+        
+        if by_hour:
+            best_hour = by_hour[0]
+            message += f"🕐 En İyi Saat (UTC): {best_hour['bucket']}:00 ({best_hour['total_profit']:+.2f}%)\n"
+        
+        return message
+    
+    async def cmd_risk(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /risk command - Monte Carlo over the closed trades"""
+        if not self.position_tracker:
+            await update.message.reply_text("❌ Position tracker bağlı değil.")
+            return
+        if not risk_sim.HAS_NUMPY:
+            await update.message.reply_text("❌ Risk simülasyonu için numpy kurulu değil.")
+            return
+        
+        # Like /istatistik, the ledger only changes when a position closes
+        version = self.position_tracker.stats_version
+        message = self._cached_response(('risk', 0), version)
+        if message is None:
+            message = await self._render_risk()
+            self._store_response(('risk', 0), version, message)
+        
+        await update.message.reply_text(message, parse_mode='HTML')
+    
+    async def _render_risk(self) -> str:
+        curve = await self.position_tracker.get_equity_curve(config.RISK_MAX_TRADES + 1)
+        returns = risk_sim.returns_from_equity(curve, config.RISK_MAX_TRADES)
+        if len(returns) < config.RISK_MIN_TRADES:
+            return f"📉 Risk analizi için en az {config.RISK_MIN_TRADES} kapanmış işlem gerekli ({len(returns)} var)."
+        
+        # CPU-bound but short; keep it off the event loop
+        boot, shuffled = await asyncio.gather(*(
+            asyncio.to_thread(risk_sim.simulate, returns, config.RISK_SIM_RUNS, method=method,
+                              ruin_drawdown=config.RISK_RUIN_DRAWDOWN, batch=config.RISK_SIM_BATCH)
+            for method in ('bootstrap', 'shuffle')
+        ))
+        final = boot['final']
+        return f"""
+🎲 <b>Monte Carlo Risk Analizi</b>
+{boot['ledger_trades']} işlem, {boot['runs']} simülasyon
+
+📈 <b>{boot['trades']} işlem sonrası getiri:</b>
+   Kötü (%5): {final[5]:+.2f}%
+   Medyan: {final[50]:+.2f}%
+   İyi (%95): {final[95]:+.2f}%
+   Zarar olasılığı: {boot['prob_loss']:.1f}%
+
+📉 <b>Max Drawdown:</b>
+   Medyan: -{boot['max_drawdown'][50]:.2f}%
+   %95: -{boot['max_drawdown'][95]:.2f}%
+   %99: -{boot['max_drawdown'][99]:.2f}%
+   Aynı işlemler farklı sırayla (%95): -{shuffled['max_drawdown'][95]:.2f}%
+
+💀 İflas riski (≥{config.RISK_RUIN_DRAWDOWN:g}% düşüş): {boot['risk_of_ruin']:.1f}%
 """
+    
+    async def cmd_latency(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /gecikme [SYMBOL] - candle close to Telegram ack percentiles"""
+        if not self.latency:
+            await update.message.reply_text("❌ Gecikme kaydı bağlı değil.")
+            return
+        
+        symbol = context.args[0].upper() if context.args else None
+        summary = await self.latency.summary(config.LATENCY_WINDOW_DAYS, symbol)
+        if not summary['count']:
+            await update.message.reply_text("⏱ Henüz gecikme kaydı yok.")
+            return
+        
+        scope = symbol or "Tüm pariteler"
+        lines = [f"{'Aşama':<8} {'p50':>7} {'p95':>7} {'p99':>7}"]
+        for phase, p in summary['phases'].items():
+            lines.append(f"{phase:<8} {p[50]:>6.1f}s {p[95]:>6.1f}s {p[99]:>6.1f}s")
+        
+        if not symbol and summary['symbols']:
+            lines.append("")
+            lines.append(f"{'Parite':<12} {'n':>4} {'p50':>7} {'p95':>7} {'p99':>7}")
+            ranked = sorted(summary['symbols'].items(), key=lambda kv: kv[1][95], reverse=True)
+            for sym, p in ranked[:15]:
+                lines.append(f"{sym:<12} {p['count']:>4} {p[50]:>6.1f}s {p[95]:>6.1f}s {p[99]:>6.1f}s")
+        
+        if summary['acked']:
+            lines.append("")
+            peak = max(n for _, n in summary['histogram']) or 1
+            for label, n in summary['histogram']:
+                lines.append(f"{label:>8} {'█' * round(n / peak * 20):<20} {n}")
+        
+        table = html.escape("\n".join(lines))
+        message = (f"⏱ <b>Sinyal Gecikmesi</b> ({scope}, son {config.LATENCY_WINDOW_DAYS:g} gün)\n"
+                   f"{summary['count']} bildirim, {summary['acked']} teslim edildi\n\n"
+                   f"<pre>{table}</pre>")
         await update.message.reply_text(message, parse_mode='HTML')
     
+    async def cmd_profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /profil [N] - admin: profile the next N scan cycles"""
+        chat_id = update.effective_chat.id
+        if chat_id not in config.ADMIN_CHAT_IDS:
+            await update.message.reply_text("❌ Bu komut sadece yönetici sohbetinde kullanılabilir.")
+            return
+        if not self.profile:
+            await update.message.reply_text("❌ Profil bu modda kullanılamıyor.")
+            return
+        
+        try:
+            cycles = int(context.args[0]) if context.args else config.PROFILE_DEFAULT_CYCLES
+        except ValueError:
+            await update.message.reply_text("❌ Kullanım: /profil [DÖNGÜ SAYISI]")
+            return
+        cycles = max(1, min(cycles, config.PROFILE_MAX_CYCLES))
+        self.profile(cycles, chat_id)
+        await update.message.reply_text(f"🔬 Sonraki {cycles} tarama döngüsü profilleniyor; bitince özet gönderilecek.")
+    
+    async def send_profile_summary(self, chat_id: int, summary: Dict):
+        """Summary of a finished profiling run (full output is on disk)"""
+        lines = [f"{pct:5.1f}%  {name}" for name, pct in summary['top']]
+        if summary['allocations']:
+            lines.append("")
+            lines += [f"{size / 1024:8.1f} KiB  {where}" for where, size, _ in summary['allocations']]
+        table = html.escape("\n".join(lines))
+        message = f"""🔬 <b>Profil Tamamlandı</b>
+
+{summary['cycles']} döngü, {summary['duration']:.1f}s, {summary['samples']} örnek
+Mum verisi: {summary['candle_bytes'] / 1024:.1f} KiB, tepe bellek: {summary['peak'] / 1024 / 1024:.1f} MiB
+
+<pre>{table}</pre>
+Dosyalar: {html.escape(', '.join(summary['files']))}"""
+        await self._broadcast([chat_id], message)
+    
+    async def cmd_logs(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /loglar [N] [LEVEL|SYMBOL] - admin: recent events from the in-memory log buffer"""
+        if update.effective_chat.id not in config.ADMIN_CHAT_IDS:
+            await update.message.reply_text("❌ Bu komut sadece yönetici sohbetinde kullanılabilir.")
+            return
+        
+        limit, min_level, match = config.LOG_COMMAND_LINES, logging.DEBUG, None
+        for arg in context.args or []:
+            if arg.isdigit():
+                limit = max(1, min(int(arg), config.LOG_RING_SIZE))
+            elif arg.upper() in LOG_LEVELS:
+                min_level = LOG_LEVELS[arg.upper()]
+            else:
+                match = arg
+        
+        events = event_log.recent(limit, min_level, match)
+        if not events:
+            await update.message.reply_text("📭 Eşleşen kayıt yok.")
+            return
+        
+        # Keep the newest events if they outgrow one message
+        body = html.escape("\n".join(event_log.format_event(e) for e in events))
+        limit = MAX_MESSAGE_LENGTH - len("<pre></pre>") - 2
+        if len(body) > limit:
+            body = "…\n" + body[-(limit - 2):].split("\n", 1)[-1]
+        await update.message.reply_text(f"<pre>{body}</pre>", parse_mode='HTML')
+    
     async def cmd_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /yardim command"""
         message = """
@@ -204,9 +715,83 @@ Bot çalışıyor ve sinyalleri takip ediyor! 🚀
 /girdim - Pozisyon onayı
 /pozisyonlar - Aktif pozisyonlar
 /istatistik - İstatistikler
+/risk - Drawdown ve iflas riski simülasyonu
+/gecikme [PARİTE] - Mum kapanışından bildirime gecikme
+/abone [PARİTE...] - Abonelik / parite filtresi
+/ayril - Aboneliği bitir
+/neden PARİTE [YYYY-AA-GG] - Sinyal kararlarının dökümü
 """
         await update.message.reply_text(message, parse_mode='HTML')
     
+    async def cmd_subscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /abone [SYMBOL...] - subscribe this chat, optionally filtered"""
+        if not self.position_tracker:
+            await update.message.reply_text("❌ Position tracker bağlı değil.")
+            return
+        
+        chat_id = update.effective_chat.id
+        requested = [arg.upper() for arg in context.args]
+        symbols = [s for s in requested if s in config.TRADING_PAIRS]
+        unknown = [s for s in requested if s not in config.TRADING_PAIRS]
+        
+        if requested and not symbols:
+            await update.message.reply_text(f"❌ Bilinmeyen parite: {', '.join(unknown)}")
+            return
+        
+        await self.position_tracker.add_subscriber(chat_id, symbols or None)
+        self._subscribers[chat_id] = set(symbols) if symbols else None
+        self._fanout.clear()
+        
+        message = "🔔 Abonelik aktif: " + (", ".join(symbols) if symbols else "tüm pariteler")
+        if unknown:
+            message += f"\n⚠️ Atlanan: {', '.join(unknown)}"
+        await update.message.reply_text(message)
+    
+    async def cmd_unsubscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /ayril - unsubscribe this chat"""
+        if not self.position_tracker:
+            await update.message.reply_text("❌ Position tracker bağlı değil.")
+            return
+        
+        chat_id = update.effective_chat.id
+        removed = await self.position_tracker.remove_subscriber(chat_id)
+        self._subscribers.pop(chat_id, None)
+        self._fanout.clear()
+        
+        if removed:
+            await update.message.reply_text("🔕 Abonelik sonlandırıldı.")
+        else:
+            await update.message.reply_text("❌ Bu sohbet abone değil.")
+    
+    async def cmd_explain(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /neden SYMBOL [YYYY-MM-DD] - dump the algo's decision trace"""
+        if not self.explain:
+            await update.message.reply_text("❌ Karar izi bu modda kullanılamıyor.")
+            return
+    
+        if not context.args or context.args[0].upper() not in config.TRADING_PAIRS:
+            await update.message.reply_text("❌ Kullanım: /neden PARİTE [YYYY-AA-GG]")
+            return
+    
+        symbol = context.args[0].upper()
+        session_date = context.args[1] if len(context.args) > 1 else None
+        if session_date and not re.fullmatch(r'\d{4}-\d{2}-\d{2}', session_date):
+            await update.message.reply_text("❌ Tarih formatı: YYYY-AA-GG")
+            return
+    
+        try:
+            text = await self.explain(symbol, session_date)
+        except Exception as e:
+            await update.message.reply_text(f"❌ Karar izi alınamadı: {html.escape(str(e))}", parse_mode='HTML')
+            return
+    
+        # Keep the newest decisions if the trace outgrows one message
+        body = html.escape(text)
+        limit = MAX_MESSAGE_LENGTH - len("<pre></pre>") - 2
+        if len(body) > limit:
+            body = "…\n" + body[-(limit - 2):].split("\n", 1)[-1]
+        await update.message.reply_text(f"<pre>{body}</pre>", parse_mode='HTML')
+    
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle inline button clicks"""
         query = update.callback_query
@@ -220,16 +805,34 @@ Bot çalışıyor ve sinyalleri takip ediyor! 🚀
                 symbol = parts[2]
                 
                 if self.position_tracker:
-                    success = self.position_tracker.confirm_position(position_id=signal_id)
+                    success = await self.position_tracker.confirm_position(
+                        position_id=signal_id, chat_id=query.message.chat_id
+                    )
+                    # A digest carries one button per signal; keep the others
+                    remaining = [
+                        row for row in (query.message.reply_markup.inline_keyboard
+                                        if query.message.reply_markup else [])
+                        if row[0].callback_data != data
+                    ]
+                    reply_markup = InlineKeyboardMarkup(remaining) if remaining else None
                     if success:
-                        await query.edit_message_text(
-                            query.message.text + "\n\n✅ <b>Pozisyon onaylandı! TP1 takibi başladı.</b>",
-                            parse_mode='HTML'
+                        label = symbol if remaining else "Pozisyon"
+                        note = f"✅ <b>{label} onaylandı! TP1 takibi başladı.</b>"
+                    else:
+                        note = "❌ <b>Onaylama başarısız.</b>"
+                    
+                    # Signals with a chart are photos: their text is the caption
+                    if query.message.photo:
+                        await query.edit_message_caption(
+                            caption=query.message.caption + "\n\n" + note,
+                            parse_mode='HTML',
+                            reply_markup=reply_markup
                         )
                     else:
                         await query.edit_message_text(
-                            query.message.text + "\n\n❌ <b>Onaylama başarısız.</b>",
-                            parse_mode='HTML'
+                            query.message.text + "\n\n" + note,
+                            parse_mode='HTML',
+                            reply_markup=reply_markup
                         )
 
 
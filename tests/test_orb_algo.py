@@ -0,0 +1,36 @@
+"""ATR and adaptive stop arithmetic"""
+import pytest
+
+import config
+from orb_algo import adaptive_stop, atr_take_profit, calculate_atr
+
+
+def candle(high, low, close):
+    return {'high': high, 'low': low, 'close': close}
+
+
+def test_atr_seeds_with_average_then_uses_wilder_smoothing():
+    candles = [candle(11, 9, 10), candle(12, 10, 11), candle(15, 11, 14), candle(14, 13, 13.5)]
+    # True ranges: 2, 2, 4 (high - low), max(1, 0, 1) = 1
+    atr = calculate_atr(candles, period=2)
+    assert atr == pytest.approx([2.0, 2.0, 3.0, 2.0])
+
+
+def test_atr_take_profit_is_multiplier_times_atr(monkeypatch):
+    monkeypatch.setattr(config, 'TP_ATR_MULTIPLIER', 1.5)
+    assert atr_take_profit(100, True, 2) == 103
+    assert atr_take_profit(100, False, 2) == 97
+
+
+def test_adaptive_stop_moves_to_break_even_once_ema_was_in_profit(monkeypatch):
+    monkeypatch.setattr(config, 'ADAPTIVE_SL', True)
+    # 0.5% minimum: 100.6 qualifies for a long, 100.4 doesn't
+    assert adaptive_stop(100, 98, True, [100.4, 99.0], 0.5) == 98
+    assert adaptive_stop(100, 98, True, [100.4, 100.6, 99.0], 0.5) == 100
+    assert adaptive_stop(100, 102, False, [99.4], 0.5) == 100
+    assert adaptive_stop(100, 102, False, [100.6], 0.5) == 102
+
+
+def test_adaptive_stop_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(config, 'ADAPTIVE_SL', False)
+    assert adaptive_stop(100, 98, True, [110.0], 0.5) == 98
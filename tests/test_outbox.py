@@ -0,0 +1,115 @@
+"""Outbox planning (pacing, digests) and delivery outcomes"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from outbox import Outbox
+
+
+class FloodError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("flood control")
+        self.retry_after = retry_after
+
+
+class Blocked(Exception):
+    pass
+
+
+def row(row_id, chat_id, text='msg', digest_line=None, buttons=None):
+    return {'id': row_id, 'chat_id': chat_id, 'text': text,
+            'buttons': json.dumps(buttons) if buttons else None,
+            'digest_line': digest_line, 'digest_buttons': None, 'attempts': 0,
+            'media_key': None, 'latency_id': None}
+
+
+def make_outbox(tmp_path, send=None, **kwargs):
+    async def ok(chat_id, text, buttons, photo):
+        return None
+    kwargs.setdefault('digest_min', 3)
+    return Outbox(send or ok, db_path=str(tmp_path / 'outbox.db'), permanent_errors=(Blocked,), **kwargs)
+
+
+def test_plan_sends_oldest_message_per_ready_chat(tmp_path):
+    outbox = make_outbox(tmp_path)
+    plan = outbox._plan([row(1, 10, 'a'), row(2, 10, 'b'), row(3, 20, 'c', buttons=[['x', 'y']])])
+    assert plan == [(10, 'a', None, [1], None), (20, 'c', [['x', 'y']], [3], None)]
+
+
+def test_plan_skips_chats_still_paced(tmp_path):
+    outbox = make_outbox(tmp_path)
+    outbox._chat_ready[10] = time.monotonic() + 60
+    assert [entry[0] for entry in outbox._plan([row(1, 10), row(2, 20)])] == [20]
+
+
+def test_plan_merges_a_burst_into_a_digest(tmp_path):
+    outbox = make_outbox(tmp_path)
+    rows = [row(i, 10, f"full {i}", digest_line=f"line {i}", buttons=[[f"b{i}", f"d{i}"]]) for i in (1, 2, 3)]
+    [(chat_id, text, buttons, ids, media_key)] = outbox._plan(rows)
+    assert chat_id == 10 and ids == [1, 2, 3] and media_key is None
+    assert "3 yeni sinyal" in text and "line 1\nline 2\nline 3" in text
+    assert buttons == [['b1', 'd1'], ['b2', 'd2'], ['b3', 'd3']]
+
+
+def test_plan_below_digest_min_sends_singly(tmp_path):
+    outbox = make_outbox(tmp_path)
+    plan = outbox._plan([row(1, 10, 'full 1', digest_line='line 1'), row(2, 10, 'full 2', digest_line='line 2')])
+    assert plan == [(10, 'full 1', None, [1], None)]
+
+
+async def deliver_one(outbox, chat_id=10, attempts=0):
+    """Enqueue one message and run a single _deliver on it; returns the rows left"""
+    await outbox._db(outbox._open)
+    await outbox.enqueue([chat_id], 'hello')
+    [queued] = await outbox._db(outbox._fetch_due, int(time.time() * 1000))
+    await outbox._deliver(chat_id, 'hello', None, [queued['id']], None, attempts, [])
+    left = await outbox._db(outbox._fetch_due, int(time.time() * 1000) + 10 ** 9)
+    await outbox.stop()
+    return left
+
+
+def test_deliver_success_deletes_and_paces_the_chat(tmp_path):
+    sent = []
+
+    async def send(chat_id, text, buttons, photo):
+        sent.append((chat_id, text))
+
+    outbox = make_outbox(tmp_path, send, chat_interval=1.0)
+    left = asyncio.run(deliver_one(outbox))
+    assert sent == [(10, 'hello')] and left == []
+    assert outbox.stats() == {'sent': 1, 'digests': 0, 'failed': 0}
+    assert outbox._chat_ready[10] > time.monotonic() + 0.5
+
+
+def test_deliver_retry_after_holds_chat_without_counting_an_attempt(tmp_path):
+    async def send(chat_id, text, buttons, photo):
+        raise FloodError(30)
+
+    outbox = make_outbox(tmp_path, send)
+    [left] = asyncio.run(deliver_one(outbox))
+    assert left['attempts'] == 0
+    assert outbox.failed == 0
+    assert outbox._chat_ready[10] > time.monotonic() + 25
+
+
+def test_deliver_transient_error_retries_with_backoff(tmp_path):
+    async def send(chat_id, text, buttons, photo):
+        raise ConnectionError("network down")
+
+    outbox = make_outbox(tmp_path, send, max_attempts=5)
+    [left] = asyncio.run(deliver_one(outbox))
+    assert left['attempts'] == 1
+    assert outbox.failed == 0
+
+
+@pytest.mark.parametrize('error, attempts', [(Blocked("bot was blocked"), 0), (ConnectionError("down"), 4)])
+def test_deliver_drops_permanent_failures_and_exhausted_retries(tmp_path, error, attempts):
+    async def send(chat_id, text, buttons, photo):
+        raise error
+
+    outbox = make_outbox(tmp_path, send, max_attempts=5)
+    left = asyncio.run(deliver_one(outbox, attempts=attempts))
+    assert left == []
+    assert outbox.failed == 1
@@ -0,0 +1,120 @@
+"""Schema migrations and close semantics of the SQLite PositionTracker"""
+import sqlite3
+
+from position_tracker import SCHEMA_VERSION, PositionTracker, iso_to_ms
+
+
+V1_SCHEMA = '''
+    CREATE TABLE active_positions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        entry_price REAL NOT NULL,
+        sl_price REAL NOT NULL,
+        orb_high REAL,
+        orb_low REAL,
+        entry_time TEXT NOT NULL,
+        confirmed INTEGER DEFAULT 0
+    );
+    CREATE TABLE closed_positions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        entry_price REAL NOT NULL,
+        close_price REAL NOT NULL,
+        profit_percent REAL NOT NULL,
+        close_type TEXT NOT NULL,
+        entry_time TEXT NOT NULL,
+        close_time TEXT NOT NULL
+    );
+'''
+
+
+def columns(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    finally:
+        conn.close()
+
+
+def user_version(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_migrates_v1_database(tmp_path):
+    db_path = str(tmp_path / 'positions.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript(V1_SCHEMA)
+    conn.execute('''
+        INSERT INTO active_positions (symbol, direction, entry_price, sl_price, orb_high, orb_low, entry_time, confirmed)
+        VALUES ('BTCUSDT', 'buy', 100, 90, 105, 95, '2026-10-01T10:15:00', 1)
+    ''')
+    conn.executemany('''
+        INSERT INTO closed_positions
+        (symbol, direction, entry_price, close_price, profit_percent, close_type, entry_time, close_time)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        ('ETHUSDT', 'buy', 100, 110, 10.0, 'tp1', '2026-09-30T09:00:00', '2026-09-30T11:00:00'),
+        ('SOLUSDT', 'sell', 50, 55, -10.0, 'sl', '2026-09-30T12:00:00', '2026-09-30T13:00:00'),
+    ])
+    conn.commit()
+    conn.close()
+
+    tracker = PositionTracker(db_path)
+
+    assert user_version(db_path) == SCHEMA_VERSION
+    [position] = tracker.get_confirmed_positions()
+    assert position['symbol'] == 'BTCUSDT'
+    assert position['entry_time'] == iso_to_ms('2026-10-01T10:15:00')
+    assert position['chat_id'] is None
+    assert position['tp_price'] is None
+
+    stats = tracker.get_stats()
+    assert (stats['wins'], stats['losses']) == (1, 1)
+    assert stats['total_profit'] == 0.0
+    assert stats['max_drawdown'] == 10.0
+
+
+def test_migrates_v4_database_to_tp_price(tmp_path):
+    db_path = str(tmp_path / 'positions.db')
+    tracker = PositionTracker(db_path)
+    position_id = tracker.add_signal('BTCUSDT', 'buy', 100, 90)
+    tracker.confirm_position(position_id=position_id)
+
+    # Roll the file back to the v4 layout
+    conn = sqlite3.connect(db_path)
+    conn.execute('ALTER TABLE active_positions DROP COLUMN tp_price')
+    conn.execute('PRAGMA user_version = 4')
+    conn.commit()
+    conn.close()
+
+    tracker = PositionTracker(db_path)
+
+    assert user_version(db_path) == SCHEMA_VERSION
+    assert 'tp_price' in columns(db_path, 'active_positions')
+    [position] = tracker.get_confirmed_positions()
+    assert position['id'] == position_id
+    assert position['tp_price'] is None
+    new_id = tracker.add_signal('ETHUSDT', 'sell', 50, 55, tp_price=45)
+    tracker.confirm_position(position_id=new_id)
+    assert {p['symbol']: p['tp_price'] for p in tracker.get_confirmed_positions()} == \
+        {'BTCUSDT': None, 'ETHUSDT': 45}
+
+
+def test_close_drops_the_pending_signal_row(tmp_path):
+    tracker = PositionTracker(str(tmp_path / 'positions.db'))
+    signal_id = tracker.add_signal('BTCUSDT', 'buy', 100, 90)
+    assert tracker.confirm_for_chat(1, position_id=signal_id)
+
+    results = tracker.close_positions('BTCUSDT', 110, 'tp1')
+
+    assert [r['chat_id'] for r in results] == [1]
+    assert tracker.get_pending_signals() == []
+    # A chat pressing /girdim after the close has nothing to confirm
+    assert tracker.confirm_for_chat(2, position_id=signal_id) is None
+    assert tracker.get_confirmed_positions() == []
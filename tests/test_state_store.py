@@ -0,0 +1,130 @@
+"""batch() semantics and JSONL recovery across the state backends"""
+import asyncio
+
+import pytest
+
+from position_tracker import AsyncPositionTracker
+from state_store import JsonlPositionStore, open_store
+
+
+BACKENDS = ['sqlite', 'jsonl', 'memory']
+
+
+def spec_for(kind, tmp_path):
+    if kind == 'memory':
+        return 'memory'
+    return f"{kind}:{tmp_path / ('state.' + ('db' if kind == 'sqlite' else 'jsonl'))}"
+
+
+def pending_symbols(store):
+    return sorted(p['symbol'] for p in store.get_pending_signals())
+
+
+@pytest.mark.parametrize('kind', BACKENDS)
+def test_batch_commits_on_success(kind, tmp_path):
+    store = open_store(spec_for(kind, tmp_path), persistent=True)
+    with store.batch():
+        store.add_signal('BTCUSDT', 'buy', 100, 90)
+        store.add_signal('ETHUSDT', 'sell', 50, 55)
+    assert pending_symbols(store) == ['BTCUSDT', 'ETHUSDT']
+
+
+@pytest.mark.parametrize('kind', BACKENDS)
+def test_batch_rolls_back_on_exception(kind, tmp_path):
+    spec = spec_for(kind, tmp_path)
+    store = open_store(spec, persistent=True)
+    kept_id = store.add_signal('BTCUSDT', 'buy', 100, 90)
+    store.confirm_position(position_id=kept_id)
+
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.add_signal('ETHUSDT', 'sell', 50, 55)
+            store.close_positions('BTCUSDT', 110, 'tp1')
+            raise RuntimeError("pair failed")
+
+    assert pending_symbols(store) == []
+    assert [p['symbol'] for p in store.get_confirmed_positions()] == ['BTCUSDT']
+    assert store.get_stats()['total_trades'] == 0
+
+    if kind != 'memory':
+        store.close()
+        reopened = open_store(spec, persistent=True)
+        assert [p['symbol'] for p in reopened.get_confirmed_positions()] == ['BTCUSDT']
+        assert pending_symbols(reopened) == []
+        reopened.close()
+
+
+@pytest.mark.parametrize('kind', BACKENDS)
+def test_nested_failure_rolls_back_the_outer_batch(kind, tmp_path):
+    store = open_store(spec_for(kind, tmp_path), persistent=True)
+    with store.batch():
+        store.add_signal('BTCUSDT', 'buy', 100, 90)
+        with pytest.raises(RuntimeError):
+            with store.batch():
+                store.add_signal('ETHUSDT', 'sell', 50, 55)
+                raise RuntimeError
+    assert pending_symbols(store) == []
+
+
+@pytest.mark.parametrize('kind', BACKENDS)
+def test_async_batch_rollback_keeps_other_tasks_writes(kind, tmp_path):
+    async def scenario():
+        tracker = AsyncPositionTracker(open_store(spec_for(kind, tmp_path), persistent=True))
+        signal_id = await tracker.add_signal('BTCUSDT', 'buy', 100, 90)
+
+        async def girdim():
+            await asyncio.sleep(0)
+            return await tracker.confirm_position(chat_id=7, position_id=signal_id)
+
+        confirm = asyncio.ensure_future(girdim())
+        with pytest.raises(RuntimeError):
+            async with tracker.batch():
+                await tracker.add_signal('ETHUSDT', 'sell', 50, 55)
+                await asyncio.sleep(0.01)
+                raise RuntimeError
+        assert await confirm
+
+        cached = [(p['symbol'], p['chat_id']) for p in tracker.get_confirmed_positions()]
+        stored = [(p['symbol'], p['chat_id']) for p in await tracker._run(tracker.tracker.get_confirmed_positions)]
+        assert cached == stored == [('BTCUSDT', 7)]
+        assert [p['symbol'] for p in tracker.get_pending_signals()] == ['BTCUSDT']
+        await tracker.close()
+
+    asyncio.run(scenario())
+
+
+def test_jsonl_drops_torn_last_record(tmp_path):
+    path = tmp_path / 'state.jsonl'
+    store = JsonlPositionStore(str(path))
+    store.add_signal('BTCUSDT', 'buy', 100, 90)
+    store.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"op":"add","row":{"id":2')
+
+    store = JsonlPositionStore(str(path))
+    assert pending_symbols(store) == ['BTCUSDT']
+    store.add_signal('ETHUSDT', 'sell', 50, 55)
+    store.close()
+
+    assert pending_symbols(JsonlPositionStore(str(path))) == ['BTCUSDT', 'ETHUSDT']
+
+
+def test_jsonl_rejects_corruption_before_the_last_record(tmp_path):
+    path = tmp_path / 'state.jsonl'
+    path.write_text('not json\n{"op":"unsubscribe","chat_id":1}\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        JsonlPositionStore(str(path))
+
+
+def test_jsonl_compacts_past_the_record_threshold(tmp_path):
+    path = tmp_path / 'state.jsonl'
+    store = JsonlPositionStore(str(path), compact_records=20)
+    for i in range(15):
+        position_id = store.add_signal('BTCUSDT', 'buy', 100, 90)
+        store.confirm_position(position_id=position_id)
+        store.close_positions('BTCUSDT', 100 + i % 3, 'tp1')
+    stats = store.get_stats()
+    store.close()
+
+    assert len(path.read_text(encoding='utf-8').splitlines()) < 20
+    assert JsonlPositionStore(str(path)).get_stats() == stats
@@ -0,0 +1,128 @@
+"""
+Webhook Server - Minimal asyncio HTTP listener for Telegram webhook updates
+Telegram POSTs each update as JSON; the listener checks the secret token,
+acknowledges immediately and hands the update to the Application's update
+queue, where handlers run concurrently (see Application.concurrent_updates).
+"""
+import asyncio
+import hmac
+import json
+from typing import Dict, Optional, Tuple
+
+from telegram import Update
+
+import event_log
+
+
+log = event_log.get_logger('webhook_server')
+
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+
+# Telegram caps update payloads far below this
+MAX_BODY_SIZE = 1024 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """Read one HTTP/1.1 request: (method, path, lowercase headers, body), or None on EOF"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise ValueError("Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_SIZE:
+        raise ValueError("Body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def write_response(writer: asyncio.StreamWriter, status: int, body: bytes = b'',
+                   content_type: str = 'application/json'):
+    """Queue an HTTP/1.1 response on a keep-alive connection"""
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"\r\n".encode('latin-1') + body
+    )
+
+
+class WebhookServer:
+    def __init__(self, app, secret_token: str, host: str = '0.0.0.0', port: int = 8443,
+                 path: str = '/telegram'):
+        self.app = app
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.path = path
+        self._server: Optional[asyncio.base_events.Server] = None
+
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info("Webhook listener on %s:%s%s", self.host, self.port, self.path)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Telegram reuses connections, so serve requests until it hangs up
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    write_response(writer, 400)
+                    break
+                if request is None:
+                    break
+
+                status = self._dispatch(*request)
+                write_response(writer, status)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> int:
+        """Validate and enqueue one update; returns the HTTP status"""
+        if path.split('?', 1)[0] != self.path:
+            return 404
+        if method != 'POST':
+            return 405
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, ''), self.secret_token):
+            self.rejected += 1
+            return 403
+
+        try:
+            update = Update.de_json(json.loads(body), self.app.bot)
+        except (ValueError, TypeError, KeyError):
+            return 400
+
+        # Ack right away; the Application processes the queue concurrently
+        self.app.update_queue.put_nowait(update)
+        self.received += 1
+        return 200